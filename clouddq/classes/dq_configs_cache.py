@@ -15,13 +15,21 @@
 """todo: add classes docstring."""
 from __future__ import annotations
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from pathlib import Path
 from pprint import pformat
 
+import copy
+import functools
 import json
 import logging
 import re
 import sqlite3
+import threading
+import time
+import typing
 
 from sqlite_utils import Database
 from sqlite_utils.db import NotFoundError
@@ -33,12 +41,15 @@ from clouddq.integration.bigquery.bigquery_client import BigQueryClient
 from clouddq.utils import convert_json_value_to_dict
 from clouddq.utils import unnest_object_to_list
 
+import clouddq.classes.dq_config_type as dq_config_type
 import clouddq.classes.dq_entity as dq_entity
 import clouddq.classes.dq_entity_uri as dq_entity_uri
+import clouddq.classes.dq_metadata_cache as dq_metadata_cache
 import clouddq.classes.dq_row_filter as dq_row_filter
 import clouddq.classes.dq_rule as dq_rule
 import clouddq.classes.dq_rule_binding as dq_rule_binding
 import clouddq.classes.dq_rule_dimensions as dq_rule_dimensions
+import clouddq.integration.async_metadata_client as async_metadata
 import clouddq.integration.dataplex.clouddq_dataplex as clouddq_dataplex
 
 
@@ -55,42 +66,126 @@ select
     group_concat(rb.id, ',') as rule_binding_ids_list,
     group_concat(json_array_length(rb.rule_ids), ',') as rules_per_rule_binding
 from
-    entities e
+    temp.target_rule_bindings t
 inner join
     rule_bindings rb
-    on UPPER(e.id) = UPPER(rb.entity_id)
-where
-    rb.id in ({target_rule_binding_ids_list})
+    on rb.id = t.id
+inner join
+    entities e
+    on e.id = rb.entity_key
 group by
     1,2,3,4
 """
 GET_DISTINCT_ENTITY_URIS_SQL = """
 select distinct
-    entity_uri,
-    group_concat(id, ',') as rule_binding_ids_list
+    rb.entity_uri,
+    group_concat(rb.id, ',') as rule_binding_ids_list
 from
-    rule_bindings
+    temp.target_rule_bindings t
+inner join
+    rule_bindings rb
+    on rb.id = t.id
 where
-    entity_uri is not null
-    and id in ({target_rule_binding_ids_list})
+    rb.entity_uri is not null
 group by
     1
 """
 
+TARGET_RULE_BINDINGS_TABLE = "target_rule_bindings"
+CONFIGS_SOURCE_FILES_TABLE = "configs_source_files"
+CONFIGS_SNAPSHOT_TABLE = "configs_snapshot"
+CONFIGS_SOURCE_INDEX_TABLE = "configs_source_index"
+CONFIGS_OBJECTS_CACHE_SIZE = 4096
+CONFIGS_TABLES = [
+    "entities",
+    "row_filters",
+    "reference_columns",
+    "rule_dimensions",
+    "rules",
+    "rule_bindings",
+]
+
 
 @dataclass
 class DqConfigsCache:
     _cache_db: Database
+    _objects_cache: OrderedDict
+    _objects_cache_size: int
+    sqlite3_db_name: str
 
-    def __init__(self, sqlite3_db_name: str | None = None):
-        if sqlite3_db_name:
+    def __init__(
+        self,
+        sqlite3_db_name: str | None = None,
+        objects_cache_size: int = CONFIGS_OBJECTS_CACHE_SIZE,
+        read_only: bool = False,
+    ):
+        if read_only:
+            if not sqlite3_db_name:
+                raise ValueError("A read-only configs cache requires sqlite3_db_name.")
+            # Used by worker processes while the cache is held open elsewhere
+            cache_db = Database(
+                sqlite3.connect(
+                    f"{Path(sqlite3_db_name).absolute().as_uri()}?mode=ro", uri=True
+                )
+            )
+        elif sqlite3_db_name:
             cache_db = Database(sqlite3.connect(sqlite3_db_name))
         else:
-            cache_db = Database("clouddq_configs.db", recreate=True)
+            sqlite3_db_name = "clouddq_configs.db"
+            cache_db = Database(sqlite3_db_name, recreate=True)
+        self.sqlite3_db_name = sqlite3_db_name
         self._cache_db = cache_db
+        # LRU of config objects built from the cache tables, keyed by
+        # (table, config_id).
+        self._objects_cache = OrderedDict()
+        self._objects_cache_size = objects_cache_size
+        self._objects_cache_lock = threading.Lock()
+
+    def commit(self) -> None:
+        """Make pending writes visible to other connections on the database file."""
+        self._cache_db.conn.commit()
+
+    def _get_cached_object(self, table: str, config_id: str) -> typing.Any | None:
+        with self._objects_cache_lock:
+            config_object = self._objects_cache.get((table, config_id))
+            if config_object is not None:
+                self._objects_cache.move_to_end((table, config_id))
+            return config_object
+
+    def _set_cached_object(
+        self, table: str, config_id: str, config_object: typing.Any
+    ) -> None:
+        if self._objects_cache_size <= 0:
+            return
+        with self._objects_cache_lock:
+            self._objects_cache[(table, config_id)] = config_object
+            self._objects_cache.move_to_end((table, config_id))
+            while len(self._objects_cache) > self._objects_cache_size:
+                self._objects_cache.popitem(last=False)
+
+    def _invalidate_cached_objects(
+        self, table: str, config_ids: typing.Iterable[str] | None = None
+    ) -> None:
+        with self._objects_cache_lock:
+            if config_ids is None:
+                keys = [key for key in self._objects_cache if key[0] == table]
+            else:
+                keys = [(table, str(config_id).upper()) for config_id in config_ids]
+            for key in keys:
+                self._objects_cache.pop(key, None)
 
     def get_table_entity_id(self, entity_id: str) -> dq_entity.DqEntity:
         entity_id = entity_id.upper()
+        entity = self._get_cached_object("entities", entity_id)
+        if entity is None:
+            entity = self._build_table_entity(entity_id)
+            self._set_cached_object("entities", entity_id, entity)
+        # Entities are shared read-only apart from their columns mapping.
+        entity = copy.copy(entity)
+        entity.columns = dict(entity.columns)
+        return entity
+
+    def _build_table_entity(self, entity_id: str) -> dq_entity.DqEntity:
         try:
             logger.debug(
                 f"Attempting to get from configs cache table entity_id: {entity_id}"
@@ -111,6 +206,14 @@ class DqConfigsCache:
 
     def get_rule_id(self, rule_id: str) -> dq_rule.DqRule:
         rule_id = rule_id.upper()
+        rule = self._get_cached_object("rules", rule_id)
+        if rule is None:
+            rule = self._build_rule(rule_id)
+            self._set_cached_object("rules", rule_id, rule)
+        # Rules are mutated when bound to a rule binding.
+        return copy.deepcopy(rule)
+
+    def _build_rule(self, rule_id: str) -> dq_rule.DqRule:
         try:
             rule_record = self._cache_db["rules"].get(rule_id)
         except NotFoundError:
@@ -138,6 +241,13 @@ class DqConfigsCache:
 
     def get_row_filter_id(self, row_filter_id: str) -> dq_row_filter.DqRowFilter:
         row_filter_id = row_filter_id.upper()
+        row_filter = self._get_cached_object("row_filters", row_filter_id)
+        if row_filter is None:
+            row_filter = self._build_row_filter(row_filter_id)
+            self._set_cached_object("row_filters", row_filter_id, row_filter)
+        return copy.deepcopy(row_filter)
+
+    def _build_row_filter(self, row_filter_id: str) -> dq_row_filter.DqRowFilter:
         try:
             row_filter_record = self._cache_db["row_filters"].get(row_filter_id)
         except NotFoundError:
@@ -155,6 +265,19 @@ class DqConfigsCache:
         self, reference_columns_id: str
     ) -> dq_reference_columns.DqReferenceColumns:
         reference_columns_id = reference_columns_id.upper()
+        reference_columns = self._get_cached_object(
+            "reference_columns", reference_columns_id
+        )
+        if reference_columns is None:
+            reference_columns = self._build_reference_columns(reference_columns_id)
+            self._set_cached_object(
+                "reference_columns", reference_columns_id, reference_columns
+            )
+        return copy.deepcopy(reference_columns)
+
+    def _build_reference_columns(
+        self, reference_columns_id: str
+    ) -> dq_reference_columns.DqReferenceColumns:
         try:
             reference_columns_record = self._cache_db["reference_columns"].get(
                 reference_columns_id
@@ -207,9 +330,13 @@ class DqConfigsCache:
                 raise ValueError(f"Failed to parse Rule Binding with error:\n{e}\n")
             if "entity_uri" not in record:
                 record.update({"entity_uri": None})
+            # Upper-cased join key, so that joins to 'entities' can use its index.
+            entity_id = record.get("entity_id")
+            record["entity_key"] = entity_id.upper() if entity_id else None
         self._cache_db["rule_bindings"].upsert_all(
             rule_bindings_rows, pk="id", alter=True
         )
+        self._cache_db["rule_bindings"].create_index(["entity_key"], if_not_exists=True)
 
     def load_all_entities_collection(self, entities_collection: dict) -> None:
         logger.debug(
@@ -226,6 +353,7 @@ class DqConfigsCache:
         self._cache_db["entities"].upsert_all(
             unnest_object_to_list(enriched_entities_configs), pk="id", alter=True
         )
+        self._invalidate_cached_objects("entities", enriched_entities_configs)
 
     def load_all_row_filters_collection(self, row_filters_collection: dict) -> None:
         logger.debug(
@@ -241,6 +369,7 @@ class DqConfigsCache:
         self._cache_db["row_filters"].upsert_all(
             unnest_object_to_list(row_filters_collection), pk="id", alter=True
         )
+        self._invalidate_cached_objects("row_filters", row_filters_collection)
 
     def load_all_reference_columns_collection(
         self, reference_columns_collection: dict
@@ -264,6 +393,9 @@ class DqConfigsCache:
         self._cache_db["reference_columns"].upsert_all(
             unnest_object_to_list(reference_columns_collection), pk="id", alter=True
         )
+        self._invalidate_cached_objects(
+            "reference_columns", reference_columns_collection
+        )
 
     def load_all_rules_collection(self, rules_collection: dict) -> None:
         logger.debug(
@@ -277,6 +409,7 @@ class DqConfigsCache:
         self._cache_db["rules"].upsert_all(
             unnest_object_to_list(rules_collection), pk="id", alter=True
         )
+        self._invalidate_cached_objects("rules", rules_collection)
 
     def load_all_rule_dimensions_collection(
         self, rule_dimensions_collection: list
@@ -290,36 +423,349 @@ class DqConfigsCache:
             alter=True,
         )
 
-    def resolve_dataplex_entity_uris(  # noqa: C901
+    def get_configs_source_files(self) -> dict[str, dict]:
+        # Caches created before the reverse index existed are rebuilt from scratch.
+        if (
+            not self._cache_db[CONFIGS_SOURCE_FILES_TABLE].exists()
+            or not self._cache_db[CONFIGS_SOURCE_INDEX_TABLE].exists()
+        ):
+            return {}
+        return {
+            record["path"]: record
+            for record in self._cache_db.query(
+                f"select path, mtime_ns, size, sha256 from {CONFIGS_SOURCE_FILES_TABLE}"
+            )
+        }
+
+    def get_configs_source_files_configs(self, paths: list[str]) -> dict[str, dict]:
+        if not paths or not self._cache_db[CONFIGS_SOURCE_FILES_TABLE].exists():
+            return {}
+        paths = set(paths)
+        return {
+            record["path"]: json.loads(record["configs"])
+            for record in self._cache_db.query(
+                f"select path, configs from {CONFIGS_SOURCE_FILES_TABLE}"
+            )
+            if record["path"] in paths
+        }
+
+    def get_configs_source_paths(
+        self,
+        configs_type: dq_config_type.DqConfigType,
+        config_ids: typing.Iterable[str] | None = None,
+    ) -> list[str]:
+        """Look up the files defining config_ids, or any config of configs_type."""
+        if not self._cache_db[CONFIGS_SOURCE_INDEX_TABLE].exists():
+            return []
+        query = (
+            f"select distinct path from {CONFIGS_SOURCE_INDEX_TABLE} "
+            "where config_type = ?"
+        )
+        params = [configs_type.value]
+        if config_ids is not None:
+            config_ids = [config_id.upper() for config_id in config_ids]
+            if not config_ids:
+                return []
+            query += f" and config_id in ({', '.join('?' for _ in config_ids)})"
+            params.extend(config_ids)
+        return sorted(record["path"] for record in self._cache_db.query(query, params))
+
+    def upsert_configs_source_files(self, records: list[dict]) -> None:
+        records = list(records)
+        self._delete_configs_source_index([record["path"] for record in records])
+        self._cache_db[CONFIGS_SOURCE_INDEX_TABLE].insert_all(
+            [
+                {
+                    "config_type": configs_type,
+                    "config_id": str(config_id).upper(),
+                    "path": record["path"],
+                }
+                for record in records
+                for configs_type, configs in record["configs"].items()
+                for config_id in configs
+            ],
+            pk=("config_type", "config_id", "path"),
+            ignore=True,
+        )
+        self._cache_db[CONFIGS_SOURCE_INDEX_TABLE].create_index(
+            ["config_type", "config_id"], if_not_exists=True
+        )
+        self._cache_db[CONFIGS_SOURCE_FILES_TABLE].upsert_all(
+            [
+                {**record, "configs": json.dumps(record["configs"], default=str)}
+                for record in records
+            ],
+            pk="path",
+            alter=True,
+        )
+
+    def update_configs_source_file_stat(self, record: dict) -> None:
+        self._cache_db[CONFIGS_SOURCE_FILES_TABLE].update(
+            record["path"],
+            {"mtime_ns": record["mtime_ns"], "size": record["size"]},
+        )
+
+    def delete_configs_source_files(self, paths: list[str]) -> None:
+        self._delete_configs_source_index(paths)
+        for path in paths:
+            self._cache_db[CONFIGS_SOURCE_FILES_TABLE].delete(path)
+
+    def _delete_configs_source_index(self, paths: list[str]) -> None:
+        if not self._cache_db[CONFIGS_SOURCE_INDEX_TABLE].exists():
+            return
+        for path in paths:
+            self._cache_db[CONFIGS_SOURCE_INDEX_TABLE].delete_where("path = ?", [path])
+
+    def get_configs_snapshot(
+        self,
+    ) -> dict[dq_config_type.DqConfigType, dict | list] | None:
+        if not self._cache_db[CONFIGS_SNAPSHOT_TABLE].exists():
+            return None
+        # Caches created before rule bindings had an entity_key are reloaded.
+        if (
+            self._cache_db["rule_bindings"].exists()
+            and "entity_key" not in self._cache_db["rule_bindings"].columns_dict
+        ):
+            return None
+        configs_snapshot = {
+            dq_config_type.DqConfigType(record["config_type"]): json.loads(
+                record["configs"]
+            )
+            for record in self._cache_db[CONFIGS_SNAPSHOT_TABLE].rows
+        }
+        if configs_snapshot.keys() != set(dq_config_type.DqConfigType):
+            return None
+        return configs_snapshot
+
+    def update_configs_snapshot(
+        self, all_configs: dict[dq_config_type.DqConfigType, dict | list]
+    ) -> None:
+        self._cache_db[CONFIGS_SNAPSHOT_TABLE].upsert_all(
+            [
+                {
+                    "config_type": configs_type.value,
+                    "configs": json.dumps(configs, default=str),
+                }
+                for configs_type, configs in all_configs.items()
+            ],
+            pk="config_type",
+        )
+
+    def delete_configs_snapshot(self) -> None:
+        if self._cache_db[CONFIGS_SNAPSHOT_TABLE].exists():
+            self._cache_db[CONFIGS_SNAPSHOT_TABLE].delete_where()
+
+    def delete_config_ids(
+        self, configs_type: dq_config_type.DqConfigType, config_ids: list
+    ) -> None:
+        table = self._cache_db[configs_type.value]
+        self._invalidate_cached_objects(configs_type.value, config_ids)
+        if not config_ids or not table.exists():
+            return
+        for config_id in config_ids:
+            try:
+                table.delete(config_id.upper())
+            except NotFoundError:
+                pass
+
+    def delete_all_configs(
+        self, configs_type: dq_config_type.DqConfigType | None = None
+    ) -> None:
+        tables = [configs_type.value] if configs_type else CONFIGS_TABLES
+        for table in tables:
+            self._invalidate_cached_objects(table)
+            if self._cache_db[table].exists():
+                self._cache_db[table].delete_where()
+
+    def resolve_dataplex_entity_uris(
         self,
         dataplex_client: clouddq_dataplex.CloudDqDataplexClient,
         bigquery_client: BigQueryClient,
         target_rule_binding_ids: list[str],
         default_configs: dict | None = None,
+        num_threads: int = 1,
+        metadata_cache: dq_metadata_cache.DqMetadataCache | None = None,
+        async_metadata_client: async_metadata.AsyncMetadataClient | None = None,
     ) -> None:
         logger.debug(
             f"Using Dataplex default configs for resolving entity_uris:\n{pformat(default_configs)}"
         )
-        target_rule_binding_ids = [id.upper() for id in target_rule_binding_ids]
-        query = GET_DISTINCT_ENTITY_URIS_SQL.format(
-            target_rule_binding_ids_list=",".join(
-                [f"'{id}'" for id in target_rule_binding_ids]
+        self._load_target_rule_binding_ids(target_rule_binding_ids)
+        records = list(self._cache_db.query(GET_DISTINCT_ENTITY_URIS_SQL))
+        entity_uris = [
+            self._parse_entity_uri(record, default_configs) for record in records
+        ]
+        metadata_entries = {}
+        cached_project_ids = {}
+        if metadata_cache:
+            metadata_entries = metadata_cache.get_entries(
+                dq_metadata_cache.get_entity_uri_cache_key(entity_uri)
+                for entity_uri in entity_uris
+            )
+            cached_project_ids = metadata_cache.get_project_ids()
+            dataplex_client.load_project_ids(cached_project_ids)
+        cached_entries = [
+            metadata_entries.get(dq_metadata_cache.get_entity_uri_cache_key(entity_uri))
+            for entity_uri in entity_uris
+        ]
+        bigquery_tables = [
+            entity_uri.get_table_name()
+            for entity_uri, cached_entry in zip(entity_uris, cached_entries)
+            if entity_uri.scheme == "BIGQUERY"
+            and all(
+                entity_uri.get_configs(argument)
+                for argument in ("projects", "datasets", "tables")
+            )
+            and not (cached_entry and metadata_cache.is_fresh(cached_entry))
+        ]
+        bigquery_client.prefetch_table_schemas(bigquery_tables, num_threads=num_threads)
+        if async_metadata_client:
+            # Fetch the remaining tables concurrently on an event loop, so that
+            # the resolution below finds them in the BigQuery client cache
+            bigquery_client.load_tables(
+                async_metadata_client.fetch_tables(
+                    table
+                    for table in bigquery_tables
+                    if not bigquery_client.is_table_metadata_cached(table)
+                )
             )
+            # Likewise for the Dataplex entities of uncached entity_uris, and
+            # the zone listings that bigquery:// entity_uris are matched against
+            dataplex_entity_keys = []
+            zone_data_paths = {}
+            for entity_uri, cached_entry in zip(entity_uris, cached_entries):
+                if cached_entry:
+                    continue
+                zone_key = tuple(
+                    entity_uri.get_configs(argument)
+                    for argument in ("projects", "locations", "lakes", "zones")
+                )
+                if entity_uri.scheme == "DATAPLEX":
+                    dataplex_entity_keys.append(
+                        zone_key + (entity_uri.get_entity_id(),)
+                    )
+                elif (
+                    entity_uri.scheme == "BIGQUERY"
+                    and all(zone_key)
+                    and not dataplex_client.is_dataplex_zone_catalog_cached(zone_key)
+                ):
+                    zone_data_paths.setdefault(zone_key, set()).add(
+                        entity_uri.get_entity_id()
+                    )
+            if dataplex_entity_keys or zone_data_paths:
+                dataplex_client.load_dataplex_metadata(
+                    *async_metadata_client.fetch_dataplex_metadata(
+                        entity_keys=dataplex_entity_keys,
+                        zone_data_paths=zone_data_paths,
+                    )
+                )
+        resolve_entity_uri = functools.partial(
+            self._resolve_entity_uri_record,
+            dataplex_client=dataplex_client,
+            bigquery_client=bigquery_client,
+            metadata_cache=metadata_cache,
         )
-        for record in self._cache_db.query(query):
+        # Metadata API calls run concurrently; the Dataplex client rate limits
+        # are shared across threads. Results are written to the caches below.
+        with ThreadPoolExecutor(max_workers=max(1, num_threads)) as executor:
+            futures = [
+                executor.submit(resolve_entity_uri, record, entity_uri, cached_entry)
+                for record, entity_uri, cached_entry in zip(
+                    records, entity_uris, cached_entries
+                )
+            ]
+            try:
+                resolved = [future.result() for future in futures]
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+        resolved_entities = []
+        rule_bindings_updates = []
+        for record, entity_uri, (clouddq_entity, _) in zip(
+            records, entity_uris, resolved
+        ):
+            resolved_entities.extend(unnest_object_to_list(clouddq_entity.to_dict()))
+            entity_key = entity_uri.get_db_primary_key().upper()
+            rule_bindings_updates.extend(
+                (entity_key, entity_key, rule_binding_id)
+                for rule_binding_id in record["rule_binding_ids_list"].split(",")
+            )
+        if metadata_cache:
+            metadata_cache.upsert_entries(
+                metadata_entry for _, metadata_entry in resolved if metadata_entry
+            )
+            resolved_project_ids = dataplex_client.get_project_ids()
+            for project_number in cached_project_ids:
+                resolved_project_ids.pop(project_number, None)
+            metadata_cache.upsert_project_ids(resolved_project_ids)
+        if not resolved_entities:
+            return
+        logger.debug(f"Writing parsed Dataplex Entities to db: {resolved_entities}")
+        with self._cache_db.conn:
+            self._cache_db["entities"].upsert_all(
+                resolved_entities,
+                pk="id",
+                alter=True,
+                batch_size=len(resolved_entities),
+            )
+            self._cache_db["rule_bindings"].add_missing_columns(
+                [{"entity_id": "", "entity_key": ""}]
+            )
+            self._cache_db.conn.executemany(
+                "update rule_bindings set entity_id = ?, entity_key = ? where id = ?",
+                rule_bindings_updates,
+            )
+        self._invalidate_cached_objects(
+            "entities", [entity["id"] for entity in resolved_entities]
+        )
+
+    def _parse_entity_uri(
+        self, record: dict, default_configs: dict | None = None
+    ) -> dq_entity_uri.EntityUri:
+        try:
+            entity_uri = dq_entity_uri.EntityUri.from_uri(
+                uri_string=record["entity_uri"],
+                default_configs=default_configs,
+            )
+        except Exception as e:
+            raise ValueError(
+                f"Failed to parse 'entity_uri' {record['entity_uri']} with error:\n{e}"
+            )
+        logger.debug(f"Parsed entity_uri configs:\n{pformat(entity_uri.to_dict())}")
+        return entity_uri
+
+    def _resolve_entity_uri_record(
+        self,
+        record: dict,
+        entity_uri: dq_entity_uri.EntityUri,
+        cached_entry: dq_metadata_cache.DqMetadataCacheEntry | None,
+        dataplex_client: clouddq_dataplex.CloudDqDataplexClient,
+        bigquery_client: BigQueryClient,
+        metadata_cache: dq_metadata_cache.DqMetadataCache | None = None,
+    ) -> tuple[dq_entity.DqEntity, dq_metadata_cache.DqMetadataCacheEntry | None]:
+        try:
+            if cached_entry:
+                if metadata_cache.is_fresh(cached_entry):
+                    logger.debug(
+                        f"Using cached metadata for entity_uri: {record['entity_uri']}"
+                    )
+                    return cached_entry.entity, None
+                version = self._get_entity_uri_version(
+                    entity_uri=entity_uri,
+                    dataplex_client=dataplex_client,
+                    bigquery_client=bigquery_client,
+                )
+                if version == cached_entry.version:
+                    logger.debug(
+                        f"Revalidated cached metadata for entity_uri: {record['entity_uri']}"
+                    )
+                    cached_entry.validated_at = time.time()
+                    return cached_entry.entity, cached_entry
             logger.info(
                 f"Calling Dataplex Metadata API to retrieve schema "
                 f"for entity_uri:\n{pformat(record)}"
             )
-            try:
-                entity_uri = dq_entity_uri.EntityUri.from_uri(
-                    uri_string=record["entity_uri"],
-                    default_configs=default_configs,
-                )
-            except Exception as e:
-                raise ValueError(f"Failed to parse 'entity_uri' with error:\n{e}")
-            logger.debug(f"Parsed entity_uri configs:\n{pformat(entity_uri.to_dict())}")
-            clouddq_entity = None
             if entity_uri.scheme == "DATAPLEX":
                 clouddq_entity = self._resolve_dataplex_entity_uri(
                     entity_uri=entity_uri,
@@ -334,17 +780,50 @@ class DqConfigsCache:
                 )
             else:
                 raise RuntimeError(f"Invalid Entity URI scheme: {entity_uri.scheme}")
-            resolved_entity = unnest_object_to_list(clouddq_entity.to_dict())
-            logger.debug(f"Writing parsed Dataplex Entity to db: {resolved_entity}")
-            self._cache_db["entities"].upsert_all(resolved_entity, pk="id", alter=True)
-            entity_configs = {
-                "entity_id": entity_uri.get_db_primary_key().upper(),
-            }
-            rule_binding_ids = record["rule_binding_ids_list"].split(",")
-            for rule_binding in rule_binding_ids:
-                self._cache_db["rule_bindings"].update(
-                    rule_binding, entity_configs, alter=True
+            metadata_entry = None
+            if metadata_cache:
+                metadata_entry = dq_metadata_cache.DqMetadataCacheEntry(
+                    entity_key=dq_metadata_cache.get_entity_uri_cache_key(entity_uri),
+                    entity=clouddq_entity,
+                    version=self._get_entity_uri_version(
+                        entity_uri=entity_uri,
+                        dataplex_client=dataplex_client,
+                        bigquery_client=bigquery_client,
+                        clouddq_entity=clouddq_entity,
+                    ),
+                    validated_at=time.time(),
                 )
+        except Exception as e:
+            raise RuntimeError(
+                f"Failed to resolve 'entity_uri' {record['entity_uri']} "
+                f"for Rule Binding IDs {record['rule_binding_ids_list']} "
+                f"with error:\n{e}"
+            ) from e
+        return clouddq_entity, metadata_entry
+
+    def _get_entity_uri_version(
+        self,
+        entity_uri: dq_entity_uri.EntityUri,
+        dataplex_client: clouddq_dataplex.CloudDqDataplexClient,
+        bigquery_client: BigQueryClient,
+        clouddq_entity: dq_entity.DqEntity | None = None,
+    ) -> str | None:
+        if entity_uri.scheme == "DATAPLEX":
+            if clouddq_entity:
+                return clouddq_entity.dataplex_updateTime
+            return dataplex_client.get_dataplex_entity_update_time(
+                gcp_project_id=entity_uri.get_configs("projects"),
+                location_id=entity_uri.get_configs("locations"),
+                lake_name=entity_uri.get_configs("lakes"),
+                zone_id=entity_uri.get_configs("zones"),
+                entity_id=entity_uri.get_entity_id(),
+            )
+        elif entity_uri.scheme == "BIGQUERY":
+            return bigquery_client.get_table_schema_version(
+                table=entity_uri.get_table_name()
+            )
+        else:
+            raise RuntimeError(f"Invalid Entity URI scheme: {entity_uri.scheme}")
 
     def update_config(
         configs_type: str, config_old: list | dict, config_new: list | dict
@@ -406,16 +885,28 @@ class DqConfigsCache:
                 )
             return config_old.copy()
 
+    def _load_target_rule_binding_ids(self, target_rule_binding_ids: list[str]) -> None:
+        self._cache_db.execute(
+            f"create temp table if not exists {TARGET_RULE_BINDINGS_TABLE} "
+            "(id text primary key)"
+        )
+        with self._cache_db.conn:
+            self._cache_db.execute(f"delete from temp.{TARGET_RULE_BINDINGS_TABLE}")
+            self._cache_db.conn.executemany(
+                f"insert or ignore into temp.{TARGET_RULE_BINDINGS_TABLE} (id) "
+                "values (?)",
+                [
+                    (rule_binding_id.upper(),)
+                    for rule_binding_id in target_rule_binding_ids
+                ],
+            )
+
     def get_entities_configs_from_rule_bindings(
         self, target_rule_binding_ids: list[str]
     ) -> dict[str, str]:
-        query = GET_ENTITY_SUMMARY_QUERY.format(
-            target_rule_binding_ids_list=",".join(
-                [f"'{id.upper()}'" for id in target_rule_binding_ids]
-            )
-        )
+        self._load_target_rule_binding_ids(target_rule_binding_ids)
         target_entity_summary_views_configs = {}
-        entity_summary = self._cache_db.query(query)
+        entity_summary = self._cache_db.query(GET_ENTITY_SUMMARY_QUERY)
         if entity_summary:
             for record in entity_summary:
                 num_rules_per_table_count = 0
@@ -525,7 +1016,7 @@ class DqConfigsCache:
                     f"{SAMPLE_DEFAULT_REGISTRIES_YAML}"
                 )
                 return False
-        dataplex_entities_match = dataplex_client.list_dataplex_entities(
+        dataplex_entities_match = dataplex_client.find_dataplex_entities(
             gcp_project_id=entity_uri.get_configs("projects"),
             location_id=entity_uri.get_configs("locations"),
             lake_name=entity_uri.get_configs("lakes"),
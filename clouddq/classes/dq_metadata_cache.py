@@ -0,0 +1,219 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Persistent cache of entities resolved from entity_uris and of SQL dry-runs."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import json
+import logging
+import sqlite3
+import time
+import typing
+
+from sqlite_utils import Database
+
+import clouddq.classes.dq_entity as dq_entity
+import clouddq.classes.dq_entity_uri as dq_entity_uri
+
+
+logger = logging.getLogger(__name__)
+
+METADATA_CACHE_TABLE = "entity_metadata"
+PROJECT_IDS_CACHE_TABLE = "project_ids"
+DRY_RUN_CACHE_TABLE = "dry_run_results"
+DEFAULT_METADATA_CACHE_TTL_HOURS = 24
+SQLITE_MAX_VARIABLES = 500
+
+
+def get_entity_uri_cache_key(entity_uri: dq_entity_uri.EntityUri) -> str:
+    return f"{entity_uri.scheme.value.lower()}://{entity_uri.get_db_primary_key()}"
+
+
+@dataclass
+class DqMetadataCacheEntry:
+    entity_key: str
+    entity: dq_entity.DqEntity
+    version: str | None
+    validated_at: float
+
+
+@dataclass
+class DqDryRunCacheEntry:
+    sql_fingerprint: str
+    referenced_tables: dict[str, str]
+    total_bytes_processed: int | None
+    validated_at: float
+
+
+@dataclass
+class DqMetadataCache:
+    """Resolved entities keyed by entity_uri, with the source metadata version.
+
+    The version is the Dataplex entity updateTime for dataplex:// URIs and a
+    fingerprint of the BigQuery table schema for bigquery:// URIs. Entries
+    younger than the TTL are used as is. Older entries are revalidated
+    against the current version and only re-fetched if it changed.
+    """
+
+    _cache_db: Database
+    ttl_seconds: float
+    refresh: bool
+
+    def __init__(
+        self,
+        sqlite3_db_name: str,
+        ttl_hours: float = DEFAULT_METADATA_CACHE_TTL_HOURS,
+        refresh: bool = False,
+    ):
+        self._cache_db = Database(sqlite3.connect(sqlite3_db_name))
+        self.ttl_seconds = ttl_hours * 3600
+        self.refresh = refresh
+
+    def is_fresh(self, entry: DqMetadataCacheEntry) -> bool:
+        return time.time() - entry.validated_at < self.ttl_seconds
+
+    def get_entries(
+        self, entity_keys: typing.Iterable[str]
+    ) -> dict[str, DqMetadataCacheEntry]:
+        if self.refresh or not self._cache_db[METADATA_CACHE_TABLE].exists():
+            return {}
+        entity_keys = list(set(entity_keys))
+        entries = {}
+        for index in range(0, len(entity_keys), SQLITE_MAX_VARIABLES):
+            chunk = entity_keys[index : index + SQLITE_MAX_VARIABLES]
+            for record in self._cache_db.query(
+                f"select * from {METADATA_CACHE_TABLE} "
+                f"where entity_key in ({', '.join('?' for _ in chunk)})",
+                chunk,
+            ):
+                try:
+                    entity = dq_entity.DqEntity.from_dict(
+                        entity_id=record["entity_id"],
+                        kwargs=json.loads(record["entity_configs"]),
+                    )
+                except Exception as e:
+                    logger.debug(
+                        f"Ignoring invalid metadata cache entry for entity_uri "
+                        f"{record['entity_key']}: {e}"
+                    )
+                    continue
+                entries[record["entity_key"]] = DqMetadataCacheEntry(
+                    entity_key=record["entity_key"],
+                    entity=entity,
+                    version=record["version"],
+                    validated_at=record["validated_at"],
+                )
+        logger.debug(
+            f"Found {len(entries)} of {len(entity_keys)} entity_uris in metadata cache."
+        )
+        return entries
+
+    def upsert_entries(self, entries: typing.Iterable[DqMetadataCacheEntry]) -> None:
+        records = [
+            {
+                "entity_key": entry.entity_key,
+                "entity_id": entry.entity.entity_id,
+                "entity_configs": json.dumps(
+                    entry.entity.dict_values(), default=str, sort_keys=True
+                ),
+                "version": entry.version,
+                "validated_at": entry.validated_at,
+            }
+            for entry in entries
+        ]
+        if records:
+            self._cache_db[METADATA_CACHE_TABLE].upsert_all(
+                records, pk="entity_key", alter=True
+            )
+
+    def get_project_ids(self) -> dict[str, str]:
+        if self.refresh or not self._cache_db[PROJECT_IDS_CACHE_TABLE].exists():
+            return {}
+        return {
+            record["project_number"]: record["project_id"]
+            for record in self._cache_db.query(
+                f"select * from {PROJECT_IDS_CACHE_TABLE} where validated_at > ?",
+                [time.time() - self.ttl_seconds],
+            )
+        }
+
+    def upsert_project_ids(self, project_ids: dict[str, str]) -> None:
+        validated_at = time.time()
+        records = [
+            {
+                "project_number": project_number,
+                "project_id": project_id,
+                "validated_at": validated_at,
+            }
+            for project_number, project_id in project_ids.items()
+        ]
+        if records:
+            self._cache_db[PROJECT_IDS_CACHE_TABLE].upsert_all(
+                records, pk="project_number", alter=True
+            )
+
+    def get_dry_run_entries(
+        self, sql_fingerprints: typing.Iterable[str]
+    ) -> dict[str, DqDryRunCacheEntry]:
+        """Successful dry-runs keyed by SQL fingerprint.
+
+        Each entry records the schema version of the tables referenced by
+        the query. It is only valid while these versions are unchanged and
+        for at most ttl_seconds.
+        """
+        if self.refresh or not self._cache_db[DRY_RUN_CACHE_TABLE].exists():
+            return {}
+        sql_fingerprints = list(set(sql_fingerprints))
+        entries = {}
+        for index in range(0, len(sql_fingerprints), SQLITE_MAX_VARIABLES):
+            chunk = sql_fingerprints[index : index + SQLITE_MAX_VARIABLES]
+            for record in self._cache_db.query(
+                f"select * from {DRY_RUN_CACHE_TABLE} "
+                f"where sql_fingerprint in ({', '.join('?' for _ in chunk)}) "
+                "and validated_at > ?",
+                chunk + [time.time() - self.ttl_seconds],
+            ):
+                entries[record["sql_fingerprint"]] = DqDryRunCacheEntry(
+                    sql_fingerprint=record["sql_fingerprint"],
+                    referenced_tables=json.loads(record["referenced_tables"]),
+                    total_bytes_processed=record["total_bytes_processed"],
+                    validated_at=record["validated_at"],
+                )
+        return entries
+
+    def upsert_dry_run_entries(
+        self, entries: typing.Iterable[DqDryRunCacheEntry]
+    ) -> None:
+        records = [
+            {
+                "sql_fingerprint": entry.sql_fingerprint,
+                "referenced_tables": json.dumps(
+                    entry.referenced_tables, sort_keys=True
+                ),
+                "total_bytes_processed": entry.total_bytes_processed,
+                "validated_at": entry.validated_at,
+            }
+            for entry in entries
+        ]
+        if records:
+            self._cache_db[DRY_RUN_CACHE_TABLE].upsert_all(
+                records, pk="sql_fingerprint", alter=True
+            )
+        # Drop the expired entries so the table does not grow without bound
+        if self._cache_db[DRY_RUN_CACHE_TABLE].exists():
+            self._cache_db[DRY_RUN_CACHE_TABLE].delete_where(
+                "validated_at <= ?", [time.time() - self.ttl_seconds]
+            )
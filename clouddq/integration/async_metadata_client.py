@@ -0,0 +1,434 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""asyncio client for the Dataplex, BigQuery and Resource Manager metadata APIs.
+
+Requires the optional aiohttp dependency: pip install clouddq[async]
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import asyncio
+import json
+import logging
+import typing
+
+from google.api_core.exceptions import NotFound
+from google.cloud import bigquery
+
+from clouddq.classes.dataplex_entity import DataplexEntity
+from clouddq.integration import USER_AGENT_TAG
+from clouddq.integration.dataplex.clouddq_dataplex import (
+    DATAPLEX_LIST_ENTITIES_PAGE_SIZE,
+)
+from clouddq.integration.dataplex.dataplex_client import HTTP_MAX_RETRIES
+from clouddq.integration.dataplex.dataplex_client import HTTP_RETRY_BACKOFF_FACTOR
+from clouddq.integration.dataplex.dataplex_client import HTTP_RETRY_STATUS_CODES
+from clouddq.integration.dataplex.dataplex_client import get_project_ids
+from clouddq.integration.dataplex.dataplex_client import limiter
+from clouddq.integration.dataplex.dataplex_client import load_project_ids
+from clouddq.integration.dataplex.rate_limiter import get_retry_after_seconds
+from clouddq.integration.gcp_credentials import GcpCredentials
+
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 100
+
+
+@dataclass
+class AsyncMetadataResponse:
+    """Same surface as the requests.Response used by DataplexClient."""
+
+    status_code: int
+    text: str
+    headers: dict
+
+    def json(self) -> dict:
+        return json.loads(self.text) if self.text else {}
+
+
+class AsyncMetadataClient:
+    """Metadata lookups that run concurrently on one event loop.
+
+    At most max_concurrency requests are in flight at once. Dataplex calls
+    share the rate limits of DataplexClient. Use it as an async context
+    manager, so that the HTTP session is bound to the running event loop.
+    """
+
+    def __init__(
+        self,
+        gcp_credentials: GcpCredentials,
+        gcp_project_id: str | None = None,
+        gcp_dataplex_region: str | None = None,
+        gcp_dataplex_lake_name: str | None = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        dataplex_endpoint: str = "https://dataplex.googleapis.com",
+        bigquery_endpoint: str = "https://bigquery.googleapis.com",
+        resource_manager_endpoint: str = "https://cloudresourcemanager.googleapis.com",
+    ) -> None:
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncMetadataClient requires the 'aiohttp' package. "
+                "Install it with: pip install clouddq[async]"
+            )
+        self._gcp_credentials = gcp_credentials
+        self.gcp_project_id = gcp_project_id
+        self.location_id = gcp_dataplex_region
+        self.lake_name = gcp_dataplex_lake_name
+        self.max_concurrency = max_concurrency
+        self.dataplex_endpoint = dataplex_endpoint
+        self.bigquery_endpoint = bigquery_endpoint
+        self.resource_manager_endpoint = resource_manager_endpoint
+        self._session = None
+        self._semaphore = None
+        self._token_lock = None
+        self._project_id_tasks = {}
+
+    async def __aenter__(self) -> AsyncMetadataClient:
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+            headers={"Accept": "application/json", "User-Agent": USER_AGENT_TAG},
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._token_lock = asyncio.Lock()
+        self._project_id_tasks = {}
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._session.close()
+        self._session = None
+
+    async def _get_token(self, expired_token: str | None = None) -> str:
+        if self._gcp_credentials.is_token_valid(expired_token):
+            return self._gcp_credentials.credentials.token
+        async with self._token_lock:
+            # google-auth refreshes credentials with blocking calls
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self._gcp_credentials.get_token, expired_token
+            )
+
+    async def _get(
+        self,
+        url: str,
+        params: dict | None = None,
+        rate_limit_name: str | None = None,
+    ) -> AsyncMetadataResponse:
+        expired_token = None
+        async with self._semaphore:
+            for attempt in range(HTTP_MAX_RETRIES + 1):
+                if rate_limit_name:
+                    await limiter.acquire_async(rate_limit_name)
+                token = await self._get_token(expired_token)
+                async with self._session.get(
+                    url,
+                    params=params,
+                    headers={"Authorization": f"Bearer {token}"},
+                ) as response:
+                    metadata_response = AsyncMetadataResponse(
+                        status_code=response.status,
+                        text=await response.text(),
+                        headers=dict(response.headers),
+                    )
+                if attempt == HTTP_MAX_RETRIES:
+                    break
+                if metadata_response.status_code == 401 and expired_token is None:
+                    expired_token = token
+                elif metadata_response.status_code == 429 and rate_limit_name:
+                    limiter.on_throttled(
+                        rate_limit_name, get_retry_after_seconds(metadata_response)
+                    )
+                elif metadata_response.status_code in HTTP_RETRY_STATUS_CODES + (429,):
+                    await asyncio.sleep(HTTP_RETRY_BACKOFF_FACTOR * 2 ** attempt)
+                else:
+                    break
+            if rate_limit_name and metadata_response.status_code != 429:
+                limiter.on_success(rate_limit_name)
+            return metadata_response
+
+    def _get_dataplex_zone_url(
+        self,
+        zone_id: str,
+        gcp_project_id: str | None = None,
+        location_id: str | None = None,
+        lake_name: str | None = None,
+    ) -> str:
+        gcp_project_id = gcp_project_id or self.gcp_project_id
+        location_id = location_id or self.location_id
+        lake_name = lake_name or self.lake_name
+        if not zone_id:
+            raise ValueError("zone_id is a required argument.")
+        if not location_id or not gcp_project_id or not lake_name:
+            raise ValueError(
+                "Dataplex API call missing required arguments 'gcp_project_id', "
+                "'lake_name' and 'location_id'."
+            )
+        return (
+            f"{self.dataplex_endpoint}/v1/projects/{gcp_project_id}/locations/"
+            f"{location_id}/lakes/{lake_name}/zones/{zone_id}"
+        )
+
+    async def get_entity(
+        self,
+        zone_id: str,
+        entity_id: str,
+        params: dict = None,
+        gcp_project_id: str = None,
+        location_id: str = None,
+        lake_name: str = None,
+    ) -> AsyncMetadataResponse:
+        if not entity_id:
+            raise ValueError("entity_id is a required argument.")
+        zone_url = self._get_dataplex_zone_url(
+            zone_id, gcp_project_id, location_id, lake_name
+        )
+        return await self._get(
+            f"{zone_url}/entities/{entity_id}",
+            params=params,
+            rate_limit_name="get_dataplex_asset",
+        )
+
+    async def list_entities(
+        self,
+        zone_id: str,
+        params: dict = None,
+        gcp_project_id: str = None,
+        location_id: str = None,
+        lake_name: str = None,
+    ) -> AsyncMetadataResponse:
+        zone_url = self._get_dataplex_zone_url(
+            zone_id, gcp_project_id, location_id, lake_name
+        )
+        default_params = {"page_size": 100}
+        if params:
+            default_params.update(params)
+        return await self._get(
+            f"{zone_url}/entities/",
+            params=default_params,
+            rate_limit_name="get_dataplex_asset",
+        )
+
+    async def get_project_id(self, project_number: str) -> str:
+        """Resolve a project number once, sharing DataplexClient's cache."""
+        project_number = str(project_number)
+        project_ids = get_project_ids()
+        if project_number in project_ids:
+            return project_ids[project_number]
+        if project_number not in self._project_id_tasks:
+            self._project_id_tasks[project_number] = asyncio.ensure_future(
+                self._get_project_id(project_number)
+            )
+        return await self._project_id_tasks[project_number]
+
+    async def _get_project_id(self, project_number: str) -> str:
+        response = await self._get(
+            f"{self.resource_manager_endpoint}/v3/projects/{project_number}"
+        )
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"Failed to get Project ID for project number: {project_number}: \n "
+                f"{response.text}"
+            )
+        project_id = response.json().get("projectId")
+        load_project_ids({project_number: project_id})
+        return project_id
+
+    async def get_dataplex_entity(
+        self,
+        zone_id: str,
+        entity_id: str,
+        gcp_project_id: str = None,
+        location_id: str = None,
+        lake_name: str = None,
+    ) -> DataplexEntity:
+        """Same result as CloudDqDataplexClient.get_dataplex_entity."""
+        response = await self.get_entity(
+            zone_id=zone_id,
+            entity_id=entity_id,
+            params={"view": "FULL"},
+            gcp_project_id=gcp_project_id,
+            location_id=location_id,
+            lake_name=lake_name,
+        )
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"Failed to retrieve Dataplex entity: "
+                f"'/projects/{gcp_project_id}/locations/{location_id}"
+                f"/lakes/{lake_name}/zones/{zone_id}/entities/{entity_id}':\n "
+                f"{response.text}"
+            )
+        entity_config = response.json()
+        project_name = entity_config.get("name").split("/")[1]
+        if project_name.isnumeric():
+            project_id = await self.get_project_id(project_name)
+            entity_config["name"] = entity_config["name"].replace(
+                project_name, project_id
+            )
+        return DataplexEntity.from_dict(entity_id=entity_id, kwargs=entity_config)
+
+    async def list_zone_entities(
+        self,
+        zone_id: str,
+        gcp_project_id: str = None,
+        location_id: str = None,
+        lake_name: str = None,
+    ) -> list[dict]:
+        params = {"page_size": DATAPLEX_LIST_ENTITIES_PAGE_SIZE}
+        entities = []
+        while True:
+            response = await self.list_entities(
+                zone_id=zone_id,
+                params=params,
+                gcp_project_id=gcp_project_id,
+                location_id=location_id,
+                lake_name=lake_name,
+            )
+            if response.status_code != 200:
+                raise RuntimeError(
+                    f"Failed to list Dataplex entities in zone: "
+                    f"'/projects/{gcp_project_id}/locations/{location_id}"
+                    f"/lakes/{lake_name}/zones/{zone_id}':\n {response.text}"
+                )
+            response_dict = response.json()
+            entities.extend(response_dict.get("entities", []))
+            if not response_dict.get("nextPageToken"):
+                return entities
+            params = {**params, "page_token": response_dict["nextPageToken"]}
+
+    async def get_dataplex_metadata(
+        self,
+        entity_keys: typing.Iterable[tuple],
+        zone_data_paths: dict[tuple, typing.Iterable[str]] | None = None,
+    ) -> tuple[dict[tuple, list[dict]], dict[tuple, DataplexEntity]]:
+        """Fetch Dataplex zone listings and entities concurrently.
+
+        Keys follow CloudDqDataplexClient: a zone key is (gcp_project_id,
+        location_id, lake_name, zone_id) and an entity key is its zone key
+        plus the entity_id. The zones in zone_data_paths are listed first, and
+        their entities with one of the given data paths are fetched together
+        with entity_keys. Failed lookups are left out, so that the synchronous
+        client retries them and reports their errors.
+        """
+
+        async def list_zone_or_none(zone_key: tuple) -> list[dict] | None:
+            gcp_project_id, location_id, lake_name, zone_id = zone_key
+            try:
+                return await self.list_zone_entities(
+                    zone_id=zone_id,
+                    gcp_project_id=gcp_project_id,
+                    location_id=location_id,
+                    lake_name=lake_name,
+                )
+            except Exception as error:
+                logger.debug(f"Failed to list Dataplex zone {zone_key}: {error}")
+                return None
+
+        async def get_entity_or_none(entity_key: tuple) -> DataplexEntity | None:
+            gcp_project_id, location_id, lake_name, zone_id, entity_id = entity_key
+            try:
+                return await self.get_dataplex_entity(
+                    zone_id=zone_id,
+                    entity_id=entity_id,
+                    gcp_project_id=gcp_project_id,
+                    location_id=location_id,
+                    lake_name=lake_name,
+                )
+            except Exception as error:
+                logger.debug(f"Failed to get Dataplex entity {entity_key}: {error}")
+                return None
+
+        zone_data_paths = zone_data_paths or {}
+        zone_keys = list(zone_data_paths)
+        zone_listings = await asyncio.gather(*map(list_zone_or_none, zone_keys))
+        zone_entities = {
+            zone_key: entities
+            for zone_key, entities in zip(zone_keys, zone_listings)
+            if entities is not None
+        }
+        entity_keys = set(entity_keys)
+        for zone_key, entities in zone_entities.items():
+            data_paths = set(zone_data_paths[zone_key])
+            entity_keys.update(
+                zone_key + (entity["id"],)
+                for entity in entities
+                if entity.get("dataPath") in data_paths
+            )
+        entity_keys = list(entity_keys)
+        dataplex_entities = await asyncio.gather(*map(get_entity_or_none, entity_keys))
+        return zone_entities, {
+            entity_key: dataplex_entity
+            for entity_key, dataplex_entity in zip(entity_keys, dataplex_entities)
+            if dataplex_entity is not None
+        }
+
+    async def get_table(self, table: str) -> bigquery.table.Table:
+        table_ref = bigquery.TableReference.from_string(table)
+        response = await self._get(
+            f"{self.bigquery_endpoint}/bigquery/v2/projects/{table_ref.project}"
+            f"/datasets/{table_ref.dataset_id}/tables/{table_ref.table_id}"
+        )
+        if response.status_code == 404:
+            raise NotFound(f"Table {table} was not found.")
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to get table {table}:\n {response.text}")
+        return bigquery.table.Table.from_api_repr(response.json())
+
+    async def get_tables(
+        self, tables: typing.Iterable[str]
+    ) -> dict[str, bigquery.table.Table]:
+        """Fetch tables concurrently. Tables that do not exist are left out."""
+
+        async def get_table_or_none(table: str) -> bigquery.table.Table | None:
+            try:
+                return await self.get_table(table)
+            except NotFound:
+                return None
+
+        tables = list(set(tables))
+        table_refs = await asyncio.gather(*map(get_table_or_none, tables))
+        return {
+            table: table_ref
+            for table, table_ref in zip(tables, table_refs)
+            if table_ref is not None
+        }
+
+    def fetch_tables(
+        self, tables: typing.Iterable[str]
+    ) -> dict[str, bigquery.table.Table]:
+        """Run get_tables on a new event loop, for synchronous callers."""
+
+        async def get_tables() -> dict[str, bigquery.table.Table]:
+            async with self:
+                return await self.get_tables(tables)
+
+        return asyncio.run(get_tables())
+
+    def fetch_dataplex_metadata(
+        self,
+        entity_keys: typing.Iterable[tuple],
+        zone_data_paths: dict[tuple, typing.Iterable[str]] | None = None,
+    ) -> tuple[dict[tuple, list[dict]], dict[tuple, DataplexEntity]]:
+        """Run get_dataplex_metadata on a new event loop, for synchronous callers."""
+
+        async def get_dataplex_metadata() -> tuple[dict, dict]:
+            async with self:
+                return await self.get_dataplex_metadata(entity_keys, zone_data_paths)
+
+        return asyncio.run(get_dataplex_metadata())
@@ -14,14 +14,21 @@
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from string import Template
 
+import copy
+import hashlib
+import json
 import logging
 import re
+import threading
+import typing
 
 from google.api_core.client_info import ClientInfo
 from google.api_core.exceptions import Forbidden
+from google.api_core.exceptions import GoogleAPIError
 from google.api_core.exceptions import NotFound
 from google.cloud import bigquery
 
@@ -55,10 +62,46 @@ FROM (
 
 RE_EXTRACT_TABLE_NAME = ".*Not found: Table (.+?) was not found in.*"
 
+TABLE_SCHEMAS_QUERY = Template(
+    """
+SELECT
+    c.table_name,
+    c.column_name,
+    c.data_type,
+    c.is_nullable,
+    REGEXP_EXTRACT(t.ddl, r"\\nPARTITION BY ([^\\n]+)") AS partition_by
+FROM `$dataset`.INFORMATION_SCHEMA.COLUMNS AS c
+JOIN `$dataset`.INFORMATION_SCHEMA.TABLES AS t
+    ON c.table_name = t.table_name
+WHERE c.table_name IN UNNEST(@table_names)
+    AND c.is_hidden = 'NO'
+ORDER BY c.table_name, c.ordinal_position
+"""
+)
+
+# Only time-unit and ingestion-time partitioning is supported, as in
+# get_table_schema. Anything else is fetched with get_table.
+RE_PARTITION_BY = re.compile(
+    r"^(?:`?(?P<column>\w+)`?"
+    r"|DATE\(`?(?P<date_column>\w+)`?\)"
+    r"|(?:TIMESTAMP|DATETIME|DATE)_TRUNC\(`?(?P<trunc_column>\w+)`?,\s*"
+    r"(?P<unit>HOUR|DAY|MONTH|YEAR)\))$"
+)
+INGESTION_TIME_PARTITION_COLUMNS = ("_PARTITIONTIME", "_PARTITIONDATE")
+STANDARD_SQL_FIELD_TYPES = {
+    "INT64": "INTEGER",
+    "FLOAT64": "FLOAT",
+    "BOOL": "BOOLEAN",
+    "STRUCT": "RECORD",
+}
+SCHEMA_PREFETCH_MIN_TABLES = 2
+
 
 class BigQueryClient:
     _gcp_credentials: GcpCredentials
     _client: bigquery.client.Client = None
+    _metadata_cache: dict[tuple[str, str], typing.Any]
+    metadata_cache_stats: dict[str, int]
     target_audience = "https://bigquery.googleapis.com"
 
     def __init__(
@@ -76,6 +119,10 @@ class BigQueryClient:
                 gcp_service_account_key_path=gcp_service_account_key_path,
                 gcp_impersonation_credentials=gcp_impersonation_credentials,
             )
+        self._metadata_cache = {}
+        self._metadata_cache_locks = {}
+        self._metadata_cache_lock = threading.Lock()
+        self.metadata_cache_stats = {"hits": 0, "misses": 0}
 
     def get_connection(self, new: bool = False) -> bigquery.client.Client:
         """Creates return new Singleton database connection"""
@@ -92,19 +139,76 @@ class BigQueryClient:
             return self._client
 
     def close_connection(self) -> None:
+        logger.debug(f"BigQuery metadata cache stats: {self.metadata_cache_stats}")
         if self._client:
             self._client.close()
 
+    def _get_cached_metadata(
+        self, resource_type: str, resource_id: str, fetch: typing.Callable
+    ) -> typing.Any:
+        """Fetch a table or dataset once per client.
+
+        Concurrent requests for the same resource wait for a single fetch.
+        Failures such as NotFound are not cached.
+        """
+        cache_key = (resource_type, resource_id)
+        with self._metadata_cache_lock:
+            if cache_key in self._metadata_cache:
+                self.metadata_cache_stats["hits"] += 1
+                return self._metadata_cache[cache_key]
+            resource_lock = self._metadata_cache_locks.setdefault(
+                cache_key, threading.Lock()
+            )
+        with resource_lock:
+            with self._metadata_cache_lock:
+                if cache_key in self._metadata_cache:
+                    self.metadata_cache_stats["hits"] += 1
+                    return self._metadata_cache[cache_key]
+                self.metadata_cache_stats["misses"] += 1
+            resource = fetch(resource_id)
+            with self._metadata_cache_lock:
+                self._metadata_cache[cache_key] = resource
+            return resource
+
+    def get_table(self, table: str) -> bigquery.table.Table:
+        return self._get_cached_metadata(
+            "table", table, lambda table_id: self.get_connection().get_table(table_id)
+        )
+
+    def get_dataset(self, dataset: str) -> bigquery.dataset.Dataset:
+        return self._get_cached_metadata(
+            "dataset",
+            dataset,
+            lambda dataset_id: self.get_connection().get_dataset(dataset_id),
+        )
+
+    def clear_metadata_cache(self) -> None:
+        with self._metadata_cache_lock:
+            self._metadata_cache.clear()
+
+    def is_table_metadata_cached(self, table: str) -> bool:
+        with self._metadata_cache_lock:
+            return any(
+                (resource_type, table) in self._metadata_cache
+                for resource_type in ("table", "table_schema")
+            )
+
+    def load_tables(self, tables: dict[str, bigquery.table.Table]) -> None:
+        """Add tables fetched elsewhere, e.g. by AsyncMetadataClient, to the cache."""
+        with self._metadata_cache_lock:
+            self._metadata_cache.update(
+                {("table", table): table_ref for table, table_ref in tables.items()}
+            )
+
     def get_dataset_region(self, dataset: str) -> str:
-        client = self.get_connection()
         try:
-            dataset_info = client.get_dataset(dataset)
+            dataset_info = self.get_dataset(dataset)
         except KeyError as error:
             raise KeyError(f"\n\nInput dataset `{dataset}` is not valid.\n{error}")
         return dataset_info.location
 
-    def check_query_dry_run(self, query_string: str) -> None:
-        """check whether query is valid."""
+    def check_query_dry_run(self, query_string: str) -> bigquery.QueryJob | None:
+        """check whether query is valid and return the dry-run query job."""
         dry_run_job_config = bigquery.QueryJobConfig(
             dry_run=True, use_query_cache=False, use_legacy_sql=False
         )
@@ -121,6 +225,7 @@ class BigQueryClient:
                     query_job.total_bytes_processed
                 )
             )
+            return query_job
         except NotFound as e:
             table_name = re.search(RE_EXTRACT_TABLE_NAME, str(e))
             if table_name:
@@ -130,10 +235,48 @@ class BigQueryClient:
             logger.error("User has insufficient permissions.")
             raise e
 
+    def check_queries_dry_run(
+        self, queries: dict[str, str], num_threads: int = 1
+    ) -> dict[str, bigquery.QueryJob | None]:
+        """Dry-run queries concurrently and return their dry-run query jobs.
+
+        Every query is checked. The errors of all invalid queries are raised
+        together, keyed by query ID.
+        """
+
+        def dry_run(
+            query_id: str,
+        ) -> tuple[bigquery.QueryJob | None, Exception | None]:
+            try:
+                return self.check_query_dry_run(queries[query_id]), None
+            except Exception as error:
+                return None, error
+
+        with ThreadPoolExecutor(max_workers=max(1, num_threads)) as executor:
+            results = dict(zip(queries, executor.map(dry_run, queries)))
+        errors = {
+            query_id: error
+            for query_id, (_, error) in results.items()
+            if error is not None
+        }
+        if errors:
+            raise RuntimeError(
+                f"BigQuery dry-run failed for {len(errors)} of {len(queries)} "
+                "queries:\n"
+                + "\n".join(
+                    f"{query_id}: {type(error).__name__}: {error}"
+                    for query_id, error in errors.items()
+                )
+            )
+        return {query_id: query_job for query_id, (query_job, _) in results.items()}
+
     def is_table_exists(self, table: str) -> bool:
+        with self._metadata_cache_lock:
+            if ("table_schema", table) in self._metadata_cache:
+                self.metadata_cache_stats["hits"] += 1
+                return True
         try:
-            client = self.get_connection()
-            client.get_table(table)
+            self.get_table(table)
             return True
         except (NotFound, KeyError):
             return False
@@ -169,8 +312,7 @@ class BigQueryClient:
 
     def is_dataset_exists(self, dataset: str) -> bool:
         try:
-            client = self.get_connection()
-            client.get_dataset(dataset)
+            self.get_dataset(dataset)
             return True
         except (NotFound, KeyError):
             return False
@@ -203,10 +345,13 @@ class BigQueryClient:
         return query_job
 
     def get_table_schema(self, table: str) -> dict:
+        return copy.deepcopy(
+            self._get_cached_metadata("table_schema", table, self._fetch_table_schema)
+        )
 
-        client = self.get_connection()
+    def _fetch_table_schema(self, table: str) -> dict:
         try:
-            table_ref = client.get_table(table)
+            table_ref = self.get_table(table)
         except KeyError as error:
             raise KeyError(f"\n\nInput table `{table}` is not valid.\n{error}")
         columns = {}
@@ -261,11 +406,151 @@ class BigQueryClient:
         logger.debug(f"Schema for table {table} is: {columns_dict}")
         return columns_dict
 
+    def prefetch_table_schemas(self, tables: list[str], num_threads: int = 1) -> None:
+        """Load table schemas with one INFORMATION_SCHEMA query per dataset.
+
+        Prefetched schemas are served by get_table_schema and is_table_exists
+        without a get_table call. Datasets with fewer than
+        SCHEMA_PREFETCH_MIN_TABLES tables, tables that are not found and
+        unsupported partitioning fall back to get_table.
+        """
+        tables_by_dataset = {}
+        for table in set(tables):
+            with self._metadata_cache_lock:
+                if ("table_schema", table) in self._metadata_cache:
+                    continue
+            try:
+                table_ref = bigquery.TableReference.from_string(table)
+            except ValueError:
+                continue
+            tables_by_dataset.setdefault(
+                f"{table_ref.project}.{table_ref.dataset_id}", {}
+            )[table_ref.table_id] = table
+        datasets = [
+            dataset
+            for dataset, dataset_tables in tables_by_dataset.items()
+            if len(dataset_tables) >= SCHEMA_PREFETCH_MIN_TABLES
+        ]
+        if not datasets:
+            return
+        with ThreadPoolExecutor(max_workers=max(1, num_threads)) as executor:
+            list(
+                executor.map(
+                    lambda dataset: self._prefetch_dataset_table_schemas(
+                        dataset, tables_by_dataset[dataset]
+                    ),
+                    datasets,
+                )
+            )
+
+    def _prefetch_dataset_table_schemas(self, dataset: str, tables: dict) -> None:
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter("table_names", "STRING", sorted(tables))
+            ],
+            use_query_cache=False,
+            use_legacy_sql=False,
+        )
+        try:
+            rows = self.execute_query(
+                query_string=TABLE_SCHEMAS_QUERY.safe_substitute(dataset=dataset),
+                job_config=job_config,
+            ).result()
+        except GoogleAPIError as e:
+            logger.warning(
+                f"Failed to prefetch table schemas in dataset '{dataset}'. "
+                f"Falling back to fetching each table:\n{e}"
+            )
+            return
+        rows_by_table = {}
+        for row in rows:
+            rows_by_table.setdefault(row["table_name"], []).append(row)
+        schemas = {}
+        for table_id, table_rows in rows_by_table.items():
+            columns_dict = self._get_table_schema_from_columns(table_rows)
+            if columns_dict:
+                schemas[("table_schema", tables[table_id])] = columns_dict
+        with self._metadata_cache_lock:
+            self._metadata_cache.update(schemas)
+        logger.info(
+            f"Prefetched schemas of {len(schemas)} of {len(tables)} tables "
+            f"in dataset '{dataset}'."
+        )
+
+    @staticmethod
+    def _get_table_schema_from_columns(rows: list) -> dict | None:
+        columns = {}
+        for row in rows:
+            data_type = row["data_type"]
+            mode = "REQUIRED" if row["is_nullable"] == "NO" else "NULLABLE"
+            if data_type.startswith("ARRAY<"):
+                data_type = data_type[len("ARRAY<") :]
+                mode = "REPEATED"
+            field_type = re.split(r"[<>(]", data_type, maxsplit=1)[0].strip()
+            field_type = STANDARD_SQL_FIELD_TYPES.get(field_type, field_type)
+            columns[row["column_name"].upper()] = {
+                "name": row["column_name"],
+                "type": field_type,
+                "mode": mode,
+                "data_type": field_type,
+            }
+        partition_by = rows[0]["partition_by"]
+        if not partition_by:
+            return {
+                "columns": columns,
+                "partition_fields": None,
+            }
+        match = RE_PARTITION_BY.match(partition_by.strip())
+        if not match:
+            return None
+        partition_column = (
+            match.group("column")
+            or match.group("date_column")
+            or match.group("trunc_column")
+        )
+        partitioning_type = match.group("unit") or "DAY"
+        if partition_column.upper() in INGESTION_TIME_PARTITION_COLUMNS:
+            partition_field = {
+                "name": "_PARTITIONTIME",
+                "partitioning_type": partitioning_type,
+                "type": "TIMESTAMP",
+            }
+        elif partition_column.upper() in columns:
+            partition_field = {
+                "name": partition_column,
+                "type": columns[partition_column.upper()]["type"],
+                "partitioning_type": partitioning_type,
+            }
+        else:
+            return None
+        return {
+            "columns": columns,
+            "partition_fields": [partition_field],
+        }
+
+    def get_table_schema_version(self, table: str) -> str:
+        """Fingerprint of the schema and partitioning of a table.
+
+        Unlike the table etag, it does not change when only the table data
+        is modified.
+        """
+        try:
+            table_ref = self.get_table(table)
+        except KeyError as error:
+            raise KeyError(f"\n\nInput table `{table}` is not valid.\n{error}")
+        table_resource = table_ref.to_api_repr()
+        schema = {
+            key: table_resource.get(key)
+            for key in ("schema", "timePartitioning", "rangePartitioning")
+        }
+        return hashlib.sha256(
+            json.dumps(schema, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
     def get_table_columns(self, table: str) -> set:
 
-        client = self.get_connection()
         try:
-            table_ref = client.get_table(table)
+            table_ref = self.get_table(table)
         except KeyError as error:
             raise KeyError(f"\n\nInput table `{table}` is not valid.\n{error}")
 
@@ -0,0 +1,194 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Progress watermarks of incremental rule bindings, one row per rule binding."""
+from __future__ import annotations
+
+from datetime import date
+from datetime import datetime
+
+import logging
+
+from google.cloud import bigquery
+
+from clouddq.integration.bigquery.bigquery_client import BigQueryClient
+
+
+logger = logging.getLogger(__name__)
+
+DQ_WATERMARKS_TABLE_SUFFIX = "_watermarks"
+
+
+def get_watermark_table_name(dq_summary_table_name: str) -> str:
+    return f"{dq_summary_table_name}{DQ_WATERMARKS_TABLE_SUFFIX}"
+
+
+class WatermarkTable:
+    """Latest progress watermark of each (rule_binding_id, table_id).
+
+    The table is created from the history in dq_summary once, then updated
+    at the end of each successful run with the results of that run only.
+    """
+
+    bigquery_client: BigQueryClient = None
+    dq_summary_table_name: str = None
+    table_name: str = None
+
+    def __init__(self, bigquery_client: BigQueryClient, dq_summary_table_name: str):
+        self.bigquery_client = bigquery_client
+        self.dq_summary_table_name = dq_summary_table_name
+        self.table_name = get_watermark_table_name(dq_summary_table_name)
+
+    def ensure_exists(self) -> None:
+        if self.bigquery_client.is_table_exists(self.table_name):
+            return
+        if self.bigquery_client.is_table_exists(self.dq_summary_table_name):
+            query = f"""CREATE TABLE IF NOT EXISTS `{self.table_name}`
+            CLUSTER BY rule_binding_id, table_id
+            AS
+            SELECT
+                rule_binding_id,
+                table_id,
+                MAX(execution_ts) AS high_watermark,
+                CAST(NULL AS STRING) AS invocation_id,
+                CURRENT_TIMESTAMP() AS last_modified,
+            FROM `{self.dq_summary_table_name}`
+            WHERE progress_watermark IS TRUE
+            GROUP BY rule_binding_id, table_id"""
+        else:
+            query = f"""CREATE TABLE IF NOT EXISTS `{self.table_name}` (
+                rule_binding_id STRING,
+                table_id STRING,
+                high_watermark TIMESTAMP,
+                invocation_id STRING,
+                last_modified TIMESTAMP
+            )
+            CLUSTER BY rule_binding_id, table_id"""
+        self.bigquery_client.execute_query(query_string=query).result()
+        logger.info(f"Created watermark table {self.table_name}")
+
+    def update_from_invocation(self, invocation_id: str, partition_date: date) -> int:
+        """Advance the watermarks to the results of a successful run."""
+        self.ensure_exists()
+        query = f"""MERGE `{self.table_name}` AS watermarks
+        USING (
+            SELECT
+                rule_binding_id,
+                table_id,
+                MAX(execution_ts) AS high_watermark,
+            FROM `{self.dq_summary_table_name}`
+            WHERE invocation_id = @invocation_id
+            AND DATE(execution_ts) = @partition_date
+            AND progress_watermark IS TRUE
+            GROUP BY rule_binding_id, table_id
+        ) AS run
+        ON watermarks.rule_binding_id = run.rule_binding_id
+        AND watermarks.table_id = run.table_id
+        WHEN MATCHED AND (
+            watermarks.high_watermark IS NULL
+            OR run.high_watermark > watermarks.high_watermark
+        ) THEN UPDATE SET
+            high_watermark = run.high_watermark,
+            invocation_id = @invocation_id,
+            last_modified = CURRENT_TIMESTAMP()
+        WHEN NOT MATCHED THEN INSERT
+            (rule_binding_id, table_id, high_watermark, invocation_id, last_modified)
+            VALUES (
+                run.rule_binding_id,
+                run.table_id,
+                run.high_watermark,
+                @invocation_id,
+                CURRENT_TIMESTAMP()
+            )"""
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("invocation_id", "STRING", invocation_id),
+                bigquery.ScalarQueryParameter("partition_date", "DATE", partition_date),
+            ],
+            use_query_cache=False,
+            use_legacy_sql=False,
+        )
+        query_job = self.bigquery_client.execute_query(
+            query_string=query, job_config=job_config
+        )
+        query_job.result()
+        num_rows = query_job.num_dml_affected_rows or 0
+        logger.info(f"Updated {num_rows} watermarks in {self.table_name}.")
+        return num_rows
+
+    def _get_rule_binding_ids_filter(
+        self, rule_binding_ids: list[str] | None
+    ) -> tuple[str, list[bigquery.ArrayQueryParameter]]:
+        if rule_binding_ids is None:
+            return "WHERE TRUE", []
+        return "WHERE rule_binding_id IN UNNEST(@rule_binding_ids)", [
+            bigquery.ArrayQueryParameter("rule_binding_ids", "STRING", rule_binding_ids)
+        ]
+
+    def get_watermarks(self, rule_binding_ids: list[str] | None = None) -> list[dict]:
+        where_clause, query_parameters = self._get_rule_binding_ids_filter(
+            rule_binding_ids
+        )
+        query = f"""SELECT * FROM `{self.table_name}`
+        {where_clause}
+        ORDER BY rule_binding_id, table_id"""
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=query_parameters,
+            use_query_cache=False,
+            use_legacy_sql=False,
+        )
+        return [
+            dict(row.items())
+            for row in self.bigquery_client.execute_query(
+                query_string=query, job_config=job_config
+            ).result()
+        ]
+
+    def reset_watermarks(
+        self,
+        rule_binding_ids: list[str] | None = None,
+        high_watermark: datetime | None = None,
+    ) -> int:
+        """Delete watermarks, or move them to high_watermark if given.
+
+        The next run of a rule binding without a watermark validates all rows.
+        """
+        where_clause, query_parameters = self._get_rule_binding_ids_filter(
+            rule_binding_ids
+        )
+        if high_watermark:
+            query = f"""UPDATE `{self.table_name}`
+            SET high_watermark = @high_watermark,
+            invocation_id = NULL,
+            last_modified = CURRENT_TIMESTAMP()
+            {where_clause}"""
+            query_parameters.append(
+                bigquery.ScalarQueryParameter(
+                    "high_watermark", "TIMESTAMP", high_watermark
+                )
+            )
+        else:
+            query = f"DELETE FROM `{self.table_name}` {where_clause}"
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=query_parameters,
+            use_query_cache=False,
+            use_legacy_sql=False,
+        )
+        query_job = self.bigquery_client.execute_query(
+            query_string=query, job_config=job_config
+        )
+        query_job.result()
+        num_rows = query_job.num_dml_affected_rows or 0
+        logger.info(f"Reset {num_rows} watermarks in {self.table_name}.")
+        return num_rows
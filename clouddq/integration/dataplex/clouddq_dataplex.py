@@ -13,19 +13,23 @@
 # limitations under the License.
 from __future__ import annotations
 
+from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
 
 import json
 import logging
 import re
-import time
+import threading
 
 from requests import Response
 
 from clouddq.classes.dataplex_entity import DataplexEntity
 from clouddq.integration import USER_AGENT_TAG
+from clouddq.integration.dataplex.dataplex_client import DEFAULT_HTTP_POOL_SIZE
 from clouddq.integration.dataplex.dataplex_client import DataplexClient
+from clouddq.integration.dataplex.dataplex_client import get_project_ids
+from clouddq.integration.dataplex.dataplex_client import load_project_ids
 from clouddq.integration.gcp_credentials import GcpCredentials
 from clouddq.integration.gcs import upload_blob
 from clouddq.utils import exponential_backoff
@@ -37,6 +41,7 @@ TARGET_SCOPES = [
     "https://www.googleapis.com/auth/cloud-platform",
 ]
 DEFAULT_GCS_BUCKET_NAME = "dataplex-clouddq-artifacts-{gcp_dataplex_region}"
+DATAPLEX_LIST_ENTITIES_PAGE_SIZE = 500
 
 
 class DATAPLEX_TASK_TRIGGER_TYPE(str, Enum):
@@ -44,8 +49,32 @@ class DATAPLEX_TASK_TRIGGER_TYPE(str, Enum):
     RECURRING = "RECURRING"
 
 
+@dataclass
+class DataplexZoneCatalog:
+    """Entities listed from a Dataplex zone, indexed by ID and data path."""
+
+    entities_by_id: dict[str, dict]
+    entities_by_data_path: dict[str, list[dict]]
+
+    @classmethod
+    def from_entities(cls, entities: list[dict]) -> DataplexZoneCatalog:
+        entities_by_id = {}
+        entities_by_data_path = {}
+        for entity in entities:
+            entities_by_id[entity["id"]] = entity
+            if entity.get("dataPath"):
+                entities_by_data_path.setdefault(entity["dataPath"], []).append(entity)
+        return DataplexZoneCatalog(
+            entities_by_id=entities_by_id,
+            entities_by_data_path=entities_by_data_path,
+        )
+
+
 class CloudDqDataplexClient:
     _client: DataplexClient
+    _gcp_credentials: GcpCredentials | None
+    _zone_catalogs: dict[tuple, DataplexZoneCatalog]
+    _dataplex_entities: dict[tuple, DataplexEntity]
     gcs_bucket_name: str
 
     def __init__(
@@ -56,6 +85,7 @@ class CloudDqDataplexClient:
         gcs_bucket_name: str | None = None,
         gcp_credentials: GcpCredentials | None = None,
         dataplex_endpoint: str = "https://dataplex.googleapis.com",
+        http_pool_size: int = DEFAULT_HTTP_POOL_SIZE,
     ) -> None:
         if gcs_bucket_name:
             self.gcs_bucket_name = gcs_bucket_name
@@ -63,13 +93,19 @@ class CloudDqDataplexClient:
             self.gcs_bucket_name = DEFAULT_GCS_BUCKET_NAME.format(
                 gcp_dataplex_region=gcp_dataplex_region
             )
+        self._gcp_credentials = gcp_credentials
         self._client = DataplexClient(
             gcp_credentials=gcp_credentials,
             gcp_project_id=gcp_project_id,
             gcp_dataplex_lake_name=gcp_dataplex_lake_name,
             gcp_dataplex_region=gcp_dataplex_region,
             dataplex_endpoint=dataplex_endpoint,
+            http_pool_size=http_pool_size,
         )
+        self._zone_catalogs = {}
+        self._zone_catalogs_locks = {}
+        self._zone_catalogs_lock = threading.Lock()
+        self._dataplex_entities = {}
 
     def create_clouddq_task(  # noqa: C901
         self,
@@ -114,6 +150,7 @@ class CloudDqDataplexClient:
                     self.gcs_bucket_name,
                     clouddq_yaml_spec_file_path.name,
                     str(clouddq_yaml_spec_file_path.name),
+                    gcp_credentials=self._gcp_credentials,
                 )
                 gcs_uri = (
                     f"gs://{self.gcs_bucket_name}/{clouddq_yaml_spec_file_path.name}"
@@ -271,6 +308,9 @@ class CloudDqDataplexClient:
         lake_name: str = None,
     ) -> DataplexEntity:
         logger.debug(f"CloudDqDataplex.get_dataplex_entity() arguments: {locals()}")
+        entity_key = (gcp_project_id, location_id, lake_name, zone_id, entity_id)
+        if entity_key in self._dataplex_entities:
+            return self._dataplex_entities[entity_key]
         params = {"view": "FULL"}
         response = self._client.get_entity(
             zone_id=zone_id,
@@ -297,6 +337,31 @@ class CloudDqDataplexClient:
                 f"/lakes/{lake_name}/zones/{zone_id}/entities/{entity_id}':\n {response.text}"
             )
 
+    def get_dataplex_entity_update_time(
+        self,
+        zone_id: str,
+        entity_id: str,
+        gcp_project_id: str = None,
+        location_id: str = None,
+        lake_name: str = None,
+    ) -> str:
+        response = self._client.get_entity(
+            zone_id=zone_id,
+            entity_id=entity_id,
+            gcp_project_id=gcp_project_id,
+            location_id=location_id,
+            lake_name=lake_name,
+            params={"view": "BASIC"},
+        )
+        if response.status_code == 200:
+            return response.json().get("updateTime")
+        else:
+            raise RuntimeError(
+                f"Failed to retrieve Dataplex entity: "
+                f"'/projects/{gcp_project_id}/locations/{location_id}"
+                f"/lakes/{lake_name}/zones/{zone_id}/entities/{entity_id}':\n {response.text}"
+            )
+
     def list_dataplex_entities(
         self,
         zone_id: str,
@@ -326,7 +391,6 @@ class CloudDqDataplexClient:
         response_dict.update(response.json())
 
         while "nextPageToken" in response_dict:
-            time.sleep(3)  # to avoid api limit exceed error of 4 calls per 10 sec
             next_page_token = response_dict["nextPageToken"]
             logger.debug("Getting next page...")
             page_token = {"page_token": f"{next_page_token}"}
@@ -359,3 +423,119 @@ class CloudDqDataplexClient:
                 )
                 dataplex_entities.append(entity_with_schema)
         return dataplex_entities
+
+    def load_project_ids(self, project_ids: dict[str, str]) -> None:
+        load_project_ids(project_ids)
+
+    def get_project_ids(self) -> dict[str, str]:
+        return get_project_ids()
+
+    def is_dataplex_zone_catalog_cached(self, zone_key: tuple) -> bool:
+        with self._zone_catalogs_lock:
+            return zone_key in self._zone_catalogs
+
+    def load_dataplex_metadata(
+        self,
+        zone_entities: dict[tuple, list[dict]],
+        dataplex_entities: dict[tuple, DataplexEntity],
+    ) -> None:
+        """Add metadata fetched elsewhere, e.g. by AsyncMetadataClient, to the caches.
+
+        Keys are those of get_dataplex_zone_catalog and get_dataplex_entity.
+        """
+        with self._zone_catalogs_lock:
+            for zone_key, entities in zone_entities.items():
+                self._zone_catalogs.setdefault(
+                    zone_key, DataplexZoneCatalog.from_entities(entities)
+                )
+        self._dataplex_entities.update(dataplex_entities)
+
+    def get_dataplex_zone_catalog(
+        self,
+        zone_id: str,
+        gcp_project_id: str = None,
+        location_id: str = None,
+        lake_name: str = None,
+    ) -> DataplexZoneCatalog:
+        """List all entities in a zone once per client.
+
+        Concurrent callers asking for the same zone wait for a single listing.
+        """
+        zone_key = (gcp_project_id, location_id, lake_name, zone_id)
+        with self._zone_catalogs_lock:
+            zone_lock = self._zone_catalogs_locks.setdefault(zone_key, threading.Lock())
+        with zone_lock:
+            if zone_key not in self._zone_catalogs:
+                entities = self._list_zone_entities(
+                    zone_id=zone_id,
+                    gcp_project_id=gcp_project_id,
+                    location_id=location_id,
+                    lake_name=lake_name,
+                )
+                logger.info(
+                    f"Listed {len(entities)} entities in Dataplex zone: "
+                    f"'/projects/{gcp_project_id}/locations/{location_id}"
+                    f"/lakes/{lake_name}/zones/{zone_id}'"
+                )
+                self._zone_catalogs[zone_key] = DataplexZoneCatalog.from_entities(
+                    entities
+                )
+            return self._zone_catalogs[zone_key]
+
+    def _list_zone_entities(
+        self,
+        zone_id: str,
+        gcp_project_id: str = None,
+        location_id: str = None,
+        lake_name: str = None,
+    ) -> list[dict]:
+        params = {"page_size": DATAPLEX_LIST_ENTITIES_PAGE_SIZE}
+        entities = []
+        while True:
+            response = self._client.list_entities(
+                zone_id=zone_id,
+                params=params,
+                gcp_project_id=gcp_project_id,
+                location_id=location_id,
+                lake_name=lake_name,
+            )
+            if response.status_code != 200:
+                raise RuntimeError(
+                    f"Failed to list Dataplex entities in zone: "
+                    f"'/projects/{gcp_project_id}/locations/{location_id}"
+                    f"/lakes/{lake_name}/zones/{zone_id}':\n {response.text}"
+                )
+            response_dict = response.json()
+            entities.extend(response_dict.get("entities", []))
+            if not response_dict.get("nextPageToken"):
+                return entities
+            params = {**params, "page_token": response_dict["nextPageToken"]}
+
+    def find_dataplex_entities(
+        self,
+        zone_id: str,
+        data_path: str,
+        gcp_project_id: str = None,
+        location_id: str = None,
+        lake_name: str = None,
+    ) -> list[DataplexEntity]:
+        """Look up entities by data path in the zone catalog.
+
+        Only the matching entities are fetched with their schema.
+        """
+        zone_catalog = self.get_dataplex_zone_catalog(
+            zone_id=zone_id,
+            gcp_project_id=gcp_project_id,
+            location_id=location_id,
+            lake_name=lake_name,
+        )
+        return [
+            self.get_dataplex_entity(
+                entity_id=entity["id"],
+                zone_id=zone_id,
+                gcp_project_id=gcp_project_id,
+                location_id=location_id,
+                lake_name=lake_name,
+            )
+            for entity in zone_catalog.entities_by_data_path.get(data_path, [])
+        ]
@@ -19,36 +19,78 @@ from pprint import pformat
 
 import json
 import logging
+import threading
 
-from google.auth.credentials import Credentials
-from pyrate_limiter import Duration
-from pyrate_limiter import Limiter
-from pyrate_limiter import MemoryListBucket
-from pyrate_limiter import RequestRate
+from requests import PreparedRequest
 from requests import Response
 from requests import Session
-from requests_oauth2 import OAuth2BearerToken
-
-import google.auth
-import google.auth.transport.requests
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase
+from urllib3.util.retry import Retry
 
+from clouddq.integration.dataplex.rate_limiter import AdaptiveRateLimiter
 from clouddq.integration.gcp_credentials import GcpCredentials
 
 
-limiter = Limiter(
-    RequestRate(2, Duration.SECOND),
-    RequestRate(8, Duration.MINUTE),
-    bucket_class=MemoryListBucket,
-)
+limiter = AdaptiveRateLimiter()
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_HTTP_POOL_SIZE = 10
+HTTP_MAX_RETRIES = 5
+HTTP_RETRY_BACKOFF_FACTOR = 0.5
+# 429 responses are retried by the rate limiter
+HTTP_RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+# Project numbers resolved to project IDs, shared by all clients in the process
+_project_ids: dict[str, str] = {}
+_project_ids_locks: dict[str, threading.Lock] = {}
+_project_ids_lock = threading.Lock()
+
+
+def load_project_ids(project_ids: dict[str, str]) -> None:
+    with _project_ids_lock:
+        _project_ids.update(project_ids)
+
+
+def get_project_ids() -> dict[str, str]:
+    with _project_ids_lock:
+        return dict(_project_ids)
+
+
+class GcpCredentialsAuth(AuthBase):
+    """Bearer token auth using the token shared through GcpCredentials.
+
+    A request rejected with 401 is sent once more with a refreshed token.
+    """
+
+    def __init__(self, gcp_credentials: GcpCredentials) -> None:
+        self._gcp_credentials = gcp_credentials
+
+    def __call__(self, request: PreparedRequest) -> PreparedRequest:
+        token = self._gcp_credentials.get_token()
+        request.headers["Authorization"] = f"Bearer {token}"
+        request.register_hook("response", self._retry_unauthorized)
+        return request
+
+    def _retry_unauthorized(self, response: Response, **kwargs) -> Response:
+        if response.status_code != 401:
+            return response
+        expired_token = response.request.headers["Authorization"][len("Bearer ") :]
+        request = response.request.copy()
+        token = self._gcp_credentials.get_token(expired_token)
+        request.headers["Authorization"] = f"Bearer {token}"
+        response.close()
+        retried_response = response.connection.send(request, **kwargs)
+        retried_response.history.append(response)
+        retried_response.request = request
+        return retried_response
+
 
 class DataplexClient:
     _gcp_credentials: GcpCredentials
     _headers: dict
     _session: Session
-    _auth_token: str
     gcp_project_id: str
     location_id: str
     lake_name: str
@@ -63,6 +105,7 @@ class DataplexClient:
         gcp_service_account_key_path: Path | None = None,
         gcp_impersonation_credentials: str | None = None,
         dataplex_endpoint: str = "https://dataplex.googleapis.com",
+        http_pool_size: int = DEFAULT_HTTP_POOL_SIZE,
     ) -> None:
         if gcp_credentials:
             self._gcp_credentials = gcp_credentials
@@ -72,57 +115,74 @@ class DataplexClient:
                 gcp_service_account_key_path=gcp_service_account_key_path,
                 gcp_impersonation_credentials=gcp_impersonation_credentials,
             )
-        self._auth_token = self._get_auth_token(
-            credentials=self._gcp_credentials.credentials
-        )
         self._headers = self._set_headers()
-        self._session = self._get_session()
+        self._session = self._get_session(http_pool_size=http_pool_size)
         self.gcp_project_id = gcp_project_id
         self.lake_name = gcp_dataplex_lake_name
         self.location_id = gcp_dataplex_region
         self.dataplex_endpoint = dataplex_endpoint
         assert self.dataplex_endpoint is not None
 
-    def _get_auth_token(self, credentials: Credentials) -> str:
-        """
-        This method is used to get the authentication token.
-
-        Returns:
-        auth_token (str):
-        """
-        # getting request object
-        auth_req = google.auth.transport.requests.Request()
-        credentials.refresh(auth_req)  # refresh token
-        # check for valid credentials
-        auth_token = credentials.token
-        return auth_token
-
     def _set_headers(self) -> dict:
         # create request headers
         headers = {
             "Accept": "application/json",
             "Content-Type": "application/json",
-            "Authorization": "Bearer " + self._auth_token,
         }
 
         return headers
 
-    def _get_session(self) -> Session:
+    def _get_session(self, http_pool_size: int = DEFAULT_HTTP_POOL_SIZE) -> Session:
         """
-        This method create the session object for request
+        This method create the session object for request.
+        Connections are kept alive and pooled per host, and idempotent
+        requests are retried with backoff on 429 and 5xx responses.
         :return:
         session object
         """
-        with Session() as session:
-            session.auth = OAuth2BearerToken(self._auth_token)
+        session = Session()
+        session.auth = GcpCredentialsAuth(self._gcp_credentials)
+        adapter = HTTPAdapter(
+            pool_connections=http_pool_size,
+            pool_maxsize=http_pool_size,
+            max_retries=Retry(
+                total=HTTP_MAX_RETRIES,
+                backoff_factor=HTTP_RETRY_BACKOFF_FACTOR,
+                status_forcelist=HTTP_RETRY_STATUS_CODES,
+                raise_on_status=False,
+            ),
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
         return session
 
+    def close(self) -> None:
+        self._session.close()
+
     def get_project_id(self, project_number) -> str:
         """
-        Get the projectId
+        Get the projectId, resolving each project number once per process.
+        Concurrent lookups for the same project number share one request.
         :param project_number: project number
         :return: projectId
         """
+        project_number = str(project_number)
+        with _project_ids_lock:
+            if project_number in _project_ids:
+                return _project_ids[project_number]
+            project_number_lock = _project_ids_locks.setdefault(
+                project_number, threading.Lock()
+            )
+        with project_number_lock:
+            with _project_ids_lock:
+                if project_number in _project_ids:
+                    return _project_ids[project_number]
+            project_id = self._get_project_id(project_number)
+            with _project_ids_lock:
+                _project_ids[project_number] = project_id
+            return project_id
+
+    def _get_project_id(self, project_number: str) -> str:
         response = self._session.get(
             f"https://cloudresourcemanager.googleapis.com/v3/projects/{project_number}"
         )
@@ -134,7 +194,7 @@ class DataplexClient:
                 f"Failed to get Project ID for project number: {project_number}: \n {response.text}"
             )
 
-    @limiter.ratelimit("get_dataplex_lake", delay=True, max_delay=60)
+    @limiter.ratelimit("get_dataplex_lake")
     def get_dataplex_lake(
         self,
         lake_name: str,
@@ -156,7 +216,7 @@ class DataplexClient:
         )
         return response
 
-    @limiter.ratelimit("set_dataplex_task", delay=True, max_delay=60)
+    @limiter.ratelimit("set_dataplex_task")
     def create_dataplex_task(
         self,
         task_id: str,
@@ -191,7 +251,7 @@ class DataplexClient:
         )
         return response
 
-    @limiter.ratelimit("get_dataplex_task", delay=True, max_delay=60)
+    @limiter.ratelimit("get_dataplex_task")
     def get_dataplex_task_jobs(
         self,
         task_id: str,
@@ -216,7 +276,7 @@ class DataplexClient:
         )
         return response
 
-    @limiter.ratelimit("get_dataplex_task", delay=True, max_delay=60)
+    @limiter.ratelimit("get_dataplex_task")
     def get_dataplex_task(
         self,
         task_id: str,
@@ -241,7 +301,7 @@ class DataplexClient:
         )
         return response
 
-    @limiter.ratelimit("set_dataplex_task", delay=True, max_delay=60)
+    @limiter.ratelimit("set_dataplex_task")
     def delete_dataplex_task(
         self,
         task_id: str,
@@ -266,7 +326,7 @@ class DataplexClient:
         )
         return response
 
-    @limiter.ratelimit("get_dataplex_asset", delay=True, max_delay=60)
+    @limiter.ratelimit("get_dataplex_asset")
     def get_entity(
         self,
         zone_id: str,
@@ -307,7 +367,7 @@ class DataplexClient:
         )
         return response
 
-    @limiter.ratelimit("get_dataplex_asset", delay=True, max_delay=60)
+    @limiter.ratelimit("get_dataplex_asset")
     def list_entities(
         self,
         zone_id: str,
@@ -349,7 +409,7 @@ class DataplexClient:
         if "entities" not in response.json():
             logger.info(
                 f"\nFailed to retrieve entities matching filter:\n"
-                f" '{params['filter']}'\n"
+                f" '{default_params.get('filter')}'\n"
                 f"in Dataplex zone:\n"
                 f" '/projects/{gcp_project_id}/locations/{location_id}"
                 f"/lakes/{lake_name}/zones/{zone_id}'.\n\n"
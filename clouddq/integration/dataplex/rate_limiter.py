@@ -0,0 +1,278 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Adaptive rate limiting for Dataplex API calls."""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import asdict
+from dataclasses import astuple
+from dataclasses import dataclass
+from dataclasses import fields
+from dataclasses import replace
+from email.utils import parsedate_to_datetime
+
+import asyncio
+import functools
+import logging
+import sqlite3
+import threading
+import time
+import typing
+
+from requests import Response
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REQUESTS_PER_SECOND = 2.0
+MIN_REQUESTS_PER_SECOND = 0.1
+RATE_DECREASE_FACTOR = 0.5
+RATE_INCREASE_FRACTION = 0.05
+RATE_DECREASE_INTERVAL_SECONDS = 1.0
+MAX_THROTTLED_RETRIES = 8
+RATE_LIMITER_BUCKETS_TABLE = "rate_limiter_buckets"
+SQLITE_COLUMN_TYPES = {"float": "real", "int": "integer"}
+
+
+def get_retry_after_seconds(response: Response) -> float | None:
+    retry_after = response.headers.get("Retry-After")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RateLimiterBucket:
+    rate: float
+    max_rate: float
+    next_request_at: float = 0.0
+    decreased_at: float = 0.0
+    requests: int = 0
+    throttled: int = 0
+    waited_seconds: float = 0.0
+
+
+class RateLimiterStore:
+    """In-memory rate limiter buckets shared by the threads of a process."""
+
+    def __init__(self) -> None:
+        self._buckets: dict[str, RateLimiterBucket] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def update_bucket(
+        self, name: str, requests_per_second: float
+    ) -> typing.Iterator[RateLimiterBucket]:
+        with self._lock:
+            if name not in self._buckets:
+                self._buckets[name] = RateLimiterBucket(
+                    rate=requests_per_second,
+                    max_rate=requests_per_second,
+                )
+            yield self._buckets[name]
+
+    def configure(self, requests_per_second: float) -> None:
+        with self._lock:
+            for bucket in self._buckets.values():
+                bucket.rate = requests_per_second
+                bucket.max_rate = requests_per_second
+
+    def get_buckets(self) -> dict[str, RateLimiterBucket]:
+        with self._lock:
+            return {name: replace(bucket) for name, bucket in self._buckets.items()}
+
+
+class SqliteRateLimiterStore(RateLimiterStore):
+    """Rate limiter buckets shared by all processes on a host.
+
+    Each bucket update runs in a BEGIN IMMEDIATE transaction, so concurrent
+    processes and threads serialize on the SQLite database file lock.
+    """
+
+    def __init__(self, sqlite3_db_name: str, timeout: float = 60) -> None:
+        self.sqlite3_db_name = sqlite3_db_name
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._transaction() as conn:
+            conn.execute(
+                f"create table if not exists {RATE_LIMITER_BUCKETS_TABLE} ("
+                "name text primary key, "
+                + ", ".join(
+                    f"{field.name} {SQLITE_COLUMN_TYPES[field.type]}"
+                    for field in fields(RateLimiterBucket)
+                )
+                + ")"
+            )
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if not hasattr(self._local, "conn"):
+            self._local.conn = sqlite3.connect(
+                self.sqlite3_db_name, timeout=self.timeout, isolation_level=None
+            )
+        return self._local.conn
+
+    @contextmanager
+    def _transaction(self) -> typing.Iterator[sqlite3.Connection]:
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @contextmanager
+    def update_bucket(
+        self, name: str, requests_per_second: float
+    ) -> typing.Iterator[RateLimiterBucket]:
+        with self._transaction() as conn:
+            row = conn.execute(
+                f"select * from {RATE_LIMITER_BUCKETS_TABLE} where name = ?", [name]
+            ).fetchone()
+            if row:
+                bucket = RateLimiterBucket(*row[1:])
+            else:
+                bucket = RateLimiterBucket(
+                    rate=requests_per_second,
+                    max_rate=requests_per_second,
+                )
+            values = astuple(bucket)
+            yield bucket
+            if row is None or astuple(bucket) != values:
+                conn.execute(
+                    f"insert or replace into {RATE_LIMITER_BUCKETS_TABLE} "
+                    f"values (?, {', '.join('?' for _ in values)})",
+                    [name, *astuple(bucket)],
+                )
+
+    def configure(self, requests_per_second: float) -> None:
+        # Other processes may be backing off, so the current rate is only capped
+        with self._transaction() as conn:
+            conn.execute(
+                f"update {RATE_LIMITER_BUCKETS_TABLE} "
+                "set max_rate = ?, rate = min(rate, ?)",
+                [requests_per_second, requests_per_second],
+            )
+
+    def get_buckets(self) -> dict[str, RateLimiterBucket]:
+        with self._transaction() as conn:
+            return {
+                row[0]: RateLimiterBucket(*row[1:])
+                for row in conn.execute(f"select * from {RATE_LIMITER_BUCKETS_TABLE}")
+            }
+
+
+class AdaptiveRateLimiter:
+    """Spaces calls per bucket at a rate that adapts to throttling.
+
+    Each bucket starts at the configured requests per second. A 429 response
+    halves the rate and pauses the bucket for the Retry-After duration before
+    the call is retried. Every successful call raises the rate again by a
+    fraction of the configured quota, up to that quota. State is kept in a
+    RateLimiterStore, shared by all threads, or by all processes on a host
+    with a SqliteRateLimiterStore.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+        max_retries: int = MAX_THROTTLED_RETRIES,
+        store: RateLimiterStore | None = None,
+    ) -> None:
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self._store = store or RateLimiterStore()
+
+    def configure(
+        self, requests_per_second: float, store: RateLimiterStore | None = None
+    ) -> None:
+        self.requests_per_second = requests_per_second
+        if store:
+            self._store = store
+        self._store.configure(requests_per_second)
+
+    def reserve(self, name: str) -> float:
+        """Reserve the next request slot and return the seconds to wait for it."""
+        with self._store.update_bucket(name, self.requests_per_second) as bucket:
+            now = time.time()
+            request_at = max(now, bucket.next_request_at)
+            bucket.next_request_at = request_at + 1 / bucket.rate
+            bucket.requests += 1
+            bucket.waited_seconds += request_at - now
+        return request_at - now
+
+    def acquire(self, name: str) -> None:
+        delay = self.reserve(name)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, name: str) -> None:
+        delay = self.reserve(name)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_success(self, name: str) -> None:
+        with self._store.update_bucket(name, self.requests_per_second) as bucket:
+            bucket.rate = min(
+                bucket.max_rate, bucket.rate + bucket.max_rate * RATE_INCREASE_FRACTION
+            )
+
+    def on_throttled(self, name: str, retry_after: float | None = None) -> None:
+        with self._store.update_bucket(name, self.requests_per_second) as bucket:
+            now = time.time()
+            bucket.throttled += 1
+            # Concurrent calls throttled together only decrease the rate once
+            if now - bucket.decreased_at >= RATE_DECREASE_INTERVAL_SECONDS:
+                bucket.rate = max(
+                    MIN_REQUESTS_PER_SECOND, bucket.rate * RATE_DECREASE_FACTOR
+                )
+                bucket.decreased_at = now
+            if retry_after is None:
+                retry_after = 1 / bucket.rate
+            bucket.next_request_at = max(bucket.next_request_at, now + retry_after)
+        logger.debug(
+            f"Dataplex API calls '{name}' throttled. Reduced rate to "
+            f"{bucket.rate:.2f} requests per second."
+        )
+
+    def ratelimit(self, name: str) -> typing.Callable:
+        def decorator(func: typing.Callable) -> typing.Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs) -> Response:
+                for _ in range(self.max_retries + 1):
+                    self.acquire(name)
+                    response = func(*args, **kwargs)
+                    if response.status_code != 429:
+                        self.on_success(name)
+                        return response
+                    self.on_throttled(name, get_retry_after_seconds(response))
+                return response
+
+            return wrapper
+
+        return decorator
+
+    def get_metrics(self) -> dict[str, dict]:
+        return {
+            name: asdict(bucket) for name, bucket in self._store.get_buckets().items()
+        }
@@ -15,10 +15,17 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
 from pathlib import Path
 
+import hashlib
+import json
 import logging
 import os
+import tempfile
+import threading
 
 from google.auth import impersonated_credentials
 from google.auth.credentials import Credentials
@@ -35,6 +42,13 @@ logger = logging.getLogger(__name__)
 TARGET_SCOPES = [
     "https://www.googleapis.com/auth/cloud-platform",
 ]
+# Tokens are refreshed this long before they expire
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+
+def _utcnow() -> datetime:
+    # google-auth compares naive UTC datetimes
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 
 @dataclass
@@ -49,7 +63,10 @@ class GcpCredentials:
         gcp_project_id: str = None,
         gcp_service_account_key_path: Path = None,
         gcp_impersonation_credentials: str = None,
+        token_cache_path: Path = None,
     ) -> None:
+        self._token_lock = threading.Lock()
+        self._token_cache_path = token_cache_path
         # Use Credentials object directly if provided
         if credentials:
             source_credentials = credentials
@@ -73,8 +90,6 @@ class GcpCredentials:
             source_credentials, _ = google.auth.default(
                 scopes=TARGET_SCOPES, quota_project_id=gcp_project_id
             )
-        if not source_credentials.valid:
-            self.__refresh_credentials(source_credentials)
         # Attempt service account impersonation if requested
         if gcp_impersonation_credentials:
             target_credentials = impersonated_credentials.Credentials(
@@ -90,7 +105,19 @@ class GcpCredentials:
         self.project_id = self.__resolve_project_id(
             credentials=self.credentials, project_id=gcp_project_id
         )
-        self.user_id = self.__resolve_credentials_username(credentials=self.credentials)
+        self._token_cache_key = self.__get_token_cache_key(
+            source_credentials=source_credentials,
+            gcp_project_id=gcp_project_id,
+            gcp_service_account_key_path=gcp_service_account_key_path,
+            gcp_impersonation_credentials=gcp_impersonation_credentials,
+        )
+        self.user_id = self.__load_cached_token()
+        if not self.user_id:
+            # Impersonated credentials refresh their source credentials on demand
+            self.user_id = self.__resolve_credentials_username(
+                credentials=self.credentials
+            )
+            self.__save_cached_token()
         if self.user_id:
             logger.info("Successfully created GCP Client.")
         else:
@@ -98,6 +125,107 @@ class GcpCredentials:
                 "Encountered error while retrieving user from GCP credentials.",
             )
 
+    def is_token_valid(
+        self,
+        expired_token: str | None = None,
+        min_lifetime_seconds: float = TOKEN_REFRESH_MARGIN_SECONDS,
+    ) -> bool:
+        credentials = self.credentials
+        if not credentials.valid or credentials.token == expired_token:
+            return False
+        return credentials.expiry is None or _utcnow() < (
+            credentials.expiry - timedelta(seconds=min_lifetime_seconds)
+        )
+
+    def get_token(
+        self,
+        expired_token: str | None = None,
+        min_lifetime_seconds: float = TOKEN_REFRESH_MARGIN_SECONDS,
+    ) -> str:
+        """Return an access token valid for at least min_lifetime_seconds.
+
+        The token is shared by every client using these credentials, and only
+        refreshed when it is about to expire or was rejected as expired_token.
+        """
+        with self._token_lock:
+            if not self.is_token_valid(expired_token, min_lifetime_seconds):
+                logger.debug("Refreshing GCP credentials.")
+                self.__refresh_credentials(self.credentials)
+                self.__save_cached_token()
+            return self.credentials.token
+
+    def __get_token_cache_key(
+        self,
+        source_credentials: Credentials,
+        gcp_project_id: str = None,
+        gcp_service_account_key_path: Path = None,
+        gcp_impersonation_credentials: str = None,
+    ) -> str:
+        # ADC user credentials share the client_id of gcloud, so their account
+        # is only identified by the refresh token
+        refresh_token = getattr(source_credentials, "refresh_token", None) or ""
+        source_credentials_id = [
+            type(source_credentials).__name__,
+            getattr(source_credentials, "service_account_email", None),
+            getattr(source_credentials, "client_id", None),
+            getattr(source_credentials, "account", None),
+            hashlib.sha256(refresh_token.encode()).hexdigest(),
+            str(gcp_service_account_key_path or ""),
+            os.environ.get("GOOGLE_APPLICATION_CREDENTIALS", ""),
+            gcp_project_id,
+            gcp_impersonation_credentials,
+            TARGET_SCOPES,
+        ]
+        return hashlib.sha256(
+            json.dumps(source_credentials_id, default=str).encode()
+        ).hexdigest()
+
+    def __read_token_cache(self) -> dict:
+        try:
+            with open(self._token_cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def __load_cached_token(self) -> str | None:
+        """Use a token persisted by a previous run. Returns its user_id."""
+        if not self._token_cache_path:
+            return None
+        cached_token = self.__read_token_cache().get(self._token_cache_key)
+        if not cached_token:
+            return None
+        expiry = datetime.fromisoformat(cached_token["expiry"])
+        if _utcnow() >= expiry - timedelta(seconds=TOKEN_REFRESH_MARGIN_SECONDS):
+            return None
+        self.credentials.token = cached_token["token"]
+        self.credentials.expiry = expiry
+        logger.debug(f"Using GCP access token cached in {self._token_cache_path}.")
+        return cached_token["user_id"]
+
+    def __save_cached_token(self) -> None:
+        if not self._token_cache_path or not self.credentials.expiry:
+            return
+        token_cache = self.__read_token_cache()
+        token_cache[self._token_cache_key] = {
+            "token": self.credentials.token,
+            "expiry": self.credentials.expiry.isoformat(),
+            "user_id": self.user_id,
+        }
+        # Tokens are secrets, so the cache file is only readable by its owner
+        token_cache_dir = Path(self._token_cache_path).absolute().parent
+        token_cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=token_cache_dir)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(token_cache, f)
+            os.replace(temp_path, self._token_cache_path)
+        except OSError:
+            os.unlink(temp_path)
+            logger.warning(
+                f"Could not write GCP token cache {self._token_cache_path}.",
+                exc_info=True,
+            )
+
     def __refresh_credentials(self, credentials: Credentials) -> str:
         # Attempt to refresh token if not currently valid
         try:
@@ -14,13 +14,24 @@
 
 from google.cloud import storage
 
+from clouddq.integration.gcp_credentials import GcpCredentials
+
 
 def upload_blob(
-    bucket_name: str, source_file_name: str, destination_blob_name: str
+    bucket_name: str,
+    source_file_name: str,
+    destination_blob_name: str,
+    gcp_credentials: GcpCredentials = None,
 ) -> None:
     """Uploads a file to the bucket."""
     destination_blob_name = str(destination_blob_name)
-    storage_client = storage.Client()
+    if gcp_credentials:
+        storage_client = storage.Client(
+            credentials=gcp_credentials.credentials,
+            project=gcp_credentials.project_id,
+        )
+    else:
+        storage_client = storage.Client()
     bucket = storage_client.get_bucket(bucket_name)
     blob = bucket.blob(destination_blob_name)
     blob.upload_from_filename(source_file_name)
@@ -15,39 +15,144 @@
 """todo: add lib docstring."""
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from pprint import pformat
 
+import functools
+import hashlib
 import itertools
 import json
 import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import time
 import typing
 
+from google.cloud import bigquery
+
 from clouddq.classes.dq_config_type import DqConfigType
+from clouddq.classes.dq_configs_cache import NUM_RULES_PER_TABLE
+from clouddq.classes.dq_configs_cache import RE_NON_ALPHANUMERIC
 from clouddq.classes.dq_configs_cache import DqConfigsCache
+from clouddq.classes.dq_metadata_cache import DqDryRunCacheEntry
+from clouddq.classes.dq_metadata_cache import DqMetadataCache
 from clouddq.classes.dq_rule import DqRule
 from clouddq.classes.dq_rule_binding import DqRuleBinding
 from clouddq.classes.metadata_registry_defaults import MetadataRegistryDefaults
 from clouddq.integration.bigquery.bigquery_client import BigQueryClient
+from clouddq.log import get_json_logger
+from clouddq.log import remove_cloud_logging_handlers
+from clouddq.utils import YAML_FAST_SAFE_LOADER
 from clouddq.utils import assert_not_none_or_empty
+from clouddq.utils import get_yaml_config_node
 from clouddq.utils import load_jinja_template
 from clouddq.utils import load_yaml
+from clouddq.utils import load_yaml_file
 from clouddq.utils import sha256_digest
 
 
 logger = logging.getLogger(__name__)
 
+RULE_BINDING_VIEWS_BATCH_SIZE = 20
+# The watermark literals of incremental rule bindings change on every run,
+# but they do not change whether the query is valid
+RE_SQL_WATERMARK_FILTER = re.compile(
+    r"(CAST\(d\.\w+ AS TIMESTAMP\)\s+BETWEEN) "
+    r"CAST\('[^']*' AS TIMESTAMP\) AND CAST\('[^']*' AS TIMESTAMP\)"
+)
+# Rules that select from the rule binding's own filtered 'data' CTE
+RE_DATA_CTE_REFERENCE = re.compile(r"\bfrom\s+data\b", re.IGNORECASE)
+# Arguments of create_rule_binding_view_model in each generation worker process
+_rule_binding_view_worker_kwargs: dict = {}
 
-def load_configs(configs_path: Path, configs_type: DqConfigType) -> dict:
 
+def get_configs_files(configs_path: Path) -> list[Path]:
     if configs_path.is_file():
-        yaml_files = [configs_path]
+        return [configs_path]
     else:
-        yaml_files = itertools.chain(
-            configs_path.glob("**/*.yaml"), configs_path.glob("**/*.yml")
+        return list(
+            itertools.chain(
+                configs_path.glob("**/*.yaml"), configs_path.glob("**/*.yml")
+            )
         )
+
+
+def load_configs_file(
+    file: Path, fast_loader: bool = False
+) -> dict[DqConfigType, dict | list]:
+    """Parse a YAML configs file once and extract the nodes of every config type."""
+    if fast_loader:
+        yaml_configs = load_yaml_file(file, loader=YAML_FAST_SAFE_LOADER)
+    else:
+        yaml_configs = load_yaml_file(file)
+    file_configs = {}
+    for configs_type in DqConfigType:
+        config = get_yaml_config_node(yaml_configs, configs_type.value, file)
+        if config:
+            file_configs[configs_type] = config
+    return file_configs
+
+
+def parse_configs_files(
+    configs_files: list[Path], num_workers: int = 1
+) -> list[dict[DqConfigType, dict | list]]:
+    """Parse configs_files, returning their configs in the same order as the input.
+
+    If num_workers is greater than 1, files are parsed in a process pool
+    using the libyaml C loader when available.
+    """
+    if num_workers > 1 and len(configs_files) > 1:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            return list(
+                executor.map(
+                    functools.partial(load_configs_file, fast_loader=True),
+                    configs_files,
+                    chunksize=max(1, len(configs_files) // (num_workers * 4)),
+                )
+            )
+    else:
+        return [load_configs_file(file) for file in configs_files]
+
+
+def merge_configs_files(
+    files_configs: typing.Iterable[dict[DqConfigType, dict | list]],
+    configs_path: Path,
+) -> dict[DqConfigType, dict | list]:
+    all_configs = {configs_type: {} for configs_type in DqConfigType}
+    for file_configs in files_configs:
+        for configs_type, config in file_configs.items():
+            all_configs[configs_type] = DqConfigsCache.update_config(
+                configs_type, all_configs[configs_type], config
+            )
+    for configs_type, configs in all_configs.items():
+        if configs_type.is_required():
+            assert_not_none_or_empty(
+                configs,
+                f"Failed to load {configs_type.value} from file path: {configs_path}",
+            )
+    return all_configs
+
+
+def load_all_configs(
+    configs_path: Path, num_workers: int = 1
+) -> dict[DqConfigType, dict | list]:
+    """Load every config type from configs_path, parsing each YAML file once.
+
+    Parsed files are merged in the same order as the serial loader
+    regardless of which worker finishes first.
+    """
+    files_configs = parse_configs_files(get_configs_files(configs_path), num_workers)
+    return merge_configs_files(files_configs, configs_path)
+
+
+def load_configs(configs_path: Path, configs_type: DqConfigType) -> dict:
+
     all_configs = {}
-    for file in yaml_files:
+    for file in get_configs_files(configs_path):
         config = load_yaml(file, configs_type.value)
         if not config:
             continue
@@ -89,8 +194,12 @@ def load_reference_columns_config(configs_path: Path) -> dict:
 
 def load_metadata_registry_default_configs(
     configs_path: Path,
+    all_configs: dict[DqConfigType, dict | list] | None = None,
 ) -> MetadataRegistryDefaults:
-    configs = load_configs(configs_path, DqConfigType.METADATA_REGISTRY_DEFAULTS)
+    if all_configs is None:
+        configs = load_configs(configs_path, DqConfigType.METADATA_REGISTRY_DEFAULTS)
+    else:
+        configs = all_configs[DqConfigType.METADATA_REGISTRY_DEFAULTS]
     try:
         return MetadataRegistryDefaults.from_dict(configs)
     except ValueError as e:
@@ -111,7 +220,9 @@ def create_rule_binding_view_model(
     progress_watermark: bool = True,
     default_configs: dict | None = None,
     high_watermark_filter_exists: bool = False,
+    high_watermark_values: dict[str, dict] | None = None,
 ) -> dict:
+    start = time.perf_counter()
     template = load_jinja_template(
         template_path=Path("dbt", "macros", "create_rule_binding_view.sql")
     )
@@ -130,6 +241,7 @@ def create_rule_binding_view_model(
         dq_summary_table_exists=dq_summary_table_exists,
         high_watermark_filter_exists=high_watermark_filter_exists,
         bigquery_client=bigquery_client,
+        high_watermark_values=high_watermark_values,
     )
     rule_configs_dict = configs.get("configs").get("rule_configs_dict")
     generated_sql_string_dict = dict()
@@ -146,6 +258,10 @@ def create_rule_binding_view_model(
     generated_sql_string_dict[f"{rule_binding_id}_generated_sql_string"] = sql_string
 
     configs.update({"generated_sql_string_dict": generated_sql_string_dict})
+    logger.debug(
+        f"Generated SQL for rule binding {rule_binding_id} in "
+        f"{(time.perf_counter() - start) * 1000:.1f} ms."
+    )
     if debug:
         logger.debug(
             f"Prepared json configs for {rule_binding_id}:\n{pformat(configs)}"
@@ -182,11 +298,358 @@ def create_entity_summary_model(
     return sql_string
 
 
+def get_rule_binding_table_names(configs: dict) -> tuple[str, str, str]:
+    """Instance, database and table name of a rule binding after the
+    environment override, as used in create_rule_binding_view."""
+    entity_configs = configs["configs"]["entity_configs"]
+    table_names = {
+        "instance_name": entity_configs.get("instance_name"),
+        "database_name": entity_configs.get("database_name"),
+        "table_name": entity_configs.get("table_name"),
+    }
+    environment = configs.get("environment")
+    env_override = entity_configs.get("environment_override")
+    if environment and env_override and env_override.get(environment.lower()):
+        override_values = env_override.get(environment.lower())
+        for key in table_names:
+            if override_values.get(key):
+                table_names[key] = override_values.get(key)
+    return (
+        table_names["instance_name"],
+        table_names["database_name"],
+        table_names["table_name"],
+    )
+
+
+def is_fused_entity_scan_supported(configs: dict) -> bool:
+    for rule_configs in configs["configs"]["rule_configs_dict"].values():
+        if rule_configs.get("rule_type") == "CUSTOM_SQL_STATEMENT":
+            return False
+        if RE_DATA_CTE_REFERENCE.search(rule_configs.get("rule_sql_expr") or ""):
+            return False
+    return True
+
+
+def plan_fused_entity_models(
+    rule_binding_configs: dict[str, dict],
+) -> tuple[dict[str, list[str]], list[str]]:
+    """Group rule bindings that can be validated with one scan of their table.
+
+    rule_binding_configs are the create_rule_binding_view_model outputs keyed
+    by rule binding ID. Rule bindings are grouped if they read the same table
+    with the same incremental window and partition filters, up to
+    NUM_RULES_PER_TABLE rules per group. Their row filters are evaluated as
+    predicates in the shared scan. Returns the rule binding IDs of each fused
+    model and the IDs of the rule bindings that cannot be fused.
+    """
+    groups: dict[tuple, list[list[str]]] = {}
+    num_batch_rules: dict[tuple, int] = {}
+    unfused_rule_binding_ids = []
+    for rule_binding_id, configs in rule_binding_configs.items():
+        if not is_fused_entity_scan_supported(configs):
+            unfused_rule_binding_ids.append(rule_binding_id)
+            continue
+        resolved_configs = configs["configs"]
+        incremental_time_filter_column = resolved_configs.get(
+            "incremental_time_filter_column"
+        )
+        group_key = (
+            get_rule_binding_table_names(configs),
+            incremental_time_filter_column,
+            (
+                str(configs.get("high_watermark_value"))
+                if incremental_time_filter_column
+                else None
+            ),
+            (
+                str(configs.get("current_timestamp_value"))
+                if incremental_time_filter_column
+                else None
+            ),
+            tuple(
+                field["name"]
+                for field in resolved_configs["entity_configs"].get("partition_fields")
+                or []
+            ),
+        )
+        num_rules = len(resolved_configs["rule_configs_dict"])
+        group_batches = groups.setdefault(group_key, [])
+        if (
+            not group_batches
+            or num_batch_rules[group_key] + num_rules > NUM_RULES_PER_TABLE
+        ):
+            group_batches.append([])
+            num_batch_rules[group_key] = 0
+        num_batch_rules[group_key] += num_rules
+        group_batches[-1].append(rule_binding_id)
+    fused_models = {}
+    for group_key, group_batches in groups.items():
+        model_id = re.sub(RE_NON_ALPHANUMERIC, "_", "__".join(group_key[0]))
+        if len(model_id) > 1000:
+            model_id = model_id[-1000:]
+        model_index = 1
+        while f"{model_id}__fused_{model_index}" in fused_models:
+            model_index += 1
+        for batch in group_batches:
+            fused_models[f"{model_id}__fused_{model_index}"] = batch
+            model_index += 1
+    logger.debug(
+        f"Fused entity models:\n{pformat(fused_models)}\n"
+        f"Rule bindings without fused entity scans: {unfused_rule_binding_ids}"
+    )
+    return fused_models, unfused_rule_binding_ids
+
+
+def create_entity_fused_summary_model(
+    model_id: str,
+    rule_binding_configs: list[dict],
+    debug: bool = False,
+) -> str:
+    """DQ summary of a plan_fused_entity_models group from a single table scan.
+
+    Returns the same columns as create_entity_summary_model.
+    """
+    template = load_jinja_template(
+        template_path=Path("dbt", "macros", "create_entity_fused_dq_summary.sql")
+    )
+    instance_name, database_name, table_name = get_rule_binding_table_names(
+        rule_binding_configs[0]
+    )
+    sql_string = template.render(
+        {
+            "rule_bindings": rule_binding_configs,
+            "instance_name": instance_name,
+            "database_name": database_name,
+            "table_name": table_name,
+        }
+    )
+    if debug:
+        logger.debug(f"Generated sql for fused entity model {model_id}:\n{sql_string}")
+    return sql_string
+
+
 def write_sql_string_as_dbt_model(
     model_id: str, sql_string: str, dbt_model_path: Path
 ) -> None:
-    with open(dbt_model_path / f"{model_id}.sql", "w") as f:
-        f.write(sql_string.strip())
+    # Write to a temporary file and rename it, so that dbt never reads a
+    # partially written model
+    fd, temp_path = tempfile.mkstemp(
+        dir=dbt_model_path, prefix=f".{model_id}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(sql_string.strip())
+        os.replace(temp_path, dbt_model_path / f"{model_id}.sql")
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _init_rule_binding_view_worker(
+    configs_cache_path: str,
+    bigquery_client: BigQueryClient,
+    model_kwargs: dict,
+) -> None:
+    # The forked worker must not share the parent's SQLite or HTTP connections
+    bigquery_client.get_connection(new=True)
+    remove_cloud_logging_handlers(get_json_logger())
+    _rule_binding_view_worker_kwargs.update(
+        configs_cache=DqConfigsCache(
+            sqlite3_db_name=configs_cache_path, read_only=True
+        ),
+        bigquery_client=bigquery_client,
+        **model_kwargs,
+    )
+
+
+def _write_rule_binding_view_models(
+    rule_bindings: list[tuple[str, dict]],
+    dbt_model_path: Path,
+    model_kwargs: dict | None = None,
+) -> list[tuple[str, dict]]:
+    if model_kwargs is None:
+        model_kwargs = _rule_binding_view_worker_kwargs
+    rule_binding_views_configs = []
+    for rule_binding_id, rule_binding_configs in rule_bindings:
+        configs = create_rule_binding_view_model(
+            rule_binding_id=rule_binding_id,
+            rule_binding_configs=rule_binding_configs,
+            **model_kwargs,
+        )
+        sql_string = configs["generated_sql_string_dict"][
+            f"{rule_binding_id}_generated_sql_string"
+        ]
+        logger.debug(
+            f"*** Writing sql to {dbt_model_path.absolute()}/{rule_binding_id}.sql"
+        )
+        write_sql_string_as_dbt_model(
+            model_id=rule_binding_id,
+            sql_string=sql_string,
+            dbt_model_path=dbt_model_path,
+        )
+        rule_binding_views_configs.append((rule_binding_id, configs))
+    return rule_binding_views_configs
+
+
+def write_rule_binding_view_models(
+    rule_bindings: dict[str, dict],
+    dbt_model_path: Path,
+    configs_cache: DqConfigsCache,
+    bigquery_client: BigQueryClient,
+    generation_workers: int = 1,
+    **model_kwargs,
+) -> typing.Iterator[tuple[str, dict]]:
+    """Generate and write the dbt model of each rule binding.
+
+    Yields the rule binding IDs and create_rule_binding_view_model outputs in
+    the order of rule_bindings, once their model file is written. With
+    generation_workers > 1, the models are generated in forked worker
+    processes, each with a read-only handle on the configs cache and its own
+    BigQuery connection.
+    """
+    model_kwargs.update(configs_cache=configs_cache, bigquery_client=bigquery_client)
+    rule_bindings = list(rule_bindings.items())
+    if generation_workers <= 1 or len(rule_bindings) <= 1:
+        for rule_binding in rule_bindings:
+            yield from _write_rule_binding_view_models(
+                [rule_binding], dbt_model_path, model_kwargs
+            )
+        return
+    if "fork" not in multiprocessing.get_all_start_methods():
+        raise ValueError(
+            "Parallel SQL generation requires the 'fork' process start method, "
+            "which is not available on this platform."
+        )
+    model_kwargs.pop("configs_cache")
+    model_kwargs.pop("bigquery_client")
+    executor = ProcessPoolExecutor(
+        max_workers=generation_workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_rule_binding_view_worker,
+        initargs=(configs_cache.sqlite3_db_name, bigquery_client, model_kwargs),
+    )
+    futures = [
+        executor.submit(
+            _write_rule_binding_view_models,
+            rule_bindings[i : i + RULE_BINDING_VIEWS_BATCH_SIZE],
+            dbt_model_path,
+        )
+        for i in range(0, len(rule_bindings), RULE_BINDING_VIEWS_BATCH_SIZE)
+    ]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def get_sql_fingerprint(sql_string: str, user_id: str | None = None) -> str:
+    normalized_sql_string = RE_SQL_WATERMARK_FILTER.sub(
+        r"\1 CAST(NULL AS TIMESTAMP) AND CAST(NULL AS TIMESTAMP)", sql_string.strip()
+    )
+    return sha256_digest(f"{user_id}\n{normalized_sql_string}")
+
+
+def _get_table_schema_versions(
+    tables: typing.Iterable[str], bigquery_client: BigQueryClient, num_threads: int
+) -> dict[str, str | None]:
+    def get_table_schema_version(table: str) -> str | None:
+        try:
+            return bigquery_client.get_table_schema_version(table)
+        except Exception as error:
+            logger.debug(f"Failed to get schema version of table {table}: {error}")
+            return None
+
+    tables = sorted(set(tables))
+    with ThreadPoolExecutor(max_workers=max(1, num_threads)) as executor:
+        return dict(zip(tables, executor.map(get_table_schema_version, tables)))
+
+
+def check_sql_strings_dry_run(
+    sql_strings: dict[str, str],
+    bigquery_client: BigQueryClient,
+    num_threads: int = 1,
+    metadata_cache: DqMetadataCache | None = None,
+    user_id: str | None = None,
+) -> dict[str, int | None]:
+    """Validate SQL strings with BigQuery dry-runs.
+
+    Returns the bytes each SQL string would process, keyed like sql_strings.
+    With a metadata_cache, a SQL string that passed a dry-run for the same
+    user_id within the cache TTL is not sent to BigQuery again, unless the
+    schema of a table it references changed since.
+    """
+    sql_fingerprints = {
+        sql_id: get_sql_fingerprint(sql_string, user_id=user_id)
+        for sql_id, sql_string in sql_strings.items()
+    }
+    cached_entries = {}
+    if metadata_cache:
+        cached_entries = metadata_cache.get_dry_run_entries(sql_fingerprints.values())
+    table_versions = _get_table_schema_versions(
+        itertools.chain.from_iterable(
+            entry.referenced_tables for entry in cached_entries.values()
+        ),
+        bigquery_client=bigquery_client,
+        num_threads=num_threads,
+    )
+    total_bytes_processed = {}
+    dry_run_sql_strings = {}
+    for sql_id, sql_fingerprint in sql_fingerprints.items():
+        cached_entry = cached_entries.get(sql_fingerprint)
+        if cached_entry and all(
+            table_versions[table] == version
+            for table, version in cached_entry.referenced_tables.items()
+        ):
+            total_bytes_processed[sql_id] = cached_entry.total_bytes_processed
+        else:
+            dry_run_sql_strings[sql_id] = sql_strings[sql_id]
+    logger.debug(
+        f"Found {len(total_bytes_processed)} of {len(sql_strings)} SQL strings "
+        "in dry-run cache."
+    )
+    query_jobs = bigquery_client.check_queries_dry_run(
+        queries=dry_run_sql_strings, num_threads=num_threads
+    )
+    referenced_tables = {
+        sql_id: [
+            f"{table_ref.project}.{table_ref.dataset_id}.{table_ref.table_id}"
+            for table_ref in query_job.referenced_tables
+        ]
+        for sql_id, query_job in query_jobs.items()
+        if query_job is not None
+    }
+    table_versions = _get_table_schema_versions(
+        itertools.chain.from_iterable(referenced_tables.values()),
+        bigquery_client=bigquery_client,
+        num_threads=num_threads,
+    )
+    validated_at = time.time()
+    dry_run_entries = []
+    for sql_id, query_job in query_jobs.items():
+        total_bytes_processed[sql_id] = (
+            query_job.total_bytes_processed if query_job else None
+        )
+        # Queries referencing tables without a schema version are not cached
+        if sql_id in referenced_tables and all(
+            table_versions[table] for table in referenced_tables[sql_id]
+        ):
+            dry_run_entries.append(
+                DqDryRunCacheEntry(
+                    sql_fingerprint=sql_fingerprints[sql_id],
+                    referenced_tables={
+                        table: table_versions[table]
+                        for table in referenced_tables[sql_id]
+                    },
+                    total_bytes_processed=total_bytes_processed[sql_id],
+                    validated_at=validated_at,
+                )
+            )
+    if metadata_cache:
+        metadata_cache.upsert_dry_run_entries(dry_run_entries)
+    return {sql_id: total_bytes_processed[sql_id] for sql_id in sql_strings}
 
 
 def prepare_configs_from_rule_binding_id(
@@ -201,6 +664,7 @@ def prepare_configs_from_rule_binding_id(
     progress_watermark: bool = True,
     default_configs: dict | None = None,
     high_watermark_filter_exists: bool = False,
+    high_watermark_values: dict[str, dict] | None = None,
 ) -> dict:
     rule_binding = DqRuleBinding.from_dict(
         rule_binding_id, rule_binding_configs, default_configs
@@ -232,45 +696,303 @@ def prepare_configs_from_rule_binding_id(
     logger.debug(f"Incremental time filter column {incremental_time_filter_column}")
     if incremental_time_filter_column:
         high_watermark_filter_exists = True
-        fully_qualified_table_name = (
-            f"{configs['configs']['entity_configs']['project_name']}."
-            f"{configs['configs']['entity_configs']['dataset_name']}."
-            f"{configs['configs']['entity_configs']['table_name']}"
-        )
-        high_watermark_dict = get_high_watermark_value(
-            fully_qualified_table_name=fully_qualified_table_name,
-            rule_binding_id=rule_binding_id,
-            dq_summary_table_name=dq_summary_table_name,
-            bigquery_client=bigquery_client,
-            dq_summary_table_exists=dq_summary_table_exists,
-        )
+        if high_watermark_values and rule_binding_id in high_watermark_values:
+            high_watermark_dict = high_watermark_values[rule_binding_id]
+        else:
+            fully_qualified_table_name = (
+                f"{configs['configs']['entity_configs']['project_name']}."
+                f"{configs['configs']['entity_configs']['dataset_name']}."
+                f"{configs['configs']['entity_configs']['table_name']}"
+            )
+            high_watermark_dict = get_high_watermark_value(
+                fully_qualified_table_name=fully_qualified_table_name,
+                rule_binding_id=rule_binding_id,
+                dq_summary_table_name=dq_summary_table_name,
+                bigquery_client=bigquery_client,
+                dq_summary_table_exists=dq_summary_table_exists,
+            )
         configs.update(high_watermark_dict)
     configs.update({"high_watermark_filter_exists": high_watermark_filter_exists})
     return configs
 
 
-def prepare_configs_cache(configs_path: Path) -> DqConfigsCache:
-    configs_cache = DqConfigsCache()
-    entities_collection = load_entities_config(configs_path)
+def load_configs_to_cache(
+    configs_cache: DqConfigsCache,
+    all_configs: dict[DqConfigType, dict | list],
+    rule_dimensions_collection: list | None = None,
+) -> None:
+    if rule_dimensions_collection is None:
+        rule_dimensions_collection = all_configs[DqConfigType.RULE_DIMENSIONS]
+    entities_collection = all_configs[DqConfigType.ENTITIES]
     configs_cache.load_all_entities_collection(entities_collection)
-    row_filters_collection = load_row_filters_config(configs_path)
+    row_filters_collection = all_configs[DqConfigType.ROW_FILTERS]
     configs_cache.load_all_row_filters_collection(row_filters_collection)
-    reference_columns_collection = load_reference_columns_config(configs_path)
+    reference_columns_collection = all_configs[DqConfigType.REFERENCE_COLUMNS]
     configs_cache.load_all_reference_columns_collection(reference_columns_collection)
-    rule_dimensions_collection = load_rule_dimensions_config(configs_path)
-    configs_cache.load_all_rule_dimensions_collection(rule_dimensions_collection)
-    rules_collection = load_rules_config(configs_path)
+    configs_cache.load_all_rule_dimensions_collection(
+        all_configs[DqConfigType.RULE_DIMENSIONS]
+    )
+    rules_collection = all_configs[DqConfigType.RULES]
 
     # validate rules against dimensions
     for rule_id, rule in rules_collection.items():
         DqRule.validate(rule_id, rule, rule_dimensions_collection)
 
     configs_cache.load_all_rules_collection(rules_collection)
-    rule_binding_collection = load_rule_bindings_config(configs_path)
+    rule_binding_collection = all_configs[DqConfigType.RULE_BINDINGS]
     configs_cache.load_all_rule_bindings_collection(rule_binding_collection)
+
+
+def prepare_configs_cache(
+    configs_path: Path,
+    all_configs: dict[DqConfigType, dict | list] | None = None,
+) -> DqConfigsCache:
+    if all_configs is None:
+        all_configs = load_all_configs(configs_path)
+    configs_cache = DqConfigsCache()
+    load_configs_to_cache(configs_cache, all_configs)
     return configs_cache
 
 
+def sync_configs_source_files(
+    configs_cache: DqConfigsCache,
+    configs_files: list[Path],
+    num_workers: int = 1,
+) -> tuple[list[str], dict[str, dict], list[str]]:
+    """Compare configs_files against the source files recorded in configs_cache.
+
+    Returns the paths of unchanged files, the stat records and parsed configs
+    of new or changed files keyed by path, and the paths of removed files.
+    """
+    source_files = configs_cache.get_configs_source_files()
+    unchanged_files = []
+    stale_files = []
+    stale_files_records = {}
+    for file in configs_files:
+        path = str(file.absolute())
+        file_stat = file.stat()
+        record = {
+            "path": path,
+            "mtime_ns": file_stat.st_mtime_ns,
+            "size": file_stat.st_size,
+        }
+        previous_record = source_files.get(path)
+        if previous_record and all(
+            previous_record[key] == record[key] for key in ("mtime_ns", "size")
+        ):
+            unchanged_files.append(path)
+            continue
+        record["sha256"] = hashlib.sha256(file.read_bytes()).hexdigest()
+        if previous_record and previous_record["sha256"] == record["sha256"]:
+            # Touched but identical content: only record the new mtime.
+            configs_cache.update_configs_source_file_stat(record)
+            unchanged_files.append(path)
+        else:
+            stale_files.append(file)
+            stale_files_records[path] = record
+    removed_files = sorted(
+        source_files.keys() - {str(file.absolute()) for file in configs_files}
+    )
+    # Round-trip the new configs through JSON so that they compare equal
+    # to the configs loaded back from the cache.
+    for file, configs in zip(
+        stale_files, parse_configs_files(stale_files, num_workers)
+    ):
+        stale_files_records[str(file.absolute())]["configs"] = json.loads(
+            json.dumps(
+                {
+                    configs_type.value: config
+                    for configs_type, config in configs.items()
+                },
+                default=str,
+            )
+        )
+    return unchanged_files, stale_files_records, removed_files
+
+
+def refresh_configs_cache(
+    configs_cache: DqConfigsCache,
+    configs_path: Path,
+    num_workers: int = 1,
+) -> dict[DqConfigType, dict | list]:
+    """Incrementally refresh a persistent configs cache from configs_path.
+
+    Only files whose mtime, size and content hash changed since the last
+    refresh are parsed again. Config IDs that changed or whose source files
+    were removed are re-ingested into or deleted from the cache, and the
+    merged configs of the whole tree are returned.
+    """
+    configs_files = get_configs_files(configs_path)
+    unchanged_files, stale_files, removed_files = sync_configs_source_files(
+        configs_cache, configs_files, num_workers
+    )
+    configs_snapshot = configs_cache.get_configs_snapshot()
+    if configs_snapshot is not None and not stale_files and not removed_files:
+        logger.debug(f"Configs cache is up-to-date with {configs_path}.")
+        return configs_snapshot
+    logger.info(
+        f"Refreshing configs cache with {len(stale_files)} changed and "
+        f"{len(removed_files)} removed configs files from {configs_path}."
+    )
+    stale_files_configs = {
+        path: record["configs"] for path, record in stale_files.items()
+    }
+    unchanged_files_configs = configs_cache.get_configs_source_files_configs(
+        unchanged_files
+    )
+    files_configs = []
+    for file in configs_files:
+        path = str(file.absolute())
+        file_configs = stale_files_configs.get(path, unchanged_files_configs.get(path))
+        files_configs.append(
+            {DqConfigType(key): config for key, config in file_configs.items()}
+        )
+    all_configs = merge_configs_files(files_configs, configs_path)
+    if configs_snapshot is None:
+        configs_cache.delete_all_configs()
+        load_configs_to_cache(configs_cache, all_configs)
+    else:
+        changed_configs = {}
+        for configs_type in DqConfigType:
+            if configs_type in (
+                DqConfigType.RULE_DIMENSIONS,
+                DqConfigType.METADATA_REGISTRY_DEFAULTS,
+            ):
+                continue
+            old_configs = configs_snapshot[configs_type]
+            new_configs = all_configs[configs_type]
+            deleted_ids = [
+                config_id
+                for config_id, config in old_configs.items()
+                if new_configs.get(config_id) != config
+            ]
+            configs_cache.delete_config_ids(configs_type, deleted_ids)
+            changed_configs[configs_type] = {
+                config_id: config
+                for config_id, config in new_configs.items()
+                if old_configs.get(config_id) != config
+            }
+        rule_dimensions_collection = all_configs[DqConfigType.RULE_DIMENSIONS]
+        if sorted(rule_dimensions_collection) != sorted(
+            configs_snapshot[DqConfigType.RULE_DIMENSIONS]
+        ):
+            # Re-validate all rules against the new rule dimensions.
+            configs_cache.delete_all_configs(DqConfigType.RULE_DIMENSIONS)
+            changed_configs[DqConfigType.RULE_DIMENSIONS] = rule_dimensions_collection
+            for rule_id, rule in all_configs[DqConfigType.RULES].items():
+                DqRule.validate(rule_id, rule, rule_dimensions_collection)
+        else:
+            changed_configs[DqConfigType.RULE_DIMENSIONS] = []
+        logger.debug(
+            "Re-ingesting configs into cache: "
+            f"{ {key.value: len(value) for key, value in changed_configs.items()} }"
+        )
+        load_configs_to_cache(
+            configs_cache,
+            changed_configs,
+            rule_dimensions_collection=rule_dimensions_collection,
+        )
+    configs_cache.delete_configs_source_files(removed_files)
+    configs_cache.upsert_configs_source_files(stale_files.values())
+    configs_cache.update_configs_snapshot(all_configs)
+    return all_configs
+
+
+def get_rule_bindings_references(
+    rule_bindings: dict,
+) -> dict[DqConfigType, set[str]]:
+    """Collect the config IDs referenced by rule_bindings, keyed by config type."""
+    references = {
+        DqConfigType.ENTITIES: set(),
+        DqConfigType.ROW_FILTERS: set(),
+        DqConfigType.REFERENCE_COLUMNS: set(),
+        DqConfigType.RULES: set(),
+    }
+    for rule_binding in rule_bindings.values():
+        if rule_binding.get("entity_id"):
+            references[DqConfigType.ENTITIES].add(rule_binding["entity_id"].upper())
+        if rule_binding.get("row_filter_id"):
+            references[DqConfigType.ROW_FILTERS].add(
+                rule_binding["row_filter_id"].upper()
+            )
+        if rule_binding.get("reference_columns_id"):
+            references[DqConfigType.REFERENCE_COLUMNS].add(
+                rule_binding["reference_columns_id"].upper()
+            )
+        for rule in rule_binding.get("rule_ids") or []:
+            rule_ids = rule.keys() if isinstance(rule, dict) else [rule]
+            references[DqConfigType.RULES].update(
+                str(rule_id).upper() for rule_id in rule_ids
+            )
+    return references
+
+
+def prepare_target_configs_cache(
+    configs_cache: DqConfigsCache,
+    configs_path: Path,
+    target_rule_binding_ids: list[str],
+    num_workers: int = 1,
+) -> dict[DqConfigType, dict | list]:
+    """Load only target_rule_binding_ids and the configs they reference.
+
+    Source files are located through the config ID reverse index, so with a
+    persistent configs_cache only new or changed files are parsed. All rule
+    dimensions and metadata registry defaults are always loaded.
+    """
+    configs_files = get_configs_files(configs_path)
+    _, stale_files, removed_files = sync_configs_source_files(
+        configs_cache, configs_files, num_workers
+    )
+    configs_cache.delete_configs_source_files(removed_files)
+    configs_cache.upsert_configs_source_files(stale_files.values())
+
+    def get_configs(
+        configs_type: DqConfigType, config_ids: set[str] | None = None
+    ) -> dict | list:
+        paths = configs_cache.get_configs_source_paths(configs_type, config_ids)
+        files_configs = configs_cache.get_configs_source_files_configs(paths)
+        configs = {}
+        for path in paths:
+            file_configs = files_configs[path].get(configs_type.value)
+            if config_ids is not None:
+                file_configs = {
+                    config_id: config
+                    for config_id, config in file_configs.items()
+                    if config_id.upper() in config_ids
+                }
+            configs = DqConfigsCache.update_config(configs_type, configs, file_configs)
+        return configs
+
+    target_rule_binding_ids = {
+        rule_binding_id.upper() for rule_binding_id in target_rule_binding_ids
+    }
+    target_configs = {configs_type: {} for configs_type in DqConfigType}
+    rule_bindings = get_configs(DqConfigType.RULE_BINDINGS, target_rule_binding_ids)
+    missing_rule_binding_ids = target_rule_binding_ids - rule_bindings.keys()
+    if missing_rule_binding_ids:
+        raise ValueError(
+            f"Target Rule Binding IDs: {sorted(missing_rule_binding_ids)} "
+            f"not found in configs path: {configs_path}"
+        )
+    target_configs[DqConfigType.RULE_BINDINGS] = rule_bindings
+    for configs_type, config_ids in get_rule_bindings_references(rule_bindings).items():
+        target_configs[configs_type] = get_configs(configs_type, config_ids)
+    for configs_type in (
+        DqConfigType.RULE_DIMENSIONS,
+        DqConfigType.METADATA_REGISTRY_DEFAULTS,
+    ):
+        target_configs[configs_type] = get_configs(configs_type)
+    logger.info(
+        "Loading target configs into cache: "
+        f"{ {key.value: len(value) for key, value in target_configs.items()} }"
+    )
+    # The config tables no longer mirror the whole configs tree.
+    configs_cache.delete_configs_snapshot()
+    configs_cache.delete_all_configs()
+    load_configs_to_cache(configs_cache, target_configs)
+    return target_configs
+
+
 def get_high_watermark_value(
     fully_qualified_table_name: str,
     rule_binding_id: str,
@@ -304,3 +1026,105 @@ def get_high_watermark_value(
         "current_timestamp_value": current_timestamp_value,
     }
     return out_dict
+
+
+def get_high_watermark_values(
+    rule_bindings: dict[str, dict],
+    configs_cache: DqConfigsCache,
+    dq_summary_table_name: str,
+    bigquery_client: BigQueryClient,
+    dq_summary_table_exists: bool = False,
+    default_configs: dict | None = None,
+    watermark_table_name: str | None = None,
+) -> dict[str, dict]:
+    """High watermarks of all incremental rule bindings with a single query.
+
+    Returns the get_high_watermark_value output keyed by rule binding ID,
+    for use as high_watermark_values in create_rule_binding_view_model.
+    With a watermark_table_name, the high watermarks are read from that
+    WatermarkTable instead of the dq_summary history.
+    """
+    rule_binding_tables = {}
+    for rule_binding_id, rule_binding_configs in rule_bindings.items():
+        rule_binding = DqRuleBinding.from_dict(
+            rule_binding_id, rule_binding_configs, default_configs
+        )
+        if not rule_binding.incremental_time_filter_column_id:
+            continue
+        table_entity = rule_binding.resolve_table_entity_config(configs_cache)
+        rule_binding_tables[rule_binding_id] = (
+            f"{table_entity.instance_name}."
+            f"{table_entity.database_name}."
+            f"{table_entity.table_name}"
+        )
+    if not rule_binding_tables:
+        return {}
+    if dq_summary_table_exists and watermark_table_name:
+        query = f"""SELECT
+            targets.rule_binding_id,
+            IFNULL(
+                MAX(watermarks.high_watermark), TIMESTAMP("1970-01-01 00:00:00")
+            ) as high_watermark,
+            CURRENT_TIMESTAMP() as current_timestamp_value,
+            FROM UNNEST(@targets) AS targets
+            LEFT JOIN `{watermark_table_name}` AS watermarks
+            ON watermarks.table_id = targets.table_id
+            AND watermarks.rule_binding_id = targets.rule_binding_id
+            GROUP BY targets.rule_binding_id ;"""
+    elif dq_summary_table_exists:
+        query = f"""SELECT
+            targets.rule_binding_id,
+            IFNULL(
+                MAX(dq_summary.execution_ts), TIMESTAMP("1970-01-01 00:00:00")
+            ) as high_watermark,
+            CURRENT_TIMESTAMP() as current_timestamp_value,
+            FROM UNNEST(@targets) AS targets
+            LEFT JOIN `{dq_summary_table_name}` AS dq_summary
+            ON dq_summary.table_id = targets.table_id
+            AND dq_summary.rule_binding_id = targets.rule_binding_id
+            AND dq_summary.progress_watermark IS TRUE
+            GROUP BY targets.rule_binding_id ;"""
+    else:
+        query = """SELECT
+            targets.rule_binding_id,
+            TIMESTAMP("1970-01-01 00:00:00") as high_watermark,
+            CURRENT_TIMESTAMP() as current_timestamp_value,
+            FROM UNNEST(@targets) AS targets ;"""
+    logger.info(
+        f"High watermark query for {len(rule_binding_tables)} rule bindings "
+        f"is \n {query}"
+    )
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[
+            bigquery.ArrayQueryParameter(
+                "targets",
+                "STRUCT",
+                [
+                    bigquery.StructQueryParameter(
+                        None,
+                        bigquery.ScalarQueryParameter(
+                            "rule_binding_id", "STRING", rule_binding_id
+                        ),
+                        bigquery.ScalarQueryParameter("table_id", "STRING", table_id),
+                    )
+                    for rule_binding_id, table_id in rule_binding_tables.items()
+                ],
+            )
+        ],
+        use_query_cache=False,
+        use_legacy_sql=False,
+    )
+    query_job = bigquery_client.execute_query(
+        query_string=query, job_config=job_config
+    ).result()
+    high_watermark_values = {}
+    for row in query_job:
+        logger.debug(
+            f"High watermark value of rule binding {row['rule_binding_id']} "
+            f"is {row['high_watermark']}"
+        )
+        high_watermark_values[row["rule_binding_id"]] = {
+            "high_watermark_value": row["high_watermark"],
+            "current_timestamp_value": row["current_timestamp_value"],
+        }
+    return high_watermark_values
@@ -78,6 +78,13 @@ def add_cloud_logging_handler(logger: Logger):
     logger.addHandler(handler)
 
 
+def remove_cloud_logging_handlers(logger: Logger):
+    # The handler's background transport thread does not survive a fork
+    for handler in list(logger.handlers):
+        if isinstance(handler, CloudLoggingHandler):
+            logger.removeHandler(handler)
+
+
 def get_json_logger():
     json_logger = logging.getLogger("clouddq-json-logger")
     if not len(json_logger.handlers):
@@ -27,10 +27,20 @@ import click
 import coloredlogs
 
 from clouddq import lib
+from clouddq.classes.dq_config_type import DqConfigType
+from clouddq.classes.dq_configs_cache import DqConfigsCache
+from clouddq.classes.dq_metadata_cache import DEFAULT_METADATA_CACHE_TTL_HOURS
+from clouddq.classes.dq_metadata_cache import DqMetadataCache
 from clouddq.classes.metadata_registry_defaults import MetadataRegistryDefaults
+from clouddq.integration.async_metadata_client import AsyncMetadataClient
 from clouddq.integration.bigquery.bigquery_client import BigQueryClient
 from clouddq.integration.bigquery.dq_target_table_utils import TargetTable
+from clouddq.integration.bigquery.dq_watermark_table_utils import WatermarkTable
 from clouddq.integration.dataplex.clouddq_dataplex import CloudDqDataplexClient
+from clouddq.integration.dataplex.dataplex_client import DEFAULT_HTTP_POOL_SIZE
+from clouddq.integration.dataplex.dataplex_client import limiter
+from clouddq.integration.dataplex.rate_limiter import DEFAULT_REQUESTS_PER_SECOND
+from clouddq.integration.dataplex.rate_limiter import SqliteRateLimiterStore
 from clouddq.integration.gcp_credentials import GcpCredentials
 from clouddq.log import JsonEncoderDatetime
 from clouddq.log import add_cloud_logging_handler
@@ -40,6 +50,7 @@ from clouddq.runners.dbt.dbt_runner import DbtRunner
 from clouddq.runners.dbt.dbt_utils import get_bigquery_dq_summary_table_name
 from clouddq.runners.dbt.dbt_utils import get_dbt_invocation_id
 from clouddq.utils import assert_not_none_or_empty
+from clouddq.utils import set_jinja_bytecode_cache_path
 
 
 json_logger = get_json_logger()
@@ -195,6 +206,125 @@ coloredlogs.install(logger=logger)
     default=8,
     type=int,
 )
+@click.option(
+    "--config_loader_workers",
+    help="Number of worker processes used for parsing the YAML configs "
+    "in RULE_BINDING_CONFIG_PATH. If greater than 1, configs files are "
+    "parsed in parallel using the libyaml C loader when it is installed.",
+    default=1,
+    type=int,
+    show_default=True,
+)
+@click.option(
+    "--configs_cache_path",
+    help="File system path to a persistent SQLite cache of the configs in "
+    "RULE_BINDING_CONFIG_PATH. If set, only configs files that changed since "
+    "the previous run are parsed and re-ingested into the cache. "
+    "If not set, the configs cache is rebuilt on every run.",
+    default=None,
+    type=click.Path(dir_okay=False),
+)
+@click.option(
+    "--load_target_configs_only",
+    help="If set, only the targeted rule bindings and the entities, rules, "
+    "row filters and reference columns they reference are loaded into the "
+    "configs cache. Ignored when RULE_BINDING_IDS is 'ALL'.",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--metadata_cache_path",
+    help="File system path to a persistent SQLite cache of the schemas "
+    "resolved for 'entity_uri' references from the Dataplex and BigQuery "
+    "metadata APIs. If not set, schemas are retrieved on every run.",
+    default=None,
+    type=click.Path(dir_okay=False),
+)
+@click.option(
+    "--metadata_cache_ttl_hours",
+    help="Number of hours a cached 'entity_uri' schema is used without "
+    "checking the source for changes. Older entries are only re-fetched if "
+    "the Dataplex entity or BigQuery table schema changed.",
+    default=DEFAULT_METADATA_CACHE_TTL_HOURS,
+    type=float,
+    show_default=True,
+)
+@click.option(
+    "--refresh_metadata",
+    help="If set, ignore the metadata cache in '--metadata_cache_path' and "
+    "re-fetch the schemas of all 'entity_uri' references.",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--dataplex_requests_per_second",
+    help="Maximum rate of Dataplex API calls of each type. The rate is "
+    "reduced when the API responds with quota errors and increased again "
+    "up to this value as calls succeed.",
+    default=DEFAULT_REQUESTS_PER_SECOND,
+    type=float,
+    show_default=True,
+)
+@click.option(
+    "--dataplex_rate_limiter_path",
+    help="File system path to a SQLite database shared by CloudDQ processes "
+    "running in parallel on the same host. If set, '--dataplex_requests_per_second' "
+    "applies to the Dataplex API calls of all these processes together.",
+    default=None,
+    type=click.Path(dir_okay=False),
+)
+@click.option(
+    "--async_metadata_concurrency",
+    help="If greater than 0, fetch the BigQuery and Dataplex metadata of "
+    "'entity_uri' references with up to this many concurrent requests on an "
+    "asyncio event loop. Requires the optional 'aiohttp' dependency (pip install clouddq[async]).",
+    default=0,
+    type=int,
+)
+@click.option(
+    "--gcp_token_cache_path",
+    help="File system path to a local cache of the GCP access token. Repeated "
+    "CloudDQ invocations reuse the cached token until shortly before it expires, "
+    "instead of resolving the credentials and any service account impersonation "
+    "again. The file is only readable by its owner.",
+    default=None,
+    type=click.Path(dir_okay=False),
+)
+@click.option(
+    "--dbt_shared_access_token",
+    help="If True, dbt authenticates with the access token shared by the CloudDQ "
+    "clients instead of resolving the credentials again. dbt cannot refresh this "
+    "token, so only use it for dbt runs shorter than 30 minutes.",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--jinja_bytecode_cache_path",
+    help="Directory for a cache of the compiled CloudDQ SQL templates. "
+    "Subsequent runs load the compiled templates from this directory "
+    "instead of compiling them again.",
+    default=None,
+    type=click.Path(file_okay=False),
+)
+@click.option(
+    "--generation_workers",
+    help="Number of worker processes generating the SQL of the rule bindings "
+    "in parallel. Each worker opens the configs cache read-only. "
+    "Requires a platform supporting the 'fork' process start method. "
+    "The workers are forked after the Cloud Logging handler started its "
+    "background thread, so they only log to the console.",
+    default=1,
+    type=int,
+)
+@click.option(
+    "--fused_entity_scans",
+    help="If True, validate the rule bindings on the same table, incremental "
+    "window and partition filters with a single scan of the table. Their row "
+    "filters are evaluated as predicates in that scan. Rule bindings with "
+    "CUSTOM_SQL_STATEMENT rules are validated separately.",
+    is_flag=True,
+    default=False,
+)
 def main(  # noqa: C901
     rule_binding_ids: str,
     rule_binding_config_path: str,
@@ -210,6 +340,20 @@ def main(  # noqa: C901
     target_bigquery_summary_table: str,
     intermediate_table_expiration_hours: int,
     num_threads: int,
+    config_loader_workers: int = 1,
+    configs_cache_path: Optional[str] = None,
+    load_target_configs_only: bool = False,
+    metadata_cache_path: Optional[str] = None,
+    metadata_cache_ttl_hours: float = DEFAULT_METADATA_CACHE_TTL_HOURS,
+    refresh_metadata: bool = False,
+    dataplex_requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+    dataplex_rate_limiter_path: Optional[str] = None,
+    async_metadata_concurrency: int = 0,
+    gcp_token_cache_path: Optional[str] = None,
+    dbt_shared_access_token: bool = False,
+    jinja_bytecode_cache_path: Optional[str] = None,
+    generation_workers: int = 1,
+    fused_entity_scans: bool = False,
     debug: bool = False,
     print_sql_queries: bool = False,
     skip_sql_validation: bool = False,
@@ -269,6 +413,7 @@ def main(  # noqa: C901
             gcp_project_id=gcp_project_id,
             gcp_service_account_key_path=gcp_service_account_key_path,
             gcp_impersonation_credentials=gcp_impersonation_credentials,
+            token_cache_path=gcp_token_cache_path,
         )
         # Set-up cloud logging
         add_cloud_logging_handler(logger=json_logger)
@@ -276,6 +421,9 @@ def main(  # noqa: C901
         json_logger.warning(
             json.dumps({"clouddq_run_configs": locals()}, cls=JsonEncoderDatetime)
         )
+        if jinja_bytecode_cache_path:
+            logger.debug(f"Using Jinja bytecode cache: {jinja_bytecode_cache_path}")
+            set_jinja_bytecode_cache_path(Path(jinja_bytecode_cache_path))
         # Create BigQuery client
         bigquery_client = BigQueryClient(gcp_credentials=gcp_credentials)
         # Prepare dbt runtime
@@ -289,6 +437,7 @@ def main(  # noqa: C901
             gcp_impersonation_credentials=gcp_impersonation_credentials,
             intermediate_table_expiration_hours=intermediate_table_expiration_hours,
             num_threads=num_threads,
+            gcp_credentials=gcp_credentials if dbt_shared_access_token else None,
         )
         dbt_path = dbt_runner.get_dbt_path()
         dbt_rule_binding_views_path = dbt_runner.get_rule_binding_view_path()
@@ -412,20 +561,49 @@ def main(  # noqa: C901
         metadata = json.loads(metadata)
         # Load Rule Bindings
         configs_path = Path(rule_binding_config_path)
-        logger.debug(f"Loading rule bindings from: {configs_path.absolute()}")
-        all_rule_bindings = lib.load_rule_bindings_config(Path(configs_path))
+        logger.debug(f"Loading configs from: {configs_path.absolute()}")
         # Prepare list of Rule Bindings in-scope for run
         target_rule_binding_ids = [
             r.strip().upper() for r in rule_binding_ids.split(",")
         ]
-        if len(target_rule_binding_ids) == 1 and target_rule_binding_ids[0] == "ALL":
+        run_all_rule_bindings = (
+            len(target_rule_binding_ids) == 1 and target_rule_binding_ids[0] == "ALL"
+        )
+        if load_target_configs_only and not run_all_rule_bindings:
+            configs_cache = DqConfigsCache(sqlite3_db_name=configs_cache_path)
+            all_configs = lib.prepare_target_configs_cache(
+                configs_cache=configs_cache,
+                configs_path=configs_path,
+                target_rule_binding_ids=target_rule_binding_ids,
+                num_workers=config_loader_workers,
+            )
+        elif configs_cache_path:
+            logger.info(f"Using persistent configs cache: {configs_cache_path}")
+            configs_cache = DqConfigsCache(sqlite3_db_name=configs_cache_path)
+            all_configs = lib.refresh_configs_cache(
+                configs_cache=configs_cache,
+                configs_path=configs_path,
+                num_workers=config_loader_workers,
+            )
+        else:
+            all_configs = lib.load_all_configs(
+                configs_path, num_workers=config_loader_workers
+            )
+            # Load all configs into a local cache
+            configs_cache = lib.prepare_configs_cache(
+                configs_path=configs_path, all_configs=all_configs
+            )
+        all_rule_bindings = all_configs[DqConfigType.RULE_BINDINGS]
+        if run_all_rule_bindings:
             target_rule_binding_ids = [
                 rule_binding.upper() for rule_binding in all_rule_bindings.keys()
             ]
         logger.info(f"Preparing SQL for rule bindings: {target_rule_binding_ids}")
         # Load default configs for metadata registries
         registry_defaults: MetadataRegistryDefaults = (
-            lib.load_metadata_registry_default_configs(Path(configs_path))
+            lib.load_metadata_registry_default_configs(
+                Path(configs_path), all_configs=all_configs
+            )
         )
         default_dataplex_projects = registry_defaults.get_dataplex_registry_defaults(
             "projects"
@@ -438,11 +616,22 @@ def main(  # noqa: C901
         )
         dataplex_registry_defaults = registry_defaults.get_dataplex_registry_defaults()
         # Prepare Dataplex Client from metadata registry defaults
+        rate_limiter_store = None
+        if dataplex_rate_limiter_path:
+            logger.info(
+                f"Using shared Dataplex rate limiter: {dataplex_rate_limiter_path}"
+            )
+            rate_limiter_store = SqliteRateLimiterStore(dataplex_rate_limiter_path)
+        limiter.configure(
+            requests_per_second=dataplex_requests_per_second,
+            store=rate_limiter_store,
+        )
         dataplex_client = CloudDqDataplexClient(
             gcp_credentials=gcp_credentials,
             gcp_project_id=default_dataplex_projects,
             gcp_dataplex_lake_name=default_dataplex_lakes,
             gcp_dataplex_region=default_dataplex_locations,
+            http_pool_size=max(num_threads, DEFAULT_HTTP_POOL_SIZE),
         )
         logger.debug(
             "Created CloudDqDataplexClient with arguments: "
@@ -451,21 +640,40 @@ def main(  # noqa: C901
             f"{default_dataplex_lakes}, "
             f"{default_dataplex_locations}, "
         )
-        # Load all configs into a local cache
-        configs_cache = lib.prepare_configs_cache(configs_path=Path(configs_path))
+        metadata_cache = None
+        if metadata_cache_path:
+            logger.info(f"Using persistent metadata cache: {metadata_cache_path}")
+            metadata_cache = DqMetadataCache(
+                sqlite3_db_name=metadata_cache_path,
+                ttl_hours=metadata_cache_ttl_hours,
+                refresh=refresh_metadata,
+            )
+        async_metadata_client = None
+        if async_metadata_concurrency > 0:
+            async_metadata_client = AsyncMetadataClient(
+                gcp_credentials=gcp_credentials,
+                gcp_project_id=default_dataplex_projects,
+                gcp_dataplex_region=default_dataplex_locations,
+                gcp_dataplex_lake_name=default_dataplex_lakes,
+                max_concurrency=async_metadata_concurrency,
+            )
         configs_cache.resolve_dataplex_entity_uris(
             dataplex_client=dataplex_client,
             bigquery_client=bigquery_client,
             default_configs=dataplex_registry_defaults,
             target_rule_binding_ids=target_rule_binding_ids,
+            num_threads=num_threads,
+            metadata_cache=metadata_cache,
+            async_metadata_client=async_metadata_client,
         )
-        # Get Entities for entity-level summary views
-        target_entity_summary_configs: dict = (
-            configs_cache.get_entities_configs_from_rule_bindings(
-                target_rule_binding_ids=target_rule_binding_ids,
+        json_logger.info(
+            json.dumps(
+                {"clouddq_dataplex_rate_limiter_metrics": limiter.get_metrics()},
+                cls=JsonEncoderDatetime,
             )
         )
         # Create Rule_binding views
+        target_rule_bindings = {}
         for rule_binding_id in target_rule_binding_ids:
             rule_binding_configs = all_rule_bindings.get(rule_binding_id, None)
             assert_not_none_or_empty(
@@ -481,42 +689,97 @@ def main(  # noqa: C901
                 logger.debug(
                     f"Rule binding config json:\n{pformat(rule_binding_configs)}"
                 )
-            high_watermark_filter_exists = False
-
-            configs = lib.create_rule_binding_view_model(
-                rule_binding_id=rule_binding_id,
-                rule_binding_configs=rule_binding_configs,
-                dq_summary_table_name=dq_summary_table_name,
-                configs_cache=configs_cache,
-                environment=environment_target,
-                metadata=metadata,
-                debug=print_sql_queries,
-                progress_watermark=progress_watermark,
-                default_configs=dataplex_registry_defaults,
-                dq_summary_table_exists=dq_summary_table_exists,
-                high_watermark_filter_exists=high_watermark_filter_exists,
-                bigquery_client=bigquery_client,
-            )
-            if not skip_sql_validation:
-                logger.debug(
-                    f"Validating generated SQL code for rule binding "
-                    f"{rule_binding_id} using BigQuery dry-run client.",
+            target_rule_bindings[rule_binding_id] = rule_binding_configs
+        # Incremental rule bindings read their progress from the watermark table
+        watermark_table = WatermarkTable(bigquery_client, dq_summary_table_name)
+        watermark_table_name = None
+        if dq_summary_table_exists and not dry_run:
+            watermark_table.ensure_exists()
+            watermark_table_name = watermark_table.table_name
+        high_watermark_values = lib.get_high_watermark_values(
+            rule_bindings=target_rule_bindings,
+            configs_cache=configs_cache,
+            dq_summary_table_name=dq_summary_table_name,
+            bigquery_client=bigquery_client,
+            dq_summary_table_exists=dq_summary_table_exists,
+            default_configs=dataplex_registry_defaults,
+            watermark_table_name=watermark_table_name,
+        )
+        # Worker processes read the configs cache from its database file
+        configs_cache.commit()
+        rule_binding_views_configs = {}
+        generated_sql_strings = {}
+        for (
+            rule_binding_id,
+            rule_binding_view_configs,
+        ) in lib.write_rule_binding_view_models(
+            rule_bindings=target_rule_bindings,
+            dbt_model_path=dbt_rule_binding_views_path,
+            configs_cache=configs_cache,
+            bigquery_client=bigquery_client,
+            generation_workers=generation_workers,
+            dq_summary_table_name=dq_summary_table_name,
+            environment=environment_target,
+            metadata=metadata,
+            debug=print_sql_queries,
+            progress_watermark=progress_watermark,
+            default_configs=dataplex_registry_defaults,
+            dq_summary_table_exists=dq_summary_table_exists,
+            high_watermark_filter_exists=False,
+            high_watermark_values=high_watermark_values,
+        ):
+            rule_binding_views_configs[rule_binding_id] = rule_binding_view_configs
+            generated_sql_strings[rule_binding_id] = rule_binding_view_configs[
+                "generated_sql_string_dict"
+            ][f"{rule_binding_id}_generated_sql_string"]
+        # Plan fused entity scans and get Entities for entity-level summary views
+        fused_entity_models = {}
+        unfused_rule_binding_ids = target_rule_binding_ids
+        if fused_entity_scans:
+            (
+                fused_entity_models,
+                unfused_rule_binding_ids,
+            ) = lib.plan_fused_entity_models(rule_binding_views_configs)
+            for model_id, rule_binding_ids_list in fused_entity_models.items():
+                generated_sql_strings[model_id] = lib.create_entity_fused_summary_model(
+                    model_id=model_id,
+                    rule_binding_configs=[
+                        rule_binding_views_configs[rule_binding_id]
+                        for rule_binding_id in rule_binding_ids_list
+                    ],
+                    debug=print_sql_queries,
                 )
-                bigquery_client.check_query_dry_run(
-                    query_string=configs.get("generated_sql_string_dict").get(
-                        f"{rule_binding_id}_generated_sql_string"
-                    )
+            num_fused_rule_bindings = len(target_rule_binding_ids) - len(
+                unfused_rule_binding_ids
+            )
+            logger.info(
+                f"Validating {num_fused_rule_bindings} rule bindings with "
+                f"{len(fused_entity_models)} fused entity scans."
+            )
+        target_entity_summary_configs: dict = {}
+        if unfused_rule_binding_ids:
+            target_entity_summary_configs = (
+                configs_cache.get_entities_configs_from_rule_bindings(
+                    target_rule_binding_ids=unfused_rule_binding_ids,
                 )
+            )
+        if not skip_sql_validation:
             logger.debug(
-                f"*** Writing sql to {dbt_rule_binding_views_path.absolute()}/"
-                f"{rule_binding_id}.sql",
+                f"Validating generated SQL code for {len(generated_sql_strings)} "
+                "rule bindings using BigQuery dry-run client.",
             )
-            lib.write_sql_string_as_dbt_model(
-                model_id=rule_binding_id,
-                sql_string=configs.get("generated_sql_string_dict").get(
-                    f"{rule_binding_id}_generated_sql_string"
-                ),
-                dbt_model_path=dbt_rule_binding_views_path,
+            total_bytes_processed = lib.check_sql_strings_dry_run(
+                sql_strings=generated_sql_strings,
+                bigquery_client=bigquery_client,
+                num_threads=num_threads,
+                metadata_cache=metadata_cache,
+                user_id=gcp_credentials.user_id,
+            )
+            json_logger.info(
+                json.dumps(
+                    {"clouddq_sql_validation_bytes_processed": total_bytes_processed},
+                    cls=JsonEncoderDatetime,
+                )
             )
 
         # clean up old rule_bindings
@@ -552,13 +815,27 @@ def main(  # noqa: C901
                 sql_string=sql_string,
                 dbt_model_path=dbt_entity_summary_path,
             )
+        # create fused entity-level summary table models
+        for model_id in fused_entity_models:
+            logger.debug(
+                f"*** Writing sql to {dbt_entity_summary_path.absolute()}/"
+                f"{model_id}.sql",
+            )
+            lib.write_sql_string_as_dbt_model(
+                model_id=model_id,
+                sql_string=generated_sql_strings[model_id],
+                dbt_model_path=dbt_entity_summary_path,
+            )
+        entity_dq_statistics_models = list(target_entity_summary_configs.keys()) + list(
+            fused_entity_models.keys()
+        )
         # clean up old entity_summary views
         for view in dbt_entity_summary_path.glob("*.sql"):
-            if view.stem not in target_entity_summary_configs.keys():
+            if view.stem not in entity_dq_statistics_models:
                 view.unlink()
         # create dbt configs json for the main.sql loop and run dbt
         configs = {
-            "entity_dq_statistics_models": list(target_entity_summary_configs.keys()),
+            "entity_dq_statistics_models": entity_dq_statistics_models,
         }
         dbt_runner.run(
             configs=configs,
@@ -588,6 +865,9 @@ def main(  # noqa: C901
                         dq_summary_table_name,
                         summary_to_stdout,
                     )
+                    num_watermarks = watermark_table.update_from_invocation(
+                        invocation_id, partition_date
+                    )
                     json_logger.info(
                         json.dumps(
                             {
@@ -598,6 +878,7 @@ def main(  # noqa: C901
                                     "target_rule_binding_ids": target_rule_binding_ids,
                                     "partition_date": partition_date,
                                     "num_rows_loaded_to_target_table": num_rows,
+                                    "num_watermarks_updated": num_watermarks,
                                 }
                             },
                             cls=JsonEncoderDatetime,
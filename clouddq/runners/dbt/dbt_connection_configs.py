@@ -27,11 +27,15 @@ import logging
 import yaml
 
 from clouddq.integration.bigquery.bigquery_client import BigQueryClient
+from clouddq.integration.gcp_credentials import GcpCredentials
 
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_DBT_ENVIRONMENT_TARGET = "dev"
+# dbt reads the access token shared by GcpCredentials from this variable
+DBT_ACCESS_TOKEN_ENV_VAR = "CLOUDDQ_GCP_ACCESS_TOKEN"
+DBT_ACCESS_TOKEN_PROFILE = f"{{{{ env_var('{DBT_ACCESS_TOKEN_ENV_VAR}') }}}}"
 DBT_PROFILES_YML_TEMPLATE = {
     "default": {
         "target": DEFAULT_DBT_ENVIRONMENT_TARGET,
@@ -46,6 +50,7 @@ class DbtBigQueryConnectionMethod(str, Enum):
 
     OAUTH = auto()
     SERVICE_ACCOUNT_KEY = auto()
+    OAUTH_SECRETS = auto()
 
 
 @dataclass
@@ -95,6 +100,7 @@ class GcpDbtConnectionConfig(DbtConnectionConfig):
         bigquery_client: Optional[BigQueryClient] = None,
         gcp_service_account_key_path: Optional[str] = None,
         gcp_impersonation_credentials: Optional[str] = None,
+        gcp_credentials: Optional[GcpCredentials] = None,
     ):
         if not gcp_project_id:
             raise ValueError(
@@ -122,7 +128,11 @@ class GcpDbtConnectionConfig(DbtConnectionConfig):
         self.gcp_project_id = gcp_project_id
         self.gcp_bq_dataset_id = gcp_bq_dataset_id
         self.threads = threads
-        if gcp_service_account_key_path:
+        if gcp_credentials:
+            # The token is already resolved, including any impersonation
+            logger.info("Using the CloudDQ GCP access token to authenticate dbt...")
+            self.connection_method = DbtBigQueryConnectionMethod.OAUTH_SECRETS
+        elif gcp_service_account_key_path:
             logger.info("Using exported service account key to authenticate to GCP...")
             self.gcp_service_account_key_path = gcp_service_account_key_path
             self.connection_method = DbtBigQueryConnectionMethod.SERVICE_ACCOUNT_KEY
@@ -131,7 +141,7 @@ class GcpDbtConnectionConfig(DbtConnectionConfig):
                 "Using Application-Default Credentials (ADC) to authenticate to GCP..."
             )
             self.connection_method = DbtBigQueryConnectionMethod.OAUTH
-        if gcp_impersonation_credentials:
+        if gcp_impersonation_credentials and not gcp_credentials:
             logger.info(
                 f"Attempting to impersonate service account "
                 f"{gcp_impersonation_credentials}..."
@@ -158,6 +168,10 @@ class GcpDbtConnectionConfig(DbtConnectionConfig):
             profiles_configs["keyfile"] = self.gcp_service_account_key_path
         elif self.connection_method == DbtBigQueryConnectionMethod.OAUTH:
             profiles_configs["method"] = "oauth"
+        elif self.connection_method == DbtBigQueryConnectionMethod.OAUTH_SECRETS:
+            # Only the variable name is written to profiles.yml, not the token
+            profiles_configs["method"] = "oauth-secrets"
+            profiles_configs["token"] = DBT_ACCESS_TOKEN_PROFILE
         else:
             raise ValueError("Unable to get dbt connection method for GCP.")
         if self.service_account_gcp_impersonation_credentials:
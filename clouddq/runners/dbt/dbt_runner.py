@@ -17,9 +17,12 @@ from typing import Dict
 from typing import Optional
 
 import logging
+import os
 import typing
 
 from clouddq.integration.bigquery.bigquery_client import BigQueryClient
+from clouddq.integration.gcp_credentials import GcpCredentials
+from clouddq.runners.dbt.dbt_connection_configs import DBT_ACCESS_TOKEN_ENV_VAR
 from clouddq.runners.dbt.dbt_connection_configs import DEFAULT_DBT_ENVIRONMENT_TARGET
 from clouddq.runners.dbt.dbt_connection_configs import DbtConnectionConfig
 from clouddq.runners.dbt.dbt_connection_configs import GcpDbtConnectionConfig
@@ -39,12 +42,15 @@ DBT_TEMPLATED_FILE_LOCATIONS = {
 }
 
 HOURS_TO_EXPIRATION = "+hours_to_expiration: 24"
+# dbt cannot refresh the shared token, so it must outlive most dbt runs
+DBT_TOKEN_MIN_LIFETIME_SECONDS = 1800
 
 class DbtRunner:
     environment_target: str
     intermediate_table_expiration_hours: int
     num_threads: int
     connection_config: DbtConnectionConfig
+    gcp_credentials: Optional[GcpCredentials]
     dbt_rule_binding_views_path: Path
     dbt_entity_summary_path: Path
 
@@ -60,7 +66,9 @@ class DbtRunner:
         num_threads: int,
         bigquery_client: Optional[BigQueryClient] = None,
         create_paths_if_not_exists: bool = True,
+        gcp_credentials: Optional[GcpCredentials] = None,
     ):
+        self.gcp_credentials = gcp_credentials
         # Prepare local dbt environment
         self.dbt_path = self._resolve_dbt_path(
             create_paths_if_not_exists=create_paths_if_not_exists,
@@ -90,6 +98,7 @@ class DbtRunner:
         self, configs: Dict, debug: bool = False, dry_run: bool = False
     ) -> None:
         logger.debug(f"Running dbt in path: {self.dbt_path}")
+        self._export_access_token()
         if debug:
             self.test_dbt_connection()
         run_dbt(
@@ -102,6 +111,7 @@ class DbtRunner:
         )
 
     def test_dbt_connection(self):
+        self._export_access_token()
         run_dbt(
             dbt_path=self.dbt_path,
             dbt_profile_dir=self.dbt_profiles_dir,
@@ -110,6 +120,12 @@ class DbtRunner:
             dry_run=True,
         )
 
+    def _export_access_token(self) -> None:
+        if self.gcp_credentials:
+            os.environ[DBT_ACCESS_TOKEN_ENV_VAR] = self.gcp_credentials.get_token(
+                min_lifetime_seconds=DBT_TOKEN_MIN_LIFETIME_SECONDS
+            )
+
     def get_dbt_path(self) -> Path:
         self._resolve_dbt_path(self.dbt_path)
         return Path(self.dbt_path)
@@ -164,6 +180,7 @@ class DbtRunner:
             gcp_region_id=gcp_region_id,
             gcp_service_account_key_path=gcp_service_account_key_path,
             gcp_impersonation_credentials=gcp_impersonation_credentials,
+            gcp_credentials=self.gcp_credentials,
         )
         self.connection_config = connection_config
         self.dbt_profiles_dir = Path(self.dbt_path)
@@ -0,0 +1,144 @@
+-- Copyright 2022 Google LLC
+--
+-- Licensed under the Apache License, Version 2.0 (the "License");
+-- you may not use this file except in compliance with the License.
+-- You may obtain a copy of the License at
+--
+--      http://www.apache.org/licenses/LICENSE-2.0
+--
+-- Unless required by applicable law or agreed to in writing, software
+-- distributed under the License is distributed on an "AS IS" BASIS,
+-- WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+-- See the License for the specific language governing permissions and
+-- limitations under the License.
+{% macro simple_rule_row_is_valid(rule_configs, column_name) -%}
+CASE
+{%- if rule_configs.get("rule_type") == "NOT_NULL" %} WHEN {{ rule_configs.get("rule_sql_expr") }} THEN TRUE
+{%- else %} WHEN {{ column_name }} IS NULL THEN CAST(NULL AS BOOLEAN) WHEN {{ rule_configs.get("rule_sql_expr") }} THEN TRUE
+{%- endif %} ELSE FALSE END
+{%- endmacro -%}
+
+{%- macro create_entity_fused_dq_summary(rule_bindings, instance_name, database_name, table_name) -%}
+{% set fully_qualified_table_name = "%s.%s.%s" % (instance_name, database_name, table_name) -%}
+{% set first_configs = rule_bindings[0].get('configs') -%}
+{% set partition_fields = first_configs.get('entity_configs').get('partition_fields') -%}
+{% set time_column_id = first_configs.get('incremental_time_filter_column') -%}
+WITH
+data AS (
+    SELECT
+      *,
+{%- for binding in rule_bindings %}
+      ({{ binding.get('configs').get('row_filter_configs').get('filter_sql_expr') }}) AS _internal_row_in_scope_{{ loop.index }},
+{%- endfor %}
+    FROM
+      `{{- fully_qualified_table_name -}}` d
+{%- if time_column_id %}
+    WHERE
+      CAST(d.{{ time_column_id }} AS TIMESTAMP)
+          BETWEEN CAST('{{ rule_bindings[0].get('high_watermark_value') }}' AS TIMESTAMP) AND CAST('{{ rule_bindings[0].get('current_timestamp_value') }}' AS TIMESTAMP)
+{% else %}
+    WHERE
+      TRUE
+{% endif -%}
+{%- if partition_fields %}
+    {% for field in partition_fields %}
+        AND {{ field['name'] }} IS NOT NULL
+    {%- endfor -%}
+{% endif %}
+    AND (
+{%- for binding in rule_bindings %}
+      ({{ binding.get('configs').get('row_filter_configs').get('filter_sql_expr') }}){% if not loop.last %} OR{% endif %}
+{%- endfor %}
+    )
+),
+last_mod AS (
+    SELECT
+        project_id || '.' || dataset_id || '.' || table_id AS _internal_table_id,
+        TIMESTAMP_MILLIS(last_modified_time) AS last_modified
+    FROM `{{ instance_name }}.{{ database_name }}.__TABLES__`
+),
+rule_counts AS (
+    SELECT
+{%- for binding in rule_bindings %}
+{%- set binding_index = loop.index %}
+{%- set column_name = binding.get('configs').get('column_configs').get('name') %}
+      COUNTIF(_internal_row_in_scope_{{ binding_index }} IS TRUE) AS _internal_rows_validated_{{ binding_index }},
+{%- for rule_id, rule_configs in binding.get('configs').get('rule_configs_dict').items() %}
+{%- set rule_index = "%s_%s" % (binding_index, loop.index) %}
+      COUNTIF(_internal_row_in_scope_{{ binding_index }} IS TRUE AND ({{ simple_rule_row_is_valid(rule_configs, column_name) }}) IS TRUE) AS _internal_success_count_{{ rule_index }},
+      COUNTIF(_internal_row_in_scope_{{ binding_index }} IS TRUE AND ({{ simple_rule_row_is_valid(rule_configs, column_name) }}) IS FALSE) AS _internal_failed_count_{{ rule_index }},
+      COUNTIF(_internal_row_in_scope_{{ binding_index }} IS TRUE AND ({{ simple_rule_row_is_valid(rule_configs, column_name) }}) IS NULL) AS _internal_null_count_{{ rule_index }},
+{%- endfor %}
+{%- endfor %}
+    FROM
+      data
+)
+SELECT
+  results.*
+FROM
+  rule_counts
+JOIN
+  last_mod
+ON
+  last_mod._internal_table_id = '{{ fully_qualified_table_name }}'
+CROSS JOIN
+  UNNEST([
+{%- for binding in rule_bindings %}
+{%- set binding_index = loop.index %}
+{%- set configs = binding.get('configs') %}
+{%- set rule_binding_id = configs.get('rule_binding_id') %}
+{%- set column_name = configs.get('column_configs').get('name') %}
+{%- set entity_configs = configs.get('entity_configs') %}
+{%- set metadata = binding.get('metadata') %}
+{%- set _dummy = metadata.update(configs.get('metadata', '')) %}
+{%- for rule_id, rule_configs in configs.get('rule_configs_dict').items() %}
+{%- set rule_index = "%s_%s" % (binding_index, loop.index) %}
+{%- set skip_null_count = rule_configs.get("rule_type") == "NOT_NULL" %}
+{%- set rows_validated = "_internal_rows_validated_%s" % binding_index %}
+{%- if binding_index > 1 or loop.index > 1 %},{% endif %}
+    STRUCT(
+      CURRENT_TIMESTAMP() AS execution_ts,
+      '{{ rule_binding_id }}' AS rule_binding_id,
+      '{{ rule_id }}' AS rule_id,
+      '{{ fully_qualified_table_name }}' AS table_id,
+      '{{ column_name }}' AS column_id,
+{%- if rule_configs.get("dimension") %}
+      '{{ rule_configs.get("dimension") }}' AS dimension,
+{%- else %}
+      CAST(NULL AS STRING) AS dimension,
+{%- endif %}
+      '{{ metadata|tojson }}' AS metadata_json_string,
+      '{{ binding.get('configs_hashsum') }}' AS configs_hashsum,
+{%- for dataplex_field in ['dataplex_lake', 'dataplex_zone', 'dataplex_asset_id'] %}
+{%- if entity_configs.get(dataplex_field) %}
+      '{{ entity_configs.get(dataplex_field) }}' AS {{ dataplex_field }},
+{%- else %}
+      CAST(NULL AS STRING) AS {{ dataplex_field }},
+{%- endif %}
+{%- endfor %}
+      CONCAT('{{ rule_binding_id }}', '_', '{{ rule_id }}', '_', CURRENT_TIMESTAMP(), '_', {{ binding.get('progress_watermark') }}) AS dq_run_id,
+      {{ binding.get('progress_watermark')|upper }} AS progress_watermark,
+      {{ rows_validated }} AS rows_validated,
+      CAST(NULL AS INT64) AS complex_rule_validation_errors_count,
+      CAST(NULL AS BOOLEAN) AS complex_rule_validation_success_flag,
+      last_mod.last_modified AS last_modified,
+      {{ skip_null_count|upper }} AS skip_null_count,
+      IF({{ rows_validated }} = 0, NULL, _internal_success_count_{{ rule_index }}) AS success_count,
+      IF({{ rows_validated }} = 0, NULL, _internal_success_count_{{ rule_index }} / {{ rows_validated }}) AS success_percentage,
+      IF({{ rows_validated }} = 0, NULL, _internal_failed_count_{{ rule_index }}) AS failed_count,
+      IF({{ rows_validated }} = 0, NULL, _internal_failed_count_{{ rule_index }} / {{ rows_validated }}) AS failed_percentage,
+{%- if skip_null_count %}
+      CAST(NULL AS INT64) AS null_count,
+      CAST(NULL AS FLOAT64) AS null_percentage,
+{%- else %}
+      IF({{ rows_validated }} = 0, NULL, _internal_null_count_{{ rule_index }}) AS null_count,
+      IF({{ rows_validated }} = 0, NULL, _internal_null_count_{{ rule_index }} / {{ rows_validated }}) AS null_percentage,
+{%- endif %}
+      r"""{{ configs.get(rule_binding_id ~ '_' ~ rule_id ~ '_failed_records_sql_string') }}""" AS failed_records_query
+    )
+{%- endfor %}
+{%- endfor %}
+  ]) AS results
+{%- endmacro -%}
+
+{{ create_entity_fused_dq_summary(rule_bindings, instance_name, database_name, table_name) }}
@@ -26,12 +26,15 @@ import random
 import re
 import shutil
 import string
+import threading
 import time
 import typing
 
+from jinja2 import BytecodeCache
 from jinja2 import ChainableUndefined  # type: ignore
 from jinja2 import DebugUndefined
 from jinja2 import Environment
+from jinja2 import FileSystemBytecodeCache
 from jinja2 import FileSystemLoader
 from jinja2 import Template
 from jinja2 import select_autoescape
@@ -43,11 +46,26 @@ logger = logging.getLogger(__name__)
 
 
 MAXIMUM_EXPONENTIAL_BACKOFF_SECONDS = 32
+# libyaml-backed loader if PyYAML was built with it, pure-Python otherwise
+YAML_FAST_SAFE_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
+# Jinja environments per templates directory, shared by the whole process
+_jinja_environments: typing.Dict[Path, Environment] = {}
+_jinja_environments_lock = threading.Lock()
+_jinja_bytecode_cache: typing.Optional[BytecodeCache] = None
 
-def load_yaml(file_path: Path, key: str = None) -> typing.Any:
+
+def load_yaml_file(file_path: Path, loader: type = yaml.SafeLoader) -> dict:
     with file_path.open() as f:
-        yaml_configs = yaml.safe_load(f)
+        yaml_configs = yaml.load(f, Loader=loader)  # noqa: S506
+    if not yaml_configs:
+        return dict()
+    return yaml_configs
+
+
+def get_yaml_config_node(
+    yaml_configs: dict, key: str, file_path: Path = None
+) -> typing.Any:
     if not yaml_configs:
         return dict()
     output = yaml_configs.get(key, dict())
@@ -64,6 +82,10 @@ def load_yaml(file_path: Path, key: str = None) -> typing.Any:
         )
 
 
+def load_yaml(file_path: Path, key: str = None) -> typing.Any:
+    return get_yaml_config_node(load_yaml_file(file_path), key, file_path)
+
+
 def unnest_object_to_list(object: dict) -> list:
     collection = []
     for object_id, object_content in object.items():
@@ -187,24 +209,48 @@ class DebugChainableUndefined(ChainableUndefined, DebugUndefined):
     pass
 
 
+def set_jinja_bytecode_cache_path(cache_path: typing.Optional[Path]) -> None:
+    """Persist compiled Jinja templates in cache_path across runs."""
+    global _jinja_bytecode_cache
+    with _jinja_environments_lock:
+        if cache_path:
+            Path(cache_path).mkdir(parents=True, exist_ok=True)
+            _jinja_bytecode_cache = FileSystemBytecodeCache(str(cache_path))
+        else:
+            _jinja_bytecode_cache = None
+        _jinja_environments.clear()
+
+
+def get_jinja_environment(templates_parent_path: Path) -> Environment:
+    with _jinja_environments_lock:
+        if templates_parent_path not in _jinja_environments:
+            if not templates_parent_path.is_dir():
+                raise ValueError(
+                    f"Jinja template directory not found: "
+                    f"{templates_parent_path.absolute()}"
+                )
+            # Templates are packaged with clouddq, so they are compiled once
+            # and never checked for changes on disk
+            _jinja_environments[templates_parent_path] = Environment(
+                loader=FileSystemLoader(templates_parent_path),
+                autoescape=select_autoescape(),
+                undefined=DebugChainableUndefined,
+                auto_reload=False,
+                cache_size=-1,
+                bytecode_cache=_jinja_bytecode_cache,
+            )
+        return _jinja_environments[templates_parent_path]
+
+
 def load_jinja_template(template_path: Path) -> Template:
+    templates_parent_path = get_templates_path(template_path.parent).absolute()
     try:
-        environment = load_jinja_template.environment
-        return environment.get_template(template_path.name)
-    except AttributeError:
-        templates_parent_path = get_templates_path(template_path.parent).absolute()
-        if not templates_parent_path.is_dir():
-            raise ValueError(
-                f"Error while loading template: {template_path}:\n"
-                f"Jinja template directory not found: "
-                f"{templates_parent_path.absolute()}"
-            )
-        load_jinja_template.environment = environment = Environment(
-            loader=FileSystemLoader(templates_parent_path),
-            autoescape=select_autoescape(),
-            undefined=DebugChainableUndefined,
-        )
-        return environment.get_template(template_path.name)
+        environment = get_jinja_environment(templates_parent_path)
+    except ValueError as error:
+        raise ValueError(
+            f"Error while loading template: {template_path}:\n{error}"
+        ) from error
+    return environment.get_template(template_path.name)
 
 
 def get_format_string_arguments(format_string: str) -> typing.List[str]:
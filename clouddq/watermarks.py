@@ -0,0 +1,163 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Inspect and reset the progress watermarks of incremental rule bindings."""
+from __future__ import annotations
+
+from datetime import datetime
+from datetime import timezone
+from typing import Optional
+
+import json
+
+import click
+import coloredlogs
+
+from clouddq.integration.bigquery.bigquery_client import BigQueryClient
+from clouddq.integration.bigquery.dq_watermark_table_utils import WatermarkTable
+from clouddq.integration.gcp_credentials import GcpCredentials
+from clouddq.log import JsonEncoderDatetime
+from clouddq.log import get_logger
+
+
+logger = get_logger()
+coloredlogs.install(logger=logger)
+
+
+def get_rule_binding_ids(rule_binding_ids: Optional[str]) -> Optional[list[str]]:
+    if not rule_binding_ids or rule_binding_ids.upper() == "ALL":
+        return None
+    return [
+        rule_binding_id.strip().upper()
+        for rule_binding_id in rule_binding_ids.split(",")
+        if rule_binding_id.strip()
+    ]
+
+
+def get_watermark_table(
+    dq_summary_table: str,
+    gcp_project_id: Optional[str] = None,
+    gcp_service_account_key_path: Optional[str] = None,
+    gcp_impersonation_credentials: Optional[str] = None,
+) -> WatermarkTable:
+    gcp_credentials = GcpCredentials(
+        gcp_project_id=gcp_project_id,
+        gcp_service_account_key_path=gcp_service_account_key_path,
+        gcp_impersonation_credentials=gcp_impersonation_credentials,
+    )
+    watermark_table = WatermarkTable(
+        BigQueryClient(gcp_credentials=gcp_credentials), dq_summary_table
+    )
+    if not watermark_table.bigquery_client.is_table_exists(watermark_table.table_name):
+        raise click.ClickException(
+            f"Watermark table {watermark_table.table_name} does not exist."
+        )
+    return watermark_table
+
+
+@click.group()
+@click.argument("dq_summary_table")
+@click.option(
+    "--gcp_project_id",
+    help="GCP Project ID used for executing GCP Jobs. ",
+    default=None,
+    type=str,
+)
+@click.option(
+    "--gcp_service_account_key_path",
+    help="File system path to the exported GCP service account JSON key "
+    "for authenticating to GCP. Defaults to Application Default Credentials.",
+    default=None,
+    type=click.Path(exists=True),
+)
+@click.option(
+    "--gcp_impersonation_credentials",
+    help="Target Service Account Name for authenticating to GCP using "
+    "service account impersonation via a source credentials.",
+    default=None,
+    type=str,
+)
+@click.pass_context
+def watermarks(
+    ctx: click.Context,
+    dq_summary_table: str,
+    gcp_project_id: Optional[str],
+    gcp_service_account_key_path: Optional[str],
+    gcp_impersonation_credentials: Optional[str],
+) -> None:
+    """Manage the watermarks of the intermediate DQ_SUMMARY_TABLE.
+
+    DQ_SUMMARY_TABLE is the fully qualified name of the intermediate
+    dq_summary table, i.e. <gcp_project_id>.<gcp_bq_dataset_id>.dq_summary.
+    """
+    # Credentials are resolved by the subcommands, so --help does not need them
+    ctx.obj = ctx.params
+
+
+@watermarks.command()
+@click.option(
+    "--rule_binding_ids",
+    help="Comma-separated rule binding IDs. Defaults to all rule bindings.",
+    default=None,
+    type=str,
+)
+@click.pass_obj
+def show(watermarks_params: dict, rule_binding_ids: Optional[str]) -> None:
+    """Print the watermarks as JSON lines."""
+    watermark_table = get_watermark_table(**watermarks_params)
+    for watermark in watermark_table.get_watermarks(
+        get_rule_binding_ids(rule_binding_ids)
+    ):
+        click.echo(json.dumps(watermark, cls=JsonEncoderDatetime))
+
+
+@watermarks.command()
+@click.option(
+    "--rule_binding_ids",
+    help="Comma-separated rule binding IDs, or ALL.",
+    required=True,
+    type=str,
+)
+@click.option(
+    "--high_watermark",
+    help="Move the watermarks to this ISO 8601 timestamp, in UTC unless "
+    "it has a UTC offset. If not set, the watermarks are deleted and the "
+    "next run validates all rows of these rule bindings.",
+    default=None,
+    type=str,
+)
+@click.pass_obj
+def reset(
+    watermarks_params: dict,
+    rule_binding_ids: str,
+    high_watermark: Optional[str],
+) -> None:
+    """Delete or move the watermarks of rule bindings."""
+    high_watermark_ts = None
+    if high_watermark:
+        try:
+            high_watermark_ts = datetime.fromisoformat(high_watermark)
+        except ValueError as error:
+            raise click.BadParameter(str(error), param_hint="--high_watermark")
+        if high_watermark_ts.tzinfo is None:
+            high_watermark_ts = high_watermark_ts.replace(tzinfo=timezone.utc)
+    watermark_table = get_watermark_table(**watermarks_params)
+    num_rows = watermark_table.reset_watermarks(
+        get_rule_binding_ids(rule_binding_ids), high_watermark=high_watermark_ts
+    )
+    click.echo(f"Reset {num_rows} watermarks in {watermark_table.table_name}.")
+
+
+if __name__ == "__main__":
+    watermarks()
@@ -11,17 +11,22 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from datetime import timedelta
 from pathlib import Path
 
 import logging
 import os
 import shutil
+import threading
+import time
 
 import click.testing
 import pytest
 
 from clouddq.integration.bigquery.bigquery_client import BigQueryClient
 from clouddq.integration.dataplex.clouddq_dataplex import CloudDqDataplexClient
+from clouddq.integration.gcp_credentials import GcpCredentials
+from clouddq.integration.gcp_credentials import _utcnow
 from clouddq.lib import prepare_configs_cache
 from clouddq.utils import working_directory
 
@@ -545,18 +550,61 @@ def temp_configs_from_dq_advanced_rules_configs(
 def runner():
     return click.testing.CliRunner()
 
+
+class StubCredentials:
+    """google-auth credentials that issue the tokens <name>-1, <name>-2, ..."""
+
+    def __init__(self, name: str = "token", latency: float = 0):
+        self.name = name
+        self.token = None
+        self.expiry = None
+        self.refreshes = 0
+        self.latency = latency
+        self.lock = threading.Lock()
+        self._service_account_email = "clouddq@project.iam.gserviceaccount.com"
+
+    @property
+    def service_account_email(self) -> str:
+        return self._service_account_email
+
+    @property
+    def valid(self) -> bool:
+        return self.token is not None and _utcnow() < self.expiry
+
+    def refresh(self, request) -> None:
+        time.sleep(self.latency)
+        with self.lock:
+            self.refreshes += 1
+            self.token = f"{self.name}-{self.refreshes}"
+            self.expiry = _utcnow() + timedelta(hours=1)
+
+
+@pytest.fixture
+def stub_credentials():
+    return StubCredentials
+
+
+@pytest.fixture
+def stub_gcp_credentials(stub_credentials):
+    return GcpCredentials(credentials=stub_credentials())
+
 def pytest_configure(config):
     config.addinivalue_line("markers", "dataplex: mark as tests for dataplex integration test.")
+    config.addinivalue_line("markers", "benchmark: mark as slow performance benchmark test.")
 
 def pytest_addoption(parser):
     parser.addoption(
         "--run-dataplex", action="store_true", default=False, help="run dataplex integraiton tests"
     )
+    parser.addoption(
+        "--run-benchmark", action="store_true", default=False, help="run slow benchmark tests"
+    )
 
 def pytest_collection_modifyitems(config, items):
-    if config.getoption("--run-dataplex"):
-        return
     skip_dataplex = pytest.mark.skip(reason="need --run_dataplex option to run")
+    skip_benchmark = pytest.mark.skip(reason="need --run-benchmark option to run")
     for item in items:
-        if "dataplex" in item.keywords:
+        if "dataplex" in item.keywords and not config.getoption("--run-dataplex"):
             item.add_marker(skip_dataplex)
+        if "benchmark" in item.keywords and not config.getoption("--run-benchmark"):
+            item.add_marker(skip_benchmark)
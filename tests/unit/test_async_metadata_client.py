@@ -0,0 +1,214 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import asyncio
+import json
+import logging
+import threading
+import time
+
+import pytest
+
+from clouddq.integration import async_metadata_client
+from clouddq.integration.async_metadata_client import AsyncMetadataClient
+from clouddq.integration.dataplex import dataplex_client
+from clouddq.integration.dataplex.rate_limiter import AdaptiveRateLimiter
+
+
+logger = logging.getLogger(__name__)
+
+with open("tests/resources/mock_valid_dataplex_entity.json") as f:
+    MOCK_DATAPLEX_ENTITY = json.load(f)
+ZONE_ENTITIES = [
+    {"id": f"table_{i}", "dataPath": f"projects/p/datasets/d/tables/table_{i}"}
+    for i in range(3)
+]
+
+
+class StubMetadataHTTPRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def get_payload(self) -> tuple:
+        path = self.path.split("?")[0].strip("/").split("/")
+        if path[:2] == ["bigquery", "v2"] and "tables" in path:
+            project_id, dataset_id, table_id = path[3], path[5], path[7]
+            if table_id.endswith("missing"):
+                return 404, {"error": {"code": 404}}
+            return 200, {
+                "tableReference": {
+                    "projectId": project_id,
+                    "datasetId": dataset_id,
+                    "tableId": table_id,
+                },
+                "schema": {"fields": [{"name": "id", "type": "INTEGER"}]},
+            }
+        if path[:2] == ["v3", "projects"]:
+            return 200, {"projectId": f"project-{path[2]}"}
+        if path[-1] == "entities":
+            if path[-2] == "missing_zone":
+                return 404, {"error": {"code": 404}}
+            # Two pages of zone entities
+            if "page_token=1" in self.path:
+                return 200, {"entities": ZONE_ENTITIES[2:]}
+            return 200, {"entities": ZONE_ENTITIES[:2], "nextPageToken": "1"}
+        if path[-1].startswith("table_"):
+            return 200, {
+                **MOCK_DATAPLEX_ENTITY,
+                "id": path[-1],
+                "name": f"projects/123456/locations/region/lakes/lake/zones/zone/entities/{path[-1]}",
+            }
+        return 200, {"name": self.path.split("?")[0]}
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.headers["Authorization"]))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            status = server.statuses.pop(0) if server.statuses else None
+        time.sleep(server.latency)
+        if server.valid_token and self.headers["Authorization"] != f"Bearer {server.valid_token}":
+            status = 401
+        if status:
+            payload = {"error": {"code": status}}
+        else:
+            status, payload = self.get_payload()
+        body = json.dumps(payload).encode()
+        with server.lock:
+            server.in_flight -= 1
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestAsyncMetadataClient:
+
+    @pytest.fixture
+    def http_server(self):
+        http_server = ThreadingHTTPServer(("127.0.0.1", 0), StubMetadataHTTPRequestHandler)
+        http_server.daemon_threads = True
+        http_server.lock = threading.Lock()
+        http_server.requests = []
+        http_server.statuses = []
+        http_server.valid_token = None
+        http_server.latency = 0
+        http_server.in_flight = 0
+        http_server.max_in_flight = 0
+        http_server.url = f"http://127.0.0.1:{http_server.server_port}"
+        thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+        thread.start()
+        yield http_server
+        http_server.shutdown()
+        http_server.server_close()
+
+    @pytest.fixture
+    def client(self, http_server, monkeypatch, stub_gcp_credentials):
+        pytest.importorskip("aiohttp")
+        monkeypatch.setattr(async_metadata_client, "HTTP_RETRY_BACKOFF_FACTOR", 0)
+        monkeypatch.setattr(async_metadata_client, "limiter", AdaptiveRateLimiter(1000))
+        monkeypatch.setattr(dataplex_client, "_project_ids", {})
+        return AsyncMetadataClient(
+            gcp_credentials=stub_gcp_credentials,
+            gcp_project_id="project",
+            gcp_dataplex_region="region",
+            gcp_dataplex_lake_name="lake",
+            max_concurrency=10,
+            dataplex_endpoint=http_server.url,
+            bigquery_endpoint=http_server.url,
+            resource_manager_endpoint=http_server.url,
+        )
+
+    def test_fetch_tables_concurrently(self, client, http_server):
+        http_server.latency = 0.1
+        tables = [f"project.dataset.table_{i}" for i in range(50)]
+        table_refs = client.fetch_tables(tables + ["project.dataset.missing"])
+        # Requests overlap, up to the max_concurrency of the client
+        assert 1 < http_server.max_in_flight <= 10
+        # Tables that do not exist are left out
+        assert sorted(table_refs) == sorted(tables)
+        assert table_refs["project.dataset.table_7"].schema[0].name == "id"
+
+    def test_fetch_dataplex_metadata(self, client, http_server):
+        zone_key = ("project", "region", "lake", "zone")
+        zone_entities, dataplex_entities = client.fetch_dataplex_metadata(
+            entity_keys=[zone_key + ("table_0",), zone_key + ("missing",)],
+            zone_data_paths={
+                zone_key: ["projects/p/datasets/d/tables/table_2"],
+                ("project", "region", "lake", "missing_zone"): ["projects/p/datasets/d/tables/t"],
+            },
+        )
+        # Zones are listed across pages, and failed lookups are left out
+        assert list(zone_entities) == [zone_key]
+        assert zone_entities[zone_key] == ZONE_ENTITIES
+        assert sorted(dataplex_entities) == [zone_key + ("table_0",), zone_key + ("table_2",)]
+        dataplex_entity = dataplex_entities[zone_key + ("table_2",)]
+        assert dataplex_entity.id == "table_2"
+        # Project numbers are resolved once, on the same event loop
+        assert dataplex_entity.name.startswith("projects/project-123456/")
+        assert len([path for path, _ in http_server.requests if path.startswith("/v3/")]) == 1
+
+    def test_get_project_id_coalesced(self, client, http_server):
+
+        async def get_project_ids():
+            async with client:
+                return await asyncio.gather(
+                    *(client.get_project_id(f"{i % 5}00000") for i in range(100))
+                )
+
+        project_ids = asyncio.run(get_project_ids())
+        assert project_ids[:5] == [f"project-{i}00000" for i in range(5)]
+        assert len(http_server.requests) == 5
+        # Resolved project IDs are shared with DataplexClient
+        assert dataplex_client.get_project_ids()["100000"] == "project-100000"
+
+    def test_get_entity_retries(self, client, http_server):
+        http_server.statuses = [429, 503]
+
+        async def get_entity():
+            async with client:
+                return await client.get_entity("zone", "entity")
+
+        response = asyncio.run(get_entity())
+        assert response.status_code == 200
+        assert response.json()["name"] == \
+            "/v1/projects/project/locations/region/lakes/lake/zones/zone/entities/entity"
+        assert len(http_server.requests) == 3
+        assert async_metadata_client.limiter.get_metrics()["get_dataplex_asset"][
+            "throttled"] == 1
+
+    def test_token_refresh(self, client, http_server):
+        http_server.valid_token = "token-2"
+        client.fetch_tables(["project.dataset.table"])
+        # Revoked tokens are refreshed and the request is sent once more
+        assert [authorization for _, authorization in http_server.requests] == \
+            ["Bearer token-1", "Bearer token-2"]
+
+    def test_requires_aiohttp(self, monkeypatch, stub_gcp_credentials):
+        monkeypatch.setattr(async_metadata_client, "aiohttp", None)
+        with pytest.raises(ImportError, match="clouddq\\[async\\]"):
+            AsyncMetadataClient(gcp_credentials=stub_gcp_credentials)
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-vv', '-rP', '-n', 'auto']))
@@ -0,0 +1,241 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ThreadPoolExecutor
+
+import logging
+import threading
+import time
+
+from google.api_core.exceptions import BadRequest
+from google.api_core.exceptions import NotFound
+from google.cloud import bigquery
+import pytest
+
+from clouddq.integration.bigquery.bigquery_client import BigQueryClient
+
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = {
+    "project.dataset.events": bigquery.Table(
+        "project.dataset.events",
+        schema=[
+            bigquery.SchemaField("event_id", "INTEGER", mode="REQUIRED"),
+            bigquery.SchemaField("event_ts", "TIMESTAMP"),
+            bigquery.SchemaField("tags", "STRING", mode="REPEATED"),
+            bigquery.SchemaField(
+                "payload", "RECORD", fields=[bigquery.SchemaField("key", "STRING")]
+            ),
+        ],
+    ),
+    "project.dataset.ingested": bigquery.Table(
+        "project.dataset.ingested",
+        schema=[
+            bigquery.SchemaField("amount", "NUMERIC"),
+            bigquery.SchemaField("valid", "BOOLEAN"),
+        ],
+    ),
+    "project.dataset.plain": bigquery.Table(
+        "project.dataset.plain",
+        schema=[bigquery.SchemaField("ratio", "FLOAT")],
+    ),
+}
+PARTITIONED_TABLES["project.dataset.events"].time_partitioning = bigquery.TimePartitioning(
+    type_="HOUR", field="event_ts"
+)
+PARTITIONED_TABLES["project.dataset.ingested"].time_partitioning = bigquery.TimePartitioning(
+    type_="DAY"
+)
+INFORMATION_SCHEMA_ROWS = [
+    {"table_name": "events", "column_name": "event_id", "data_type": "INT64",
+     "is_nullable": "NO", "partition_by": "TIMESTAMP_TRUNC(event_ts, HOUR)"},
+    {"table_name": "events", "column_name": "event_ts", "data_type": "TIMESTAMP",
+     "is_nullable": "YES", "partition_by": "TIMESTAMP_TRUNC(event_ts, HOUR)"},
+    {"table_name": "events", "column_name": "tags", "data_type": "ARRAY<STRING>",
+     "is_nullable": "NO", "partition_by": "TIMESTAMP_TRUNC(event_ts, HOUR)"},
+    {"table_name": "events", "column_name": "payload", "data_type": "STRUCT<key STRING>",
+     "is_nullable": "YES", "partition_by": "TIMESTAMP_TRUNC(event_ts, HOUR)"},
+    {"table_name": "ingested", "column_name": "amount", "data_type": "NUMERIC(10, 2)",
+     "is_nullable": "YES", "partition_by": "_PARTITIONDATE"},
+    {"table_name": "ingested", "column_name": "valid", "data_type": "BOOL",
+     "is_nullable": "YES", "partition_by": "_PARTITIONDATE"},
+    {"table_name": "plain", "column_name": "ratio", "data_type": "FLOAT64",
+     "is_nullable": "YES", "partition_by": None},
+    {"table_name": "ranged", "column_name": "id", "data_type": "INT64",
+     "is_nullable": "YES", "partition_by": "RANGE_BUCKET(id, GENERATE_ARRAY(0, 100, 10))"},
+]
+
+
+class StubQueryJob:
+
+    def __init__(self, rows: list, total_bytes_processed: int = None):
+        self.rows = rows
+        self.total_bytes_processed = total_bytes_processed
+
+    def result(self) -> list:
+        return self.rows
+
+
+class StubBigQueryConnection:
+
+    def __init__(self, latency: float = 0, tables: dict = None):
+        self.latency = latency
+        self.tables = tables or {}
+        self.get_table_calls = 0
+        self.get_dataset_calls = 0
+        self.queries = []
+        self.dry_runs_in_flight = 0
+        self.max_dry_runs_in_flight = 0
+        self.lock = threading.Lock()
+
+    def get_table(self, table: str) -> bigquery.Table:
+        with self.lock:
+            self.get_table_calls += 1
+        time.sleep(self.latency)
+        if table.endswith("missing"):
+            raise NotFound(f"Table {table} not found")
+        if table in self.tables:
+            return self.tables[table]
+        return bigquery.Table(
+            table,
+            schema=[
+                bigquery.SchemaField("id", "INTEGER"),
+                bigquery.SchemaField("value", "STRING"),
+            ],
+        )
+
+    def query(self, query: str, job_config: bigquery.QueryJobConfig, **kwargs) -> StubQueryJob:
+        with self.lock:
+            self.queries.append(query)
+        if job_config.dry_run:
+            with self.lock:
+                self.dry_runs_in_flight += 1
+                self.max_dry_runs_in_flight = max(
+                    self.max_dry_runs_in_flight, self.dry_runs_in_flight)
+            time.sleep(self.latency)
+            with self.lock:
+                self.dry_runs_in_flight -= 1
+            if "invalid" in query:
+                raise BadRequest(f"Syntax error: {query.strip()}")
+            return StubQueryJob([], total_bytes_processed=len(query))
+        table_names = job_config.query_parameters[0].values
+        return StubQueryJob([
+            row for row in INFORMATION_SCHEMA_ROWS if row["table_name"] in table_names
+        ])
+
+    def get_dataset(self, dataset: str) -> bigquery.Dataset:
+        with self.lock:
+            self.get_dataset_calls += 1
+        dataset_ref = bigquery.Dataset(dataset)
+        dataset_ref.location = "EU"
+        return dataset_ref
+
+
+class TestBigQueryClient:
+
+    @pytest.fixture
+    def bigquery_client(self):
+        bigquery_client = BigQueryClient(gcp_credentials=object())
+        bigquery_client._client = StubBigQueryConnection(latency=0.01)
+        return bigquery_client
+
+    def test_table_metadata_cache(self, bigquery_client):
+        tables = [f"project.dataset.table_{i}" for i in range(200)]
+
+        def resolve(table):
+            assert bigquery_client.is_table_exists(table)
+            bigquery_client.get_table_schema(table)
+            bigquery_client.get_table_columns(table)
+            bigquery_client.get_table_schema_version(table)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            # Every table is requested twice concurrently
+            list(executor.map(resolve, tables + tables))
+        assert bigquery_client._client.get_table_calls == 200
+        # Both the tables and the schemas built from them are cached
+        assert bigquery_client.metadata_cache_stats == {"hits": 1400, "misses": 400}
+        assert bigquery_client.get_table_columns(tables[0]) == {"id", "value"}
+
+    def test_table_metadata_cache_not_found(self, bigquery_client):
+        assert not bigquery_client.is_table_exists("project.dataset.missing")
+        assert not bigquery_client.is_table_exists("project.dataset.missing")
+        # Missing tables may be created later in the run, so they are not cached
+        assert bigquery_client._client.get_table_calls == 2
+
+    def test_dataset_metadata_cache(self, bigquery_client):
+        assert bigquery_client.is_dataset_exists("project.dataset")
+        assert bigquery_client.get_dataset_region("project.dataset") == "EU"
+        assert bigquery_client._client.get_dataset_calls == 1
+        bigquery_client.clear_metadata_cache()
+        assert bigquery_client.get_dataset_region("project.dataset") == "EU"
+        assert bigquery_client._client.get_dataset_calls == 2
+
+    def test_prefetch_table_schemas(self, bigquery_client):
+        bigquery_client._client.tables = PARTITIONED_TABLES
+        tables = [*PARTITIONED_TABLES, "project.dataset.missing", "project.other.table"]
+        bigquery_client.prefetch_table_schemas(tables, num_threads=2)
+        # One query for the dataset with more than one target table
+        assert len(bigquery_client._client.queries) == 1
+        assert "`project.dataset`.INFORMATION_SCHEMA.COLUMNS" in \
+            bigquery_client._client.queries[0]
+        prefetched_schemas = {}
+        for table in PARTITIONED_TABLES:
+            assert bigquery_client.is_table_exists(table)
+            prefetched_schemas[table] = bigquery_client.get_table_schema(table)
+        assert bigquery_client._client.get_table_calls == 0
+        # Prefetched schemas match the ones built from get_table
+        bigquery_client.clear_metadata_cache()
+        for table in PARTITIONED_TABLES:
+            assert bigquery_client.get_table_schema(table) == prefetched_schemas[table]
+        assert bigquery_client._client.get_table_calls == 3
+        assert not bigquery_client.is_table_exists("project.dataset.missing")
+
+    def test_prefetch_table_schemas_unsupported_partitioning(self, bigquery_client):
+        bigquery_client.prefetch_table_schemas(
+            ["project.dataset.plain", "project.dataset.ranged"]
+        )
+        assert bigquery_client.is_table_exists("project.dataset.plain")
+        assert bigquery_client._client.get_table_calls == 0
+        # Range partitioned tables are left to get_table
+        assert bigquery_client.is_table_exists("project.dataset.ranged")
+        assert bigquery_client._client.get_table_calls == 1
+
+    def test_check_queries_dry_run(self, bigquery_client):
+        bigquery_client._client.latency = 0.1
+        queries = {f"RB_{i}": f"SELECT {i}" for i in range(50)}
+        query_jobs = bigquery_client.check_queries_dry_run(queries, num_threads=10)
+        # Dry-runs overlap, up to num_threads
+        assert 1 < bigquery_client._client.max_dry_runs_in_flight <= 10
+        assert list(query_jobs) == list(queries)
+        assert query_jobs["RB_7"].total_bytes_processed > 0
+
+    def test_check_queries_dry_run_errors(self, bigquery_client):
+        queries = {
+            "RB_1": "SELECT 1",
+            "RB_2": "SELECT invalid_2",
+            "RB_3": "SELECT 3",
+            "RB_4": "SELECT invalid_4",
+        }
+        with pytest.raises(RuntimeError, match="2 of 4 queries") as error:
+            bigquery_client.check_queries_dry_run(queries, num_threads=2)
+        # Every error is reported, not only the first one
+        assert "RB_2: BadRequest" in str(error.value)
+        assert "RB_4: BadRequest" in str(error.value)
+        assert "RB_1" not in str(error.value)
+        assert len(bigquery_client._client.queries) == 4
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-vv', '-rP', '-n', 'auto']))
@@ -20,6 +20,8 @@ import shutil
 import pytest
 
 from clouddq import lib
+from clouddq.classes.dq_config_type import DqConfigType
+from clouddq.classes.dq_configs_cache import GET_ENTITY_SUMMARY_QUERY
 from clouddq.classes.dq_configs_cache import DqConfigsCache
 from clouddq.classes.dq_entity import DqEntity
 from clouddq.classes.dq_entity import get_custom_entity_configs
@@ -491,10 +493,75 @@ class TestClasses:
             assert rule_loaded.dimension is None, rule_id
             assertRulesEqual(rule_id, rule_config, rule_loaded)
 
+    def test_configs_cache_objects_lru(self, temp_configs_dir):
+        all_configs = lib.load_all_configs(temp_configs_dir)
+        cache = DqConfigsCache(objects_cache_size=2)
+        lib.load_configs_to_cache(cache, all_configs)
+
+        # Built objects are reused, but callers get their own copies
+        rule = cache.get_rule_id('not_null_simple')
+        rule.update_rule_binding_arguments({'upper_bound': 0})
+        assert cache.get_rule_id('NOT_NULL_SIMPLE').params != rule.params
+        assert ('rules', 'NOT_NULL_SIMPLE') in cache._objects_cache
+        entity = cache.get_table_entity_id('TEST_TABLE')
+        entity.columns.clear()
+        assert cache.get_table_entity_id('TEST_TABLE').columns
+        assert cache.get_row_filter_id('NONE').filter_sql_expr == 'True'
+
+        # The least recently used object is evicted
+        assert len(cache._objects_cache) == 2
+        assert ('rules', 'NOT_NULL_SIMPLE') not in cache._objects_cache
+
+        # Upserted configs are rebuilt from the cache tables
+        cache.load_all_row_filters_collection({'NONE': {'filter_sql_expr': 'False'}})
+        assert ('row_filters', 'NONE') not in cache._objects_cache
+        assert cache.get_row_filter_id('NONE').filter_sql_expr == 'False'
+
+    def test_configs_cache_entity_summary_many_rule_bindings(self, temp_configs_dir):
+        num_entities = 2000
+        num_rule_bindings = 20000
+        all_configs = lib.load_all_configs(temp_configs_dir)
+        entity = all_configs[DqConfigType.ENTITIES]['TEST_TABLE']
+        entities = {
+            f'TABLE_{i}': {**entity, 'table_name': f'table_{i}'} for i in range(num_entities)
+        }
+        # Mixed-case entity IDs in rule bindings must still join to the entities
+        rule_bindings = {
+            f'RB_{i}': {
+                'entity_id': f'table_{i % num_entities}',
+                'column_id': 'value',
+                'row_filter_id': 'NONE',
+                'rule_ids': ['NOT_NULL_SIMPLE'],
+            }
+            for i in range(num_rule_bindings)
+        }
+        cache = DqConfigsCache()
+        cache.load_all_entities_collection(entities)
+        cache.load_all_rule_bindings_collection(rule_bindings)
+
+        output = cache.get_entities_configs_from_rule_bindings(list(rule_bindings))
+        assert len(output) == num_entities
+        assert sum(len(configs['rule_binding_ids_list']) for configs in output.values()) == \
+            num_rule_bindings
+        # Entities are looked up by primary key instead of scanned per rule binding
+        query_plan = [
+            record[-1] for record in
+            cache._cache_db.execute(f"explain query plan {GET_ENTITY_SUMMARY_QUERY}")
+        ]
+        assert any(
+            step.startswith('SEARCH e USING') and '(id=?)' in step for step in query_plan
+        ), query_plan
+        assert not any(step.startswith('SCAN e') for step in query_plan), query_plan
+
+        # Only the target rule bindings are summarized
+        output = cache.get_entities_configs_from_rule_bindings(['rb_0', 'RB_2000', 'RB_1'])
+        assert sorted(configs['rule_binding_ids_list'] for configs in output.values()) == \
+            [['RB_0', 'RB_2000'], ['RB_1']]
+
     def test_dq_entity_parse_bigquery_uri(self,
-        gcp_project_id,
-        test_dataplex_metadata_defaults_configs,
-        test_bigquery_client,):
+                                          gcp_project_id,
+                                          test_dataplex_metadata_defaults_configs,
+                                          test_bigquery_client,):
 
         bq_entity_uri_string = f"bigquery://projects/{gcp_project_id}/datasets/" \
                                f"austin_311/tables/contact_details_partitioned"
@@ -0,0 +1,376 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import json
+import logging
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from clouddq.classes.dataplex_entity import DataplexEntity
+from clouddq.classes.dq_metadata_cache import DqMetadataCache
+from clouddq.integration.dataplex import clouddq_dataplex
+from clouddq.integration.dataplex import dataplex_client
+from clouddq.integration.dataplex.dataplex_client import DataplexClient
+from clouddq.integration.dataplex.rate_limiter import AdaptiveRateLimiter
+from clouddq.integration.dataplex.rate_limiter import SqliteRateLimiterStore
+from clouddq.integration.dataplex.rate_limiter import get_retry_after_seconds
+from clouddq.integration.gcp_credentials import _utcnow
+
+
+logger = logging.getLogger(__name__)
+
+
+def acquire_shared_rate_limiter(sqlite3_db_name: str, num_requests: int) -> float:
+    limiter = AdaptiveRateLimiter(
+        requests_per_second=50, store=SqliteRateLimiterStore(sqlite3_db_name)
+    )
+    for _ in range(num_requests):
+        limiter.acquire("get_entity")
+    return time.time()
+
+
+class StubResponse:
+
+    def __init__(self, payload: dict, status_code: int = 200, headers: dict = None):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = json.dumps(payload)
+
+    def json(self) -> dict:
+        return self.payload
+
+
+class StubDataplexClient:
+
+    def __init__(self, num_entities: int = 400, **kwargs):
+        with open("tests/resources/mock_valid_dataplex_entity.json") as f:
+            self.entity = json.load(f)
+        self.entities = [
+            {
+                "name": f"projects/project-id/locations/location-id/lakes/lake/zones/zone/entities/table_{i}",
+                "id": f"table_{i}",
+                "dataPath": f"projects/project-id/datasets/dataset/tables/table_{i}",
+            }
+            for i in range(num_entities)
+        ]
+        self.list_calls = []
+        self.get_calls = []
+
+    def list_entities(self, zone_id: str, params: dict = None, **kwargs) -> StubResponse:
+        self.list_calls.append(params)
+        page_size = params["page_size"]
+        start = int(params.get("page_token", 0))
+        response = {"entities": self.entities[start:start + page_size]}
+        if start + page_size < len(self.entities):
+            response["nextPageToken"] = str(start + page_size)
+        return StubResponse(response)
+
+    def get_entity(self, zone_id: str, entity_id: str, params: dict = None, **kwargs) -> StubResponse:
+        self.get_calls.append((entity_id, params))
+        return StubResponse({**self.entity, "id": entity_id})
+
+
+class StubSession:
+
+    def __init__(self, latency: float = 0):
+        self.latency = latency
+        self.urls = []
+        self.lock = threading.Lock()
+
+    def get(self, url: str, **kwargs) -> StubResponse:
+        with self.lock:
+            self.urls.append(url)
+        time.sleep(self.latency)
+        return StubResponse({"projectId": f"project-{url.rsplit('/', 1)[-1]}"})
+
+
+class StubHTTPRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.headers["Authorization"], self.client_address))
+            status = server.statuses.pop(0) if server.statuses else 200
+        if server.valid_token and self.headers["Authorization"] != f"Bearer {server.valid_token}":
+            status = 401
+        body = b"{}"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestDataplexClientSession:
+
+    @pytest.fixture
+    def http_server(self):
+        http_server = ThreadingHTTPServer(("127.0.0.1", 0), StubHTTPRequestHandler)
+        http_server.lock = threading.Lock()
+        http_server.requests = []
+        http_server.statuses = []
+        http_server.valid_token = None
+        http_server.url = f"http://127.0.0.1:{http_server.server_port}"
+        thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+        thread.start()
+        yield http_server
+        http_server.shutdown()
+        http_server.server_close()
+
+    @pytest.fixture
+    def client(self, monkeypatch, stub_gcp_credentials):
+        monkeypatch.setattr(dataplex_client, "HTTP_RETRY_BACKOFF_FACTOR", 0)
+        client = DataplexClient(gcp_credentials=stub_gcp_credentials)
+        yield client
+        client.close()
+
+    def test_session_keep_alive(self, client, http_server):
+        for _ in range(20):
+            assert client._session.get(f"{http_server.url}/v1/entities").status_code == 200
+        # All requests reuse a single pooled connection
+        assert len({client_address for _, client_address in http_server.requests}) == 1
+
+    def test_session_retries(self, client, http_server):
+        http_server.statuses = [503, 502]
+        response = client._session.get(f"{http_server.url}/v1/entities")
+        assert response.status_code == 200
+        assert len(http_server.requests) == 3
+        http_server.statuses = [500] * (dataplex_client.HTTP_MAX_RETRIES + 1)
+        response = client._session.get(f"{http_server.url}/v1/entities")
+        assert response.status_code == 500
+
+    def test_session_token_refresh(self, client, http_server):
+        credentials = client._gcp_credentials.credentials
+        client._session.get(f"{http_server.url}/v1/entities")
+        assert http_server.requests[-1][0] == "Bearer token-1"
+        # Expired credentials are refreshed before the request
+        credentials.expiry = _utcnow()
+        client._session.get(f"{http_server.url}/v1/entities")
+        assert http_server.requests[-1][0] == "Bearer token-2"
+        # Revoked tokens are refreshed and the request is sent once more
+        http_server.valid_token = "token-3"
+        response = client._session.get(f"{http_server.url}/v1/entities")
+        assert response.status_code == 200
+        assert len(response.history) == 1
+        assert http_server.requests[-1][0] == "Bearer token-3"
+        assert credentials.refreshes == 3
+
+
+class TestDataplexClient:
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(dataplex_client, "_project_ids", {})
+        monkeypatch.setattr(dataplex_client, "_project_ids_locks", {})
+        client = object.__new__(DataplexClient)
+        client._session = StubSession(latency=0.01)
+        return client
+
+    def test_get_project_id_coalesced(self, client):
+        project_numbers = [f"{i % 5}00000" for i in range(200)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            project_ids = list(executor.map(client.get_project_id, project_numbers))
+        assert project_ids[:5] == [f"project-{i}00000" for i in range(5)]
+        assert len(client._session.urls) == 5
+        # The cache is shared by every client in the process
+        other_client = object.__new__(DataplexClient)
+        other_client._session = StubSession()
+        assert other_client.get_project_id(100000) == "project-100000"
+        assert other_client._session.urls == []
+
+    def test_get_project_id_persisted(self, client, tmp_path):
+        metadata_cache_path = str(tmp_path / "metadata_cache.db")
+        client.get_project_id("123")
+        DqMetadataCache(metadata_cache_path).upsert_project_ids(
+            dataplex_client.get_project_ids()
+        )
+        dataplex_client._project_ids.clear()
+        dataplex_client.load_project_ids(
+            DqMetadataCache(metadata_cache_path).get_project_ids()
+        )
+        assert client.get_project_id("123") == "project-123"
+        assert len(client._session.urls) == 1
+        assert DqMetadataCache(metadata_cache_path, ttl_hours=0).get_project_ids() == {}
+        assert DqMetadataCache(metadata_cache_path, refresh=True).get_project_ids() == {}
+
+
+class TestCloudDqDataplexClient:
+
+    @pytest.fixture
+    def dataplex_client(self, monkeypatch):
+        monkeypatch.setattr(clouddq_dataplex, "DataplexClient", StubDataplexClient)
+        return clouddq_dataplex.CloudDqDataplexClient(
+            gcp_project_id="project-id",
+            gcp_dataplex_lake_name="lake",
+            gcp_dataplex_region="location-id",
+        )
+
+    def test_find_dataplex_entities_from_zone_catalog(self, dataplex_client):
+        stub_client = dataplex_client._client
+
+        def find(index):
+            return dataplex_client.find_dataplex_entities(
+                zone_id="zone",
+                data_path=f"projects/project-id/datasets/dataset/tables/table_{index}",
+            )
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            matches = list(executor.map(find, range(0, 400, 10)))
+
+        # The zone is listed once with large pages, and only matches are fetched
+        assert len(stub_client.list_calls) == 1
+        assert stub_client.list_calls[0]["page_size"] == clouddq_dataplex.DATAPLEX_LIST_ENTITIES_PAGE_SIZE
+        assert sorted(entity_id for entity_id, _ in stub_client.get_calls) == \
+            sorted(f"table_{i}" for i in range(0, 400, 10))
+        assert all(params == {"view": "FULL"} for _, params in stub_client.get_calls)
+        assert [len(match) for match in matches] == [1] * 40
+        assert matches[1][0].id == "table_10"
+        assert find(1000) == []
+        assert len(stub_client.list_calls) == 1
+
+    def test_get_dataplex_zone_catalog_paginates(self, dataplex_client):
+        stub_client = dataplex_client._client
+        stub_client.entities = stub_client.entities * 3
+        zone_catalog = dataplex_client.get_dataplex_zone_catalog(zone_id="zone")
+        assert len(stub_client.list_calls) == 3
+        assert len(zone_catalog.entities_by_id) == 400
+        assert len(zone_catalog.entities_by_data_path[
+            "projects/project-id/datasets/dataset/tables/table_0"]) == 3
+
+
+    def test_load_dataplex_metadata(self, dataplex_client):
+        stub_client = dataplex_client._client
+        zone_key = ("project-id", "location-id", "lake", "zone")
+        data_path = "projects/project-id/datasets/dataset/tables/table_1"
+        dataplex_entity = DataplexEntity.from_dict(
+            entity_id="table_1", kwargs={**stub_client.entity, "id": "table_1"})
+        assert not dataplex_client.is_dataplex_zone_catalog_cached(zone_key)
+        dataplex_client.load_dataplex_metadata(
+            zone_entities={zone_key: stub_client.entities},
+            dataplex_entities={zone_key + ("table_1",): dataplex_entity},
+        )
+        assert dataplex_client.is_dataplex_zone_catalog_cached(zone_key)
+        # Loaded metadata is not fetched again
+        assert dataplex_client.find_dataplex_entities(
+            zone_id="zone",
+            data_path=data_path,
+            gcp_project_id="project-id",
+            location_id="location-id",
+            lake_name="lake",
+        ) == [dataplex_entity]
+        assert stub_client.list_calls == []
+        assert stub_client.get_calls == []
+
+class TestAdaptiveRateLimiter:
+
+    def test_rate_limiter_spacing_shared_across_threads(self):
+        limiter = AdaptiveRateLimiter(requests_per_second=100)
+
+        @limiter.ratelimit("get_entity")
+        def get_entity(_):
+            return StubResponse({})
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(get_entity, range(40)))
+        assert time.monotonic() - start >= 0.38
+        assert limiter.get_metrics()["get_entity"]["requests"] == 40
+
+    def test_rate_limiter_throttled(self):
+        limiter = AdaptiveRateLimiter(requests_per_second=100)
+        statuses = [429, 429]
+
+        @limiter.ratelimit("get_entity")
+        def get_entity():
+            if statuses:
+                return StubResponse({}, statuses.pop(0), headers={"Retry-After": "0.2"})
+            return StubResponse({})
+
+        start = time.monotonic()
+        assert get_entity().status_code == 200
+        # Both retries waited for Retry-After
+        assert time.monotonic() - start >= 0.4
+        metrics = limiter.get_metrics()["get_entity"]
+        assert metrics["throttled"] == 2
+        assert metrics["requests"] == 3
+        # Consecutive throttling within a second only halves the rate once
+        assert metrics["rate"] == pytest.approx(55)
+        for _ in range(20):
+            get_entity()
+        assert limiter.get_metrics()["get_entity"]["rate"] == 100
+
+    def test_rate_limiter_gives_up(self):
+        limiter = AdaptiveRateLimiter(requests_per_second=1000, max_retries=2)
+
+        @limiter.ratelimit("get_entity")
+        def get_entity():
+            return StubResponse({}, 429, headers={"Retry-After": "0"})
+
+        assert get_entity().status_code == 429
+        assert limiter.get_metrics()["get_entity"]["requests"] == 3
+
+    def test_shared_rate_limiter_across_processes(self, tmp_path):
+        sqlite3_db_name = str(tmp_path / "rate_limiter.db")
+        SqliteRateLimiterStore(sqlite3_db_name)
+        start = time.time()
+        with ProcessPoolExecutor(
+            max_workers=4, mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            end = max(executor.map(
+                acquire_shared_rate_limiter, [sqlite3_db_name] * 4, [10] * 4))
+        # 40 requests at 50 per second in total, not per process
+        assert end - start >= 39 / 50
+        limiter = AdaptiveRateLimiter(
+            requests_per_second=50, store=SqliteRateLimiterStore(sqlite3_db_name))
+        assert limiter.get_metrics()["get_entity"]["requests"] == 40
+
+    def test_shared_rate_limiter_throttled(self, tmp_path):
+        sqlite3_db_name = str(tmp_path / "rate_limiter.db")
+        limiters = [
+            AdaptiveRateLimiter(
+                requests_per_second=100, store=SqliteRateLimiterStore(sqlite3_db_name))
+            for _ in range(2)
+        ]
+        limiters[0].on_throttled("get_entity", retry_after=0.3)
+        # The other limiter waits for Retry-After and uses the reduced rate
+        start = time.time()
+        limiters[1].acquire("get_entity")
+        assert time.time() - start >= 0.25
+        assert limiters[1].get_metrics()["get_entity"]["rate"] == 50
+        # Restarting with a lower quota caps the shared rate
+        limiters[1].configure(requests_per_second=20)
+        assert limiters[0].get_metrics()["get_entity"]["rate"] == 20
+
+    def test_get_retry_after_seconds(self):
+        assert get_retry_after_seconds(StubResponse({}, 429, {"Retry-After": "3"})) == 3
+        assert get_retry_after_seconds(StubResponse({}, 429)) is None
+        retry_after = get_retry_after_seconds(
+            StubResponse({}, 429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}))
+        assert retry_after == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-vv', '-rP', '-n', 'auto']))
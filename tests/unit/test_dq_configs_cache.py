@@ -0,0 +1,305 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+import pytest
+
+from clouddq import lib
+from clouddq.classes.dq_config_type import DqConfigType
+from clouddq.classes.dq_configs_cache import DqConfigsCache
+from clouddq.classes.dq_metadata_cache import DqMetadataCache
+
+
+logger = logging.getLogger(__name__)
+
+
+class StubBigQueryClient:
+
+    def __init__(self, latency: float = 0, missing_tables: tuple = (), schema_versions: dict = None):
+        self.calls = 0
+        self.version_calls = 0
+        self.latency = latency
+        self.missing_tables = missing_tables
+        self.schema_versions = schema_versions or {}
+        self.prefetched_tables = []
+        self.loaded_tables = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def is_table_exists(self, table: str) -> bool:
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self.lock:
+            self.in_flight -= 1
+        return table not in self.missing_tables
+
+    def get_table_schema(self, table: str) -> dict:
+        with self.lock:
+            self.calls += 1
+        return {
+            "columns": {
+                f"COLUMN_{i}": {
+                    "name": f"column_{i}",
+                    "type": "STRING",
+                    "mode": "NULLABLE",
+                    "data_type": "STRING",
+                }
+                for i in range(50)
+            },
+            "partition_fields": None,
+        }
+
+    def prefetch_table_schemas(self, tables: list, num_threads: int = 1) -> None:
+        self.prefetched_tables.extend(tables)
+
+    def is_table_metadata_cached(self, table: str) -> bool:
+        return table in self.loaded_tables
+
+    def load_tables(self, tables: dict) -> None:
+        self.loaded_tables.update(tables)
+
+    def get_table_schema_version(self, table: str) -> str:
+        with self.lock:
+            self.version_calls += 1
+        return self.schema_versions.get(table, "v1")
+
+
+class StubDataplexClient:
+
+    def __init__(self):
+        self.find_calls = []
+        self.zone_entities = {}
+        self.dataplex_entities = {}
+
+    def find_dataplex_entities(self, **kwargs) -> list:
+        self.find_calls.append(kwargs)
+        return []
+
+    def is_dataplex_zone_catalog_cached(self, zone_key: tuple) -> bool:
+        return zone_key in self.zone_entities
+
+    def load_dataplex_metadata(self, zone_entities: dict, dataplex_entities: dict) -> None:
+        self.zone_entities.update(zone_entities)
+        self.dataplex_entities.update(dataplex_entities)
+
+    def load_project_ids(self, project_ids: dict) -> None:
+        pass
+
+    def get_project_ids(self) -> dict:
+        return {}
+
+
+class StubAsyncMetadataClient:
+
+    def __init__(self):
+        self.fetched_tables = []
+        self.fetched_dataplex_metadata = []
+
+    def fetch_tables(self, tables) -> dict:
+        self.fetched_tables.extend(tables)
+        return {table: object() for table in self.fetched_tables}
+
+    def fetch_dataplex_metadata(self, entity_keys, zone_data_paths) -> tuple:
+        self.fetched_dataplex_metadata.append((entity_keys, zone_data_paths))
+        return {zone_key: [] for zone_key in zone_data_paths}, {}
+
+
+def prepare_entity_uri_configs_cache(
+    configs_path, num_entities: int = 1000, num_rule_bindings: int = 5000
+) -> tuple[DqConfigsCache, int, list[str]]:
+    all_configs = lib.load_all_configs(configs_path)
+    rule_bindings = {
+        f"RB_{i}": {
+            "entity_uri": f"bigquery://projects/p/datasets/d/tables/table_{i % num_entities}",
+            "column_id": "column_0",
+            "row_filter_id": "NONE",
+            "rule_ids": ["NOT_NULL_SIMPLE"],
+        }
+        for i in range(num_rule_bindings)
+    }
+    all_configs[DqConfigType.RULE_BINDINGS] = rule_bindings
+    configs_cache = lib.prepare_configs_cache(configs_path, all_configs=all_configs)
+    return configs_cache, num_entities, list(rule_bindings)
+
+
+class TestDqConfigsCache:
+
+    @pytest.fixture
+    def entity_uri_configs_cache(self, temp_configs_dir):
+        return prepare_entity_uri_configs_cache(temp_configs_dir)
+
+    def test_resolve_dataplex_entity_uris_benchmark(self, entity_uri_configs_cache):
+        configs_cache, num_entities, rule_binding_ids = entity_uri_configs_cache
+        bigquery_client = StubBigQueryClient()
+        count_before = configs_cache._cache_db["entities"].count
+        start = time.perf_counter()
+        configs_cache.resolve_dataplex_entity_uris(
+            dataplex_client=StubDataplexClient(),
+            bigquery_client=bigquery_client,
+            target_rule_binding_ids=rule_binding_ids,
+        )
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"Resolved {num_entities} entity_uris for {len(rule_binding_ids)} "
+            f"rule bindings in {elapsed:.3f}s"
+        )
+        assert bigquery_client.calls == 2 * num_entities
+        assert configs_cache._cache_db["entities"].count == count_before + num_entities
+        rule_binding = configs_cache._cache_db["rule_bindings"].get("RB_1001")
+        assert rule_binding["entity_id"] == "PROJECTS/P/DATASETS/D/TABLES/TABLE_1"
+        assert rule_binding["entity_key"] == "PROJECTS/P/DATASETS/D/TABLES/TABLE_1"
+        entity = configs_cache.get_table_entity_id(rule_binding["entity_key"])
+        assert entity.table_name == "table_1"
+        assert len(entity.columns) == 50
+        output = configs_cache.get_entities_configs_from_rule_bindings(rule_binding_ids)
+        assert len(output) == num_entities
+
+    def test_resolve_dataplex_entity_uris_target_only(self, entity_uri_configs_cache):
+        configs_cache, _, _ = entity_uri_configs_cache
+        bigquery_client = StubBigQueryClient()
+        configs_cache.resolve_dataplex_entity_uris(
+            dataplex_client=StubDataplexClient(),
+            bigquery_client=bigquery_client,
+            target_rule_binding_ids=["rb_0", "RB_1000", "RB_1"],
+        )
+        assert bigquery_client.calls == 4
+        assert sorted(bigquery_client.prefetched_tables) == ["p.d.table_0", "p.d.table_1"]
+        assert configs_cache._cache_db["rule_bindings"].get("RB_2")["entity_key"] is None
+
+    def test_resolve_dataplex_entity_uris_concurrently(self, entity_uri_configs_cache):
+        configs_cache, num_entities, rule_binding_ids = entity_uri_configs_cache
+        rule_binding_ids = rule_binding_ids[:100]
+        bigquery_client = StubBigQueryClient(latency=0.05)
+        configs_cache.resolve_dataplex_entity_uris(
+            dataplex_client=StubDataplexClient(),
+            bigquery_client=bigquery_client,
+            target_rule_binding_ids=rule_binding_ids,
+            num_threads=10,
+        )
+        # Lookups overlap, up to num_threads
+        assert 1 < bigquery_client.max_in_flight <= 10
+        assert configs_cache._cache_db["rule_bindings"].get("RB_99")["entity_key"] == \
+            "PROJECTS/P/DATASETS/D/TABLES/TABLE_99"
+
+    def test_resolve_dataplex_entity_uris_async_metadata_client(
+        self, entity_uri_configs_cache
+    ):
+        configs_cache, _, _ = entity_uri_configs_cache
+        bigquery_client = StubBigQueryClient()
+        bigquery_client.loaded_tables["p.d.table_0"] = object()
+        async_metadata_client = StubAsyncMetadataClient()
+        configs_cache.resolve_dataplex_entity_uris(
+            dataplex_client=StubDataplexClient(),
+            bigquery_client=bigquery_client,
+            target_rule_binding_ids=["RB_0", "RB_1", "RB_2"],
+            async_metadata_client=async_metadata_client,
+        )
+        # Tables already in the BigQuery client cache are not fetched again
+        assert sorted(async_metadata_client.fetched_tables) == ["p.d.table_1", "p.d.table_2"]
+        assert sorted(bigquery_client.loaded_tables) == \
+            ["p.d.table_0", "p.d.table_1", "p.d.table_2"]
+
+    def test_resolve_dataplex_entity_uris_async_dataplex_metadata(
+        self, entity_uri_configs_cache
+    ):
+        configs_cache, _, _ = entity_uri_configs_cache
+        dataplex_client = StubDataplexClient()
+        async_metadata_client = StubAsyncMetadataClient()
+        configs_cache.resolve_dataplex_entity_uris(
+            dataplex_client=dataplex_client,
+            bigquery_client=StubBigQueryClient(),
+            target_rule_binding_ids=["RB_0", "RB_1", "RB_1000"],
+            default_configs={
+                "projects": "p", "locations": "region", "lakes": "lake", "zones": "zone"
+            },
+            async_metadata_client=async_metadata_client,
+        )
+        # The zone is listed on the event loop, before the threaded resolution
+        zone_key = ("p", "region", "lake", "zone")
+        assert async_metadata_client.fetched_dataplex_metadata == [([], {
+            zone_key: {
+                "projects/p/datasets/d/tables/table_0",
+                "projects/p/datasets/d/tables/table_1",
+            }
+        })]
+        assert list(dataplex_client.zone_entities) == [zone_key]
+        assert len(dataplex_client.find_calls) == 2
+
+    def test_resolve_dataplex_entity_uris_error_names_uri(self, entity_uri_configs_cache):
+        configs_cache, _, rule_binding_ids = entity_uri_configs_cache
+        with pytest.raises(RuntimeError, match="bigquery://projects/p/datasets/d/tables/table_7 "):
+            configs_cache.resolve_dataplex_entity_uris(
+                dataplex_client=StubDataplexClient(),
+                bigquery_client=StubBigQueryClient(missing_tables=("p.d.table_7",)),
+                target_rule_binding_ids=rule_binding_ids[:20],
+                num_threads=4,
+            )
+        # Nothing is written to the cache when resolution fails
+        assert configs_cache._cache_db["rule_bindings"].get("RB_0")["entity_key"] is None
+
+    def test_resolve_dataplex_entity_uris_metadata_cache(self, temp_configs_dir, tmp_path):
+        configs_cache, num_entities, rule_binding_ids = prepare_entity_uri_configs_cache(
+            temp_configs_dir, num_entities=100, num_rule_bindings=200)
+        metadata_cache_path = str(tmp_path / "metadata_cache.db")
+
+        def resolve(bigquery_client, **kwargs):
+            configs_cache.resolve_dataplex_entity_uris(
+                dataplex_client=StubDataplexClient(),
+                bigquery_client=bigquery_client,
+                target_rule_binding_ids=rule_binding_ids,
+                metadata_cache=DqMetadataCache(metadata_cache_path, **kwargs),
+            )
+            return bigquery_client
+
+        # Cold cache: fetch every schema and record its version
+        bigquery_client = resolve(StubBigQueryClient())
+        assert bigquery_client.calls == 2 * num_entities
+        assert bigquery_client.version_calls == num_entities
+        expected_entity = configs_cache.get_table_entity_id("PROJECTS/P/DATASETS/D/TABLES/TABLE_1")
+
+        # Within the TTL no metadata API is called
+        bigquery_client = resolve(StubBigQueryClient())
+        assert bigquery_client.calls == 0
+        assert bigquery_client.version_calls == 0
+        assert bigquery_client.prefetched_tables == []
+        assert configs_cache.get_table_entity_id("PROJECTS/P/DATASETS/D/TABLES/TABLE_1") == \
+            expected_entity
+
+        # Expired entries are revalidated, and only changed schemas re-fetched
+        bigquery_client = resolve(
+            StubBigQueryClient(schema_versions={"p.d.table_1": "v2"}), ttl_hours=0)
+        assert bigquery_client.version_calls == num_entities + 1
+        assert bigquery_client.calls == 2
+        bigquery_client = resolve(
+            StubBigQueryClient(schema_versions={"p.d.table_1": "v2"}), ttl_hours=0)
+        assert bigquery_client.calls == 0
+
+        # refresh_metadata re-fetches everything
+        bigquery_client = resolve(StubBigQueryClient(), refresh=True)
+        assert bigquery_client.calls == 2 * num_entities
+        assert configs_cache.get_table_entity_id("PROJECTS/P/DATASETS/D/TABLES/TABLE_1") == \
+            expected_entity
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-vv', '-rP', '-n', 'auto']))
@@ -0,0 +1,155 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from datetime import date
+from datetime import datetime
+from datetime import timezone
+
+import json
+import logging
+
+from click.testing import CliRunner
+import pytest
+
+from clouddq import watermarks
+from clouddq.integration.bigquery.dq_watermark_table_utils import WatermarkTable
+
+
+logger = logging.getLogger(__name__)
+
+
+class StubQueryJob:
+
+    def __init__(self, rows: list, num_dml_affected_rows: int = None):
+        self.rows = rows
+        self.num_dml_affected_rows = num_dml_affected_rows
+
+    def result(self) -> list:
+        return self.rows
+
+
+class StubBigQueryClient:
+
+    def __init__(self, tables: tuple = ()):
+        self.tables = set(tables)
+        self.queries = []
+
+    def is_table_exists(self, table: str) -> bool:
+        return table in self.tables
+
+    def execute_query(self, query_string: str, job_config=None) -> StubQueryJob:
+        parameters = {
+            parameter.name: getattr(parameter, "values", getattr(parameter, "value", None))
+            for parameter in (job_config.query_parameters if job_config else [])
+        }
+        self.queries.append((" ".join(query_string.split()), parameters))
+        if query_string.startswith("CREATE TABLE"):
+            self.tables.add(query_string.split("`")[1])
+        if query_string.startswith("SELECT"):
+            return StubQueryJob([dict(
+                rule_binding_id="RB_1",
+                table_id="project.dataset.table",
+                high_watermark=datetime(2022, 1, 1, tzinfo=timezone.utc),
+            )])
+        return StubQueryJob([], num_dml_affected_rows=2)
+
+
+class TestWatermarkTable:
+
+    def test_ensure_exists_backfills_from_dq_summary(self):
+        bigquery_client = StubBigQueryClient(tables=("project.dataset.dq_summary",))
+        watermark_table = WatermarkTable(bigquery_client, "project.dataset.dq_summary")
+        assert watermark_table.table_name == "project.dataset.dq_summary_watermarks"
+        watermark_table.ensure_exists()
+        watermark_table.ensure_exists()
+        # The dq_summary history is only scanned once, when the table is created
+        assert len(bigquery_client.queries) == 1
+        query, _ = bigquery_client.queries[0]
+        assert "FROM `project.dataset.dq_summary` WHERE progress_watermark IS TRUE" in query
+        assert "GROUP BY rule_binding_id, table_id" in query
+
+    def test_ensure_exists_without_dq_summary(self):
+        bigquery_client = StubBigQueryClient()
+        WatermarkTable(bigquery_client, "project.dataset.dq_summary").ensure_exists()
+        query, _ = bigquery_client.queries[0]
+        assert "dq_summary`" not in query.replace("dq_summary_watermarks`", "")
+        assert "high_watermark TIMESTAMP" in query
+
+    def test_update_from_invocation(self):
+        bigquery_client = StubBigQueryClient(tables=(
+            "project.dataset.dq_summary", "project.dataset.dq_summary_watermarks"))
+        watermark_table = WatermarkTable(bigquery_client, "project.dataset.dq_summary")
+        assert watermark_table.update_from_invocation("invocation", date(2022, 1, 2)) == 2
+        query, parameters = bigquery_client.queries[0]
+        assert query.startswith("MERGE `project.dataset.dq_summary_watermarks`")
+        # Only the results of this run are read from dq_summary
+        assert "WHERE invocation_id = @invocation_id AND DATE(execution_ts) = @partition_date" \
+            in query
+        assert parameters == {"invocation_id": "invocation", "partition_date": date(2022, 1, 2)}
+
+    def test_reset_watermarks(self):
+        bigquery_client = StubBigQueryClient()
+        watermark_table = WatermarkTable(bigquery_client, "project.dataset.dq_summary")
+        watermark_table.reset_watermarks(["RB_1"])
+        watermark_table.reset_watermarks(
+            high_watermark=datetime(2022, 1, 1, tzinfo=timezone.utc))
+        query, parameters = bigquery_client.queries[0]
+        assert query == "DELETE FROM `project.dataset.dq_summary_watermarks` " \
+            "WHERE rule_binding_id IN UNNEST(@rule_binding_ids)"
+        assert parameters == {"rule_binding_ids": ["RB_1"]}
+        query, parameters = bigquery_client.queries[1]
+        assert query.startswith("UPDATE `project.dataset.dq_summary_watermarks`")
+        assert query.endswith("WHERE TRUE")
+        assert parameters == {"high_watermark": datetime(2022, 1, 1, tzinfo=timezone.utc)}
+
+    @pytest.fixture
+    def watermarks_cli(self, monkeypatch):
+        bigquery_client = StubBigQueryClient()
+
+        def get_watermark_table(dq_summary_table, **kwargs):
+            return WatermarkTable(bigquery_client, dq_summary_table)
+
+        monkeypatch.setattr(watermarks, "get_watermark_table", get_watermark_table)
+        return bigquery_client
+
+    def test_cli_show(self, watermarks_cli):
+        result = CliRunner().invoke(
+            watermarks.watermarks,
+            ["project.dataset.dq_summary", "show", "--rule_binding_ids", "rb_1,rb_2"],
+        )
+        assert result.exit_code == 0, result.output
+        assert json.loads(result.output)["rule_binding_id"] == "RB_1"
+        _, parameters = watermarks_cli.queries[0]
+        assert parameters == {"rule_binding_ids": ["RB_1", "RB_2"]}
+
+    def test_cli_reset(self, watermarks_cli):
+        result = CliRunner().invoke(
+            watermarks.watermarks,
+            ["project.dataset.dq_summary", "reset", "--rule_binding_ids", "ALL",
+             "--high_watermark", "2022-01-01T00:00:00"],
+        )
+        assert result.exit_code == 0, result.output
+        assert "Reset 2 watermarks" in result.output
+        _, parameters = watermarks_cli.queries[0]
+        assert parameters == {"high_watermark": datetime(2022, 1, 1, tzinfo=timezone.utc)}
+        result = CliRunner().invoke(
+            watermarks.watermarks,
+            ["project.dataset.dq_summary", "reset", "--rule_binding_ids", "ALL",
+             "--high_watermark", "yesterday"],
+        )
+        assert result.exit_code == 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-vv', '-rP', '-n', 'auto']))
@@ -0,0 +1,145 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import json
+import logging
+import os
+import stat
+
+import pytest
+import yaml
+
+from clouddq.integration.gcp_credentials import GcpCredentials
+from clouddq.integration.gcp_credentials import _utcnow
+from clouddq.runners.dbt.dbt_connection_configs import GcpDbtConnectionConfig
+
+
+logger = logging.getLogger(__name__)
+
+
+class TestGcpCredentials:
+
+    def test_get_token_shared(self, stub_credentials):
+        gcp_credentials = GcpCredentials(credentials=stub_credentials(latency=0.05))
+        assert gcp_credentials.user_id == "clouddq@project.iam.gserviceaccount.com"
+        gcp_credentials.credentials.expiry = _utcnow()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            tokens = list(executor.map(lambda _: gcp_credentials.get_token(), range(50)))
+        # Concurrent callers wait for a single refresh
+        assert set(tokens) == {"token-2"}
+        assert gcp_credentials.credentials.refreshes == 2
+        # A rejected token is only refreshed once
+        assert gcp_credentials.get_token(expired_token="token-2") == "token-3"
+        assert gcp_credentials.get_token(expired_token="token-2") == "token-3"
+
+    def test_get_token_refreshed_ahead_of_expiry(self, stub_credentials):
+        gcp_credentials = GcpCredentials(credentials=stub_credentials())
+        gcp_credentials.credentials.expiry = _utcnow() + timedelta(minutes=10)
+        assert gcp_credentials.get_token() == "token-1"
+        assert gcp_credentials.get_token(min_lifetime_seconds=1800) == "token-2"
+        gcp_credentials.credentials.expiry = _utcnow() + timedelta(minutes=2)
+        assert gcp_credentials.get_token() == "token-3"
+
+    def test_token_cache(self, stub_credentials, tmp_path):
+        token_cache_path = tmp_path / "clouddq" / "token_cache.json"
+        gcp_credentials = GcpCredentials(
+            credentials=stub_credentials("first"), token_cache_path=token_cache_path
+        )
+        assert stat.S_IMODE(os.stat(token_cache_path).st_mode) == 0o600
+        # Later invocations reuse the cached token without refreshing
+        cached_credentials = GcpCredentials(
+            credentials=stub_credentials("second"), token_cache_path=token_cache_path
+        )
+        assert cached_credentials.credentials.refreshes == 0
+        assert cached_credentials.get_token() == "first-1"
+        assert cached_credentials.user_id == gcp_credentials.user_id
+        # Refreshed tokens replace the cached ones
+        assert cached_credentials.get_token(expired_token="first-1") == "second-1"
+        assert GcpCredentials(
+            credentials=stub_credentials("third"), token_cache_path=token_cache_path
+        ).get_token() == "second-1"
+        # Tokens close to expiry are not reused
+        with open(token_cache_path) as f:
+            token_cache = json.load(f)
+        for cached_token in token_cache.values():
+            cached_token["expiry"] = (_utcnow() + timedelta(minutes=1)).isoformat()
+        with open(token_cache_path, "w") as f:
+            json.dump(token_cache, f)
+        assert GcpCredentials(
+            credentials=stub_credentials("fourth"), token_cache_path=token_cache_path
+        ).get_token() == "fourth-1"
+
+    def test_token_cache_keyed_by_principal(self, stub_credentials, tmp_path):
+        token_cache_path = tmp_path / "token_cache.json"
+        GcpCredentials(credentials=stub_credentials(), token_cache_path=token_cache_path)
+        other_credentials = stub_credentials()
+        other_credentials._service_account_email = "other@project.iam.gserviceaccount.com"
+        other_gcp_credentials = GcpCredentials(
+            credentials=other_credentials, token_cache_path=token_cache_path
+        )
+        assert other_credentials.refreshes == 1
+        assert other_gcp_credentials.user_id == "other@project.iam.gserviceaccount.com"
+
+    def test_token_cache_keyed_by_user_account(self, stub_credentials, tmp_path):
+        token_cache_path = tmp_path / "token_cache.json"
+
+        def user_credentials(name: str, refresh_token: str):
+            # gcloud application-default credentials of different users share
+            # the same client_id
+            credentials = stub_credentials(name)
+            credentials.client_id = "gcloud-client-id"
+            credentials.refresh_token = refresh_token
+            return credentials
+
+        GcpCredentials(
+            credentials=user_credentials("first", "refresh-token-1"),
+            token_cache_path=token_cache_path,
+        )
+        other_user_credentials = user_credentials("second", "refresh-token-2")
+        other_gcp_credentials = GcpCredentials(
+            credentials=other_user_credentials, token_cache_path=token_cache_path
+        )
+        assert other_user_credentials.refreshes == 1
+        assert other_gcp_credentials.get_token() == "second-1"
+        # The same user reuses the cached token
+        same_user_credentials = user_credentials("third", "refresh-token-1")
+        assert GcpCredentials(
+            credentials=same_user_credentials, token_cache_path=token_cache_path
+        ).get_token() == "first-1"
+        assert same_user_credentials.refreshes == 0
+        # Refresh tokens are not written to the cache
+        assert "refresh-token" not in token_cache_path.read_text()
+
+    def test_dbt_profile_uses_shared_token(self, stub_credentials):
+        connection_config = GcpDbtConnectionConfig(
+            gcp_project_id="project",
+            gcp_bq_dataset_id="dataset",
+            gcp_region_id="EU",
+            threads=4,
+            gcp_impersonation_credentials="clouddq@project.iam.gserviceaccount.com",
+            gcp_credentials=GcpCredentials(credentials=stub_credentials()),
+        )
+        profile = yaml.safe_load(connection_config.to_dbt_profiles_yml())
+        profile = profile["default"]["outputs"]["dev"]
+        assert profile["method"] == "oauth-secrets"
+        # Only a reference to the token is written to profiles.yml
+        assert profile["token"] == "{{ env_var('CLOUDDQ_GCP_ACCESS_TOKEN') }}"
+        assert "impersonate_service_account" not in profile
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-vv', '-rP', '-n', 'auto']))
@@ -13,21 +13,95 @@
 # limitations under the License.
 
 
+from datetime import datetime
+from datetime import timezone
 from pathlib import Path
 
 import logging
 import os
+import re
 import shutil
+import sqlite3
+import time
 
+from google.cloud import bigquery
 import pytest
 import yaml
 
 from clouddq import lib
 from clouddq.classes.dq_config_type import DqConfigType
+from clouddq.classes.dq_configs_cache import DqConfigsCache
+from clouddq.classes.dq_metadata_cache import DqMetadataCache
 
 
 logger = logging.getLogger(__name__)
 
+
+class StubBigQueryClient:
+
+    def __init__(self):
+        self.connections = 0
+
+    def get_connection(self, new: bool = False):
+        self.connections += 1
+
+    def get_table_columns(self, table: str) -> list:
+        return []
+
+
+class StubHighWatermarkQueryJob:
+
+    def __init__(self, rows: list):
+        self.rows = rows
+
+    def result(self) -> list:
+        return self.rows
+
+
+class StubHighWatermarkBigQueryClient:
+
+    def __init__(self):
+        self.queries = []
+
+    def execute_query(self, query_string: str, job_config=None):
+        self.queries.append(query_string)
+        targets = job_config.query_parameters[0].values
+        return StubHighWatermarkQueryJob([
+            {
+                "rule_binding_id": target.struct_values["rule_binding_id"],
+                "high_watermark": datetime(2022, 1, 1, tzinfo=timezone.utc),
+                "current_timestamp_value": datetime(2022, 1, 2, tzinfo=timezone.utc),
+            }
+            for target in targets
+        ])
+
+
+class StubDryRunQueryJob:
+
+    def __init__(self, query: str):
+        self.total_bytes_processed = len(query)
+        self.referenced_tables = [
+            bigquery.TableReference.from_string(table)
+            for table in re.findall(r"`([\w.]+)`", query)
+        ]
+
+
+class StubDryRunBigQueryClient:
+
+    def __init__(self, schema_versions: dict = None):
+        self.schema_versions = schema_versions or {}
+        self.dry_runs = []
+
+    def check_queries_dry_run(self, queries: dict, num_threads: int = 1) -> dict:
+        self.dry_runs.extend(queries)
+        return {query_id: StubDryRunQueryJob(query) for query_id, query in queries.items()}
+
+    def get_table_schema_version(self, table: str) -> str:
+        if table.endswith("missing"):
+            raise KeyError(table)
+        return self.schema_versions.get(table, "v1")
+
+
 class TestLib:
 
     def test_load_configs_identical(self, temp_configs_dir, tmp_path):
@@ -222,6 +296,478 @@ class TestLib:
         finally:
             shutil.rmtree(temp_dir)
 
+    def test_load_all_configs_single_pass(self, temp_configs_dir, monkeypatch):
+        config_path = Path(temp_configs_dir)
+        parsed_files = []
+        load_yaml_file = lib.load_yaml_file
+
+        def counting_load_yaml_file(file_path):
+            parsed_files.append(file_path)
+            return load_yaml_file(file_path)
+
+        monkeypatch.setattr(lib, "load_yaml_file", counting_load_yaml_file)
+        all_configs = lib.load_all_configs(config_path)
+
+        assert sorted(parsed_files) == sorted(set(parsed_files))
+        assert sorted(parsed_files) == sorted(lib.get_configs_files(config_path))
+        for configs_type in DqConfigType:
+            assert all_configs[configs_type] == lib.load_configs(config_path, configs_type)
+
+    def test_load_all_configs_different(self, temp_configs_dir, tmp_path):
+        temp_dir = Path(tmp_path).joinpath("clouddq_test_lib", "test_load_all_configs_different")
+        try:
+            shutil.copytree(temp_configs_dir, temp_dir)
+            with open(temp_dir / 'entities' / 'test-data.yml') as f:
+                testconfig = yaml.safe_load(f)
+            testconfig['entities']['TEST_TABLE']['columns']['ROW_ID']['data_type'] = 'INT64'
+            with open(temp_dir / 'entities' / 'test-data2.yml', 'w') as f:
+                yaml.safe_dump(testconfig, f)
+
+            with pytest.raises(ValueError):
+                lib.load_all_configs(temp_dir)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    @pytest.mark.benchmark
+    def test_load_all_configs_parallel_benchmark(self, temp_configs_dir, tmp_path):
+        # Generate a config tree with 10k rule bindings spread over 100 files
+        temp_dir = Path(tmp_path).joinpath("clouddq_test_lib", "test_load_all_configs_parallel")
+        try:
+            shutil.copytree(temp_configs_dir, temp_dir)
+            num_files = 100
+            num_rule_bindings_per_file = 100
+            for file_index in range(num_files):
+                with open(temp_dir / 'rule_bindings' / f'generated-{file_index}.yml', 'w') as f:
+                    f.write("rule_bindings:\n")
+                    for index in range(num_rule_bindings_per_file):
+                        f.write(
+                            f"  GENERATED_RB_{file_index}_{index}:\n"
+                            f"    entity_id: TEST_TABLE\n"
+                            f"    column_id: VALUE\n"
+                            f"    row_filter_id: NONE\n"
+                            f"    rule_ids:\n"
+                            f"      - NOT_NULL_SIMPLE\n"
+                            f"      - NO_DUPLICATES_IN_COLUMN_GROUPS:\n"
+                            f"          column_names: value\n"
+                            f"    metadata:\n"
+                            f"      team: team-{file_index}\n"
+                        )
+
+            start = time.perf_counter()
+            serial_configs = lib.load_all_configs(temp_dir)
+            serial_duration = time.perf_counter() - start
+            start = time.perf_counter()
+            parallel_configs = lib.load_all_configs(temp_dir, num_workers=4)
+            parallel_duration = time.perf_counter() - start
+            logger.info(
+                f"Loaded {len(serial_configs[DqConfigType.RULE_BINDINGS])} rule bindings "
+                f"serially in {serial_duration:.2f}s and with 4 workers in {parallel_duration:.2f}s."
+            )
+
+            assert len(serial_configs[DqConfigType.RULE_BINDINGS]) >= num_files * num_rule_bindings_per_file
+            assert parallel_configs == serial_configs
+            assert list(parallel_configs[DqConfigType.RULE_BINDINGS]) == \
+                list(serial_configs[DqConfigType.RULE_BINDINGS])
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_refresh_configs_cache(self, temp_configs_dir, tmp_path, monkeypatch):
+        temp_dir = Path(tmp_path).joinpath("clouddq_test_lib", "test_refresh_configs_cache")
+        try:
+            shutil.copytree(temp_configs_dir, temp_dir / 'configs')
+            configs_path = temp_dir / 'configs'
+            cache_db = str(temp_dir / 'configs_cache.db')
+            expected_configs = lib.load_all_configs(configs_path)
+
+            # First refresh loads everything
+            all_configs = lib.refresh_configs_cache(DqConfigsCache(cache_db), configs_path)
+            assert all_configs == expected_configs
+            assert DqConfigsCache(cache_db).get_rule_id('NOT_NULL_SIMPLE').rule_id == 'NOT_NULL_SIMPLE'
+
+            # Unchanged configs are not parsed again
+            parsed_files = []
+            load_yaml_file = lib.load_yaml_file
+
+            def counting_load_yaml_file(file_path, **kwargs):
+                parsed_files.append(file_path)
+                return load_yaml_file(file_path, **kwargs)
+
+            monkeypatch.setattr(lib, "load_yaml_file", counting_load_yaml_file)
+            assert lib.refresh_configs_cache(DqConfigsCache(cache_db), configs_path) == expected_configs
+            assert parsed_files == []
+
+            # Touched but identical files are not parsed again
+            os.utime(configs_path / 'rules' / 'base-rules.yml')
+            assert lib.refresh_configs_cache(DqConfigsCache(cache_db), configs_path) == expected_configs
+            assert parsed_files == []
+
+            # Only the changed file is parsed and re-ingested
+            rules_file = configs_path / 'rules' / 'base-rules.yml'
+            with open(rules_file) as f:
+                rules_config = yaml.safe_load(f)
+            rules_config['rules']['NOT_BLANK']['dimension'] = 'completeness'
+            rules_config['rule_dimensions'] = ['COMPLETENESS']
+            with open(rules_file, 'w') as f:
+                yaml.safe_dump(rules_config, f)
+            configs_cache = DqConfigsCache(cache_db)
+            all_configs = lib.refresh_configs_cache(configs_cache, configs_path)
+            assert parsed_files == [rules_file]
+            assert all_configs == lib.load_all_configs(configs_path)
+            assert configs_cache.get_rule_id('NOT_BLANK').dimension == 'COMPLETENESS'
+            assert list(configs_cache._cache_db['rule_dimensions'].rows) == [{'rule_dimension': 'COMPLETENESS'}]
+
+            # Configs from removed files are deleted from the cache
+            os.remove(configs_path / 'reference_columns' / 'reference-columns.yml')
+            configs_cache = DqConfigsCache(cache_db)
+            all_configs = lib.refresh_configs_cache(configs_cache, configs_path)
+            assert all_configs[DqConfigType.REFERENCE_COLUMNS] == {}
+            assert list(configs_cache._cache_db.query('select id from reference_columns')) == []
+
+            # Identical configs defined in another file are kept
+            shutil.copy(configs_path / 'rules' / 'complex-rules.yml', configs_path / 'complex-rules-copy.yml')
+            lib.refresh_configs_cache(DqConfigsCache(cache_db), configs_path)
+            os.remove(configs_path / 'rules' / 'complex-rules.yml')
+            configs_cache = DqConfigsCache(cache_db)
+            all_configs = lib.refresh_configs_cache(configs_cache, configs_path)
+            assert all_configs == lib.load_all_configs(configs_path)
+            for rule_id in all_configs[DqConfigType.RULES]:
+                assert configs_cache.get_rule_id(rule_id).rule_id == rule_id
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_prepare_target_configs_cache(self, temp_configs_dir, tmp_path, monkeypatch):
+        temp_dir = Path(tmp_path).joinpath("clouddq_test_lib", "test_prepare_target_configs_cache")
+        try:
+            shutil.copytree(temp_configs_dir, temp_dir / 'configs')
+            configs_path = temp_dir / 'configs'
+            cache_db = str(temp_dir / 'configs_cache.db')
+            all_configs = lib.load_all_configs(configs_path)
+
+            configs_cache = DqConfigsCache(cache_db)
+            target_configs = lib.prepare_target_configs_cache(
+                configs_cache, configs_path, ['t2_dq_1_email'])
+            assert list(target_configs[DqConfigType.RULE_BINDINGS]) == ['T2_DQ_1_EMAIL']
+            assert list(target_configs[DqConfigType.ENTITIES]) == ['TEST_TABLE']
+            assert list(target_configs[DqConfigType.ROW_FILTERS]) == ['DATA_TYPE_EMAIL']
+            assert list(target_configs[DqConfigType.REFERENCE_COLUMNS]) == \
+                ['CONTACT_DETAILS_REFERENCE_COLUMNS']
+            assert set(target_configs[DqConfigType.RULES]) == {
+                'NOT_NULL_SIMPLE', 'REGEX_VALID_EMAIL', 'CUSTOM_SQL_LENGTH_LE_30',
+                'CUSTOM_SQL_LENGTH_LE_PARAMETRIZED', 'NOT_BLANK'}
+            for configs_type, configs in target_configs.items():
+                for config_id, config in configs.items():
+                    assert all_configs[configs_type][config_id] == config
+            assert target_configs[DqConfigType.METADATA_REGISTRY_DEFAULTS] == \
+                all_configs[DqConfigType.METADATA_REGISTRY_DEFAULTS]
+            assert configs_cache.get_rule_id('NOT_BLANK').rule_id == 'NOT_BLANK'
+            assert list(configs_cache._cache_db.query('select id from rule_bindings')) == \
+                [{'id': 'T2_DQ_1_EMAIL'}]
+
+            # Only the files defining the target configs are read from the cache
+            # and unchanged files are not parsed again
+            parsed_files = []
+            load_yaml_file = lib.load_yaml_file
+
+            def counting_load_yaml_file(file_path, **kwargs):
+                parsed_files.append(file_path)
+                return load_yaml_file(file_path, **kwargs)
+
+            monkeypatch.setattr(lib, "load_yaml_file", counting_load_yaml_file)
+            configs_cache = DqConfigsCache(cache_db)
+            assert configs_cache.get_configs_source_paths(
+                DqConfigType.RULE_BINDINGS, ['T2_DQ_1_EMAIL']) == \
+                [str((configs_path / 'rule_bindings' / 'team-2-rule-bindings.yml').absolute())]
+            assert lib.prepare_target_configs_cache(
+                configs_cache, configs_path, ['T2_DQ_1_EMAIL']) == target_configs
+            assert parsed_files == []
+
+            # A full refresh after a targeted load re-ingests every config
+            assert lib.refresh_configs_cache(configs_cache, configs_path) == all_configs
+            assert len(list(configs_cache._cache_db['rule_bindings'].rows)) == \
+                len(all_configs[DqConfigType.RULE_BINDINGS])
+            assert parsed_files == []
+
+            with pytest.raises(ValueError):
+                lib.prepare_target_configs_cache(
+                    DqConfigsCache(cache_db), configs_path, ['NOT_A_RULE_BINDING'])
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_write_rule_binding_view_models_parallel(self, temp_configs_dir, tmp_path):
+        configs_cache = DqConfigsCache(str(tmp_path / "configs_cache.db"))
+        all_configs = lib.load_all_configs(temp_configs_dir)
+        lib.load_configs_to_cache(configs_cache, all_configs)
+        configs_cache.commit()
+        rule_bindings = {
+            rule_binding_id: rule_binding_configs
+            for rule_binding_id, rule_binding_configs
+            in all_configs[DqConfigType.RULE_BINDINGS].items()
+            if "entity_id" in rule_binding_configs
+            and not rule_binding_configs.get("incremental_time_filter_column_id")
+        }
+        assert len(rule_bindings) > 1
+
+        def write_models(dbt_model_path, generation_workers):
+            dbt_model_path.mkdir()
+            return list(lib.write_rule_binding_view_models(
+                rule_bindings=rule_bindings,
+                dbt_model_path=dbt_model_path,
+                configs_cache=configs_cache,
+                bigquery_client=StubBigQueryClient(),
+                generation_workers=generation_workers,
+                dq_summary_table_name="project.dataset.dq_summary",
+                environment="DEV",
+            ))
+
+        serial_path = tmp_path / "serial"
+        parallel_path = tmp_path / "parallel"
+        expected = write_models(serial_path, generation_workers=1)
+        assert write_models(parallel_path, generation_workers=4) == expected
+        assert [rule_binding_id for rule_binding_id, _ in expected] == list(rule_bindings)
+        for rule_binding_id, configs in expected:
+            sql_string = configs["generated_sql_string_dict"][
+                f"{rule_binding_id}_generated_sql_string"]
+            assert (parallel_path / f"{rule_binding_id}.sql").read_text() == \
+                sql_string.strip()
+            assert (serial_path / f"{rule_binding_id}.sql").read_text() == \
+                sql_string.strip()
+        # No temporary files are left behind
+        assert sorted(path.name for path in parallel_path.iterdir()) == \
+            sorted(f"{rule_binding_id}.sql" for rule_binding_id in rule_bindings)
+
+    @pytest.fixture
+    def rule_binding_views_configs(self, temp_configs_dir, tmp_path):
+        configs_cache = DqConfigsCache(str(tmp_path / "configs_cache.db"))
+        all_configs = lib.load_all_configs(temp_configs_dir)
+        lib.load_configs_to_cache(configs_cache, all_configs)
+        rule_bindings = {
+            rule_binding_id: all_configs[DqConfigType.RULE_BINDINGS][rule_binding_id]
+            for rule_binding_id in [
+                "T1_DQ_1_VALUE_NOT_NULL",
+                "T2_DQ_1_EMAIL",
+                "T3_DQ_1_EMAIL_DUPLICATE",
+            ]
+        }
+        rule_bindings["T2_DQ_1_EMAIL_ALL_ROWS"] = dict(
+            rule_bindings["T2_DQ_1_EMAIL"], row_filter_id="NONE"
+        )
+        dbt_model_path = tmp_path / "rule_binding_views"
+        dbt_model_path.mkdir()
+        return dict(lib.write_rule_binding_view_models(
+            rule_bindings=rule_bindings,
+            dbt_model_path=dbt_model_path,
+            configs_cache=configs_cache,
+            bigquery_client=StubBigQueryClient(),
+            dq_summary_table_name="project.dataset.dq_summary",
+            environment="DEV",
+            high_watermark_values={
+                "T1_DQ_1_VALUE_NOT_NULL": {
+                    "high_watermark_value": "2022-01-01 00:00:00+00:00",
+                    "current_timestamp_value": "2022-02-01 00:00:00+00:00",
+                },
+            },
+        ))
+
+    def test_plan_fused_entity_models(self, rule_binding_views_configs, monkeypatch):
+        fused_models, unfused_rule_binding_ids = lib.plan_fused_entity_models(
+            rule_binding_views_configs)
+        model_id = re.sub(r"[^0-9a-zA-Z_]+", "_", "__".join(
+            lib.get_rule_binding_table_names(
+                rule_binding_views_configs["T2_DQ_1_EMAIL"])))
+        assert model_id.endswith("__contact_details")
+        # Rule bindings with a different incremental window get their own scan
+        assert fused_models == {
+            f"{model_id}__fused_1": ["T1_DQ_1_VALUE_NOT_NULL"],
+            f"{model_id}__fused_2": ["T2_DQ_1_EMAIL", "T2_DQ_1_EMAIL_ALL_ROWS"],
+        }
+        # CUSTOM_SQL_STATEMENT rules select from their own filtered data
+        assert unfused_rule_binding_ids == ["T3_DQ_1_EMAIL_DUPLICATE"]
+        monkeypatch.setattr(lib, "NUM_RULES_PER_TABLE", 6)
+        fused_models, _ = lib.plan_fused_entity_models(rule_binding_views_configs)
+        assert list(fused_models.values()) == [
+            ["T1_DQ_1_VALUE_NOT_NULL"], ["T2_DQ_1_EMAIL"], ["T2_DQ_1_EMAIL_ALL_ROWS"]
+        ]
+
+    def test_create_entity_fused_summary_model(self, rule_binding_views_configs):
+        sql_string = lib.create_entity_fused_summary_model(
+            model_id="contact_details__fused_1",
+            rule_binding_configs=[
+                rule_binding_views_configs["T2_DQ_1_EMAIL"],
+                rule_binding_views_configs["T2_DQ_1_EMAIL_ALL_ROWS"],
+            ],
+        )
+        table_id = ".".join(lib.get_rule_binding_table_names(
+            rule_binding_views_configs["T2_DQ_1_EMAIL"]))
+        # The table is read once, outside of the failed records queries
+        summary_sql = re.sub(r'r""".*?"""', "", sql_string, flags=re.DOTALL)
+        assert summary_sql.count(f"`{table_id}`") == 1
+        # Row filters are evaluated as predicates in the shared scan
+        assert "(contact_type = 'email') AS _internal_row_in_scope_1" in summary_sql
+        assert "(True) AS _internal_row_in_scope_2" in summary_sql
+        # The row filters also prune the shared scan, e.g. to partitions
+        data_where_clause = re.search(
+            r"WHERE(.*?)\),\s*last_mod AS", summary_sql, flags=re.DOTALL).group(1)
+        assert re.sub(r"\s+", " ", data_where_clause).strip() == \
+            "TRUE AND ( (contact_type = 'email') OR (True) )"
+        assert summary_sql.count("STRUCT(") == 10
+        assert "'T2_DQ_1_EMAIL_ALL_ROWS' AS rule_binding_id" in summary_sql
+        # Same columns as the entity-level summary of the rule binding views
+        aggregate_sql = lib.create_entity_summary_model(
+            entity_table_id="contact_details",
+            entity_target_rule_binding_configs={
+                "rule_binding_ids_list": ["T2_DQ_1_EMAIL"],
+            },
+            gcp_project_id="project",
+            gcp_bq_dataset_id="dataset",
+        )
+        aggregate_columns = re.findall(
+            r"(?:AS|^)\s+(\w+),\s*$", aggregate_sql.split("FROM")[0],
+            flags=re.MULTILINE | re.IGNORECASE)
+        fused_columns = re.findall(
+            r"AS (\w+),?\s*$", summary_sql.split("STRUCT(")[1], flags=re.MULTILINE)
+        assert len(aggregate_columns) == 25
+        assert fused_columns == aggregate_columns
+
+    def test_read_only_configs_cache(self, temp_configs_dir, tmp_path):
+        cache_db = str(tmp_path / "configs_cache.db")
+        configs_cache = DqConfigsCache(cache_db)
+        lib.load_configs_to_cache(configs_cache, lib.load_all_configs(temp_configs_dir))
+        configs_cache.commit()
+        read_only_cache = DqConfigsCache(sqlite3_db_name=cache_db, read_only=True)
+        assert read_only_cache.get_rule_id("NOT_BLANK").rule_id == "NOT_BLANK"
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            read_only_cache._cache_db["rules"].delete("NOT_BLANK")
+        with pytest.raises(ValueError):
+            DqConfigsCache(read_only=True)
+
+    def test_check_sql_strings_dry_run_cache(self, tmp_path):
+        metadata_cache_path = str(tmp_path / "metadata_cache.db")
+        sql_strings = {
+            "RB_1": "SELECT * FROM `p.d.table_1`",
+            "RB_2": "SELECT * FROM `p.d.table_1` JOIN `p.d.table_2` USING (id)",
+            "RB_3": "SELECT * FROM `p.d.table_3` d WHERE CAST(d.ts AS TIMESTAMP)\n"
+                    "    BETWEEN CAST('2022-01-01 00:00:00+00:00' AS TIMESTAMP) AND "
+                    "CAST('2022-01-02 00:00:00+00:00' AS TIMESTAMP)",
+            "RB_4": "SELECT * FROM `p.d.missing`",
+        }
+
+        def check(bigquery_client, sql_strings=sql_strings, user_id="user", **kwargs):
+            total_bytes_processed = lib.check_sql_strings_dry_run(
+                sql_strings=sql_strings,
+                bigquery_client=bigquery_client,
+                num_threads=2,
+                metadata_cache=DqMetadataCache(metadata_cache_path, **kwargs),
+                user_id=user_id,
+            )
+            assert list(total_bytes_processed) == list(sql_strings)
+            assert total_bytes_processed["RB_1"] == len(sql_strings["RB_1"])
+            return sorted(bigquery_client.dry_runs)
+
+        assert check(StubDryRunBigQueryClient()) == ["RB_1", "RB_2", "RB_3", "RB_4"]
+        # Unchanged SQL on unchanged tables is not sent to BigQuery again, and
+        # queries on tables without a schema version are never cached
+        assert check(StubDryRunBigQueryClient()) == ["RB_4"]
+        # A schema change on any referenced table forces a new dry-run
+        assert check(StubDryRunBigQueryClient({"p.d.table_2": "v2"})) == ["RB_2", "RB_4"]
+        assert check(StubDryRunBigQueryClient({"p.d.table_2": "v2"})) == ["RB_4"]
+        # The watermark literals of incremental rule bindings are ignored
+        assert check(StubDryRunBigQueryClient({"p.d.table_2": "v2"}), sql_strings={
+            **sql_strings,
+            "RB_3": sql_strings["RB_3"].replace("2022-01-02", "2022-01-03")
+        }) == ["RB_4"]
+        # but not other timestamp literals, e.g. from row filters
+        row_filter = " AND ts > CAST('2022-01-01' AS TIMESTAMP)"
+        assert check(StubDryRunBigQueryClient({"p.d.table_2": "v2"}), sql_strings={
+            **sql_strings, "RB_3": sql_strings["RB_3"] + row_filter
+        }) == ["RB_3", "RB_4"]
+        assert check(StubDryRunBigQueryClient({"p.d.table_2": "v2"}), sql_strings={
+            **sql_strings,
+            "RB_3": sql_strings["RB_3"] + row_filter.replace("01-01", "01-02")
+        }) == ["RB_3", "RB_4"]
+        # Changed SQL is validated again
+        assert check(StubDryRunBigQueryClient({"p.d.table_2": "v2"}), sql_strings={
+            **sql_strings, "RB_1": sql_strings["RB_1"] + " WHERE id > 0"
+        }) == ["RB_1", "RB_4"]
+        # Dry-runs of one principal are not reused for another one
+        assert check(StubDryRunBigQueryClient({"p.d.table_2": "v2"}),
+                     user_id="other_user") == ["RB_1", "RB_2", "RB_3", "RB_4"]
+        # Entries expire after the metadata cache TTL and are then pruned
+        assert check(StubDryRunBigQueryClient({"p.d.table_2": "v2"}), ttl_hours=0) == \
+            ["RB_1", "RB_2", "RB_3", "RB_4"]
+        assert DqMetadataCache(metadata_cache_path)._cache_db[
+            "dry_run_results"].count == 0
+        # refresh_metadata ignores the cache
+        assert check(StubDryRunBigQueryClient(), refresh=True) == \
+            ["RB_1", "RB_2", "RB_3", "RB_4"]
+
+    def test_get_high_watermark_values(self, temp_configs_dir):
+        all_configs = lib.load_all_configs(temp_configs_dir)
+        configs_cache = lib.prepare_configs_cache(temp_configs_dir, all_configs=all_configs)
+        rule_bindings = dict(all_configs[DqConfigType.RULE_BINDINGS])
+        incremental_rule_binding_ids = [
+            rule_binding_id
+            for rule_binding_id, rule_binding_configs in rule_bindings.items()
+            if rule_binding_configs.get("incremental_time_filter_column_id")
+            and "entity_id" in rule_binding_configs
+        ]
+        rule_bindings = {
+            rule_binding_id: rule_bindings[rule_binding_id]
+            for rule_binding_id in incremental_rule_binding_ids + ["T2_DQ_1_EMAIL"]
+        }
+        bigquery_client = StubHighWatermarkBigQueryClient()
+        high_watermark_values = lib.get_high_watermark_values(
+            rule_bindings=rule_bindings,
+            configs_cache=configs_cache,
+            dq_summary_table_name="project.dataset.dq_summary",
+            bigquery_client=bigquery_client,
+            dq_summary_table_exists=True,
+        )
+        # One grouped query for all incremental rule bindings
+        assert len(bigquery_client.queries) == 1
+        assert "GROUP BY targets.rule_binding_id" in bigquery_client.queries[0]
+        assert sorted(high_watermark_values) == sorted(incremental_rule_binding_ids)
+        rule_binding_id = incremental_rule_binding_ids[0]
+        assert high_watermark_values[rule_binding_id]["high_watermark_value"] == \
+            datetime(2022, 1, 1, tzinfo=timezone.utc)
+
+        # SQL generation uses the precomputed high watermarks
+        configs = lib.create_rule_binding_view_model(
+            rule_binding_id=rule_binding_id,
+            rule_binding_configs=rule_bindings[rule_binding_id],
+            dq_summary_table_name="project.dataset.dq_summary",
+            environment="DEV",
+            configs_cache=configs_cache,
+            bigquery_client=StubBigQueryClient(),
+            dq_summary_table_exists=True,
+            high_watermark_values=high_watermark_values,
+        )
+        sql_string = configs["generated_sql_string_dict"][
+            f"{rule_binding_id}_generated_sql_string"
+        ]
+        assert "CAST('2022-01-01 00:00:00+00:00' AS TIMESTAMP)" in sql_string
+        assert "CAST('2022-01-02 00:00:00+00:00' AS TIMESTAMP)" in sql_string
+
+        # With a watermark table, dq_summary is not scanned
+        lib.get_high_watermark_values(
+            rule_bindings=rule_bindings,
+            configs_cache=configs_cache,
+            dq_summary_table_name="project.dataset.dq_summary",
+            bigquery_client=bigquery_client,
+            dq_summary_table_exists=True,
+            watermark_table_name="project.dataset.dq_summary_watermarks",
+        )
+        assert "`project.dataset.dq_summary_watermarks`" in bigquery_client.queries[1]
+        assert "`project.dataset.dq_summary`" not in bigquery_client.queries[1]
+
+        # No query without incremental rule bindings
+        assert lib.get_high_watermark_values(
+            rule_bindings={"T2_DQ_1_EMAIL": rule_bindings["T2_DQ_1_EMAIL"]},
+            configs_cache=configs_cache,
+            dq_summary_table_name="project.dataset.dq_summary",
+            bigquery_client=bigquery_client,
+        ) == {}
+        assert len(bigquery_client.queries) == 2
+
 
 if __name__ == "__main__":
     raise SystemExit(pytest.main([__file__, '-vv', '-rP', '-n', 'auto']))
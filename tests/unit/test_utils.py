@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from pathlib import Path
 
 import logging
 
@@ -22,6 +23,7 @@ from clouddq import utils
 
 logger = logging.getLogger(__name__)
 
+
 class TestUtils:
 
     def test_get_keys_from_dict_and_assert_oneof(self):
@@ -34,6 +36,38 @@ class TestUtils:
         with pytest.raises(ValueError):
             utils.get_keys_from_dict_and_assert_oneof('two', kwargs=kwargs, keys=['a', 'b'])
 
+    def test_load_jinja_template_compiled_once(self, monkeypatch):
+        monkeypatch.setattr(utils, "_jinja_environments", {})
+        template_path = Path("dbt", "macros", "create_rule_binding_view.sql")
+        template = utils.load_jinja_template(template_path)
+        assert utils.load_jinja_template(template_path) is template
+        failed_records_template = utils.load_jinja_template(
+            Path("dbt", "macros", "failed_records_query.sql"))
+        # Templates in the same directory share the environment and its macros
+        assert failed_records_template.environment is template.environment
+        assert len(utils._jinja_environments) == 1
+        with pytest.raises(ValueError, match="Jinja template directory not found"):
+            utils.load_jinja_template(Path("missing", "template.sql"))
+
+    def test_jinja_bytecode_cache(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(utils, "_jinja_environments", {})
+        monkeypatch.setattr(utils, "_jinja_bytecode_cache", None)
+        cache_path = tmp_path / "jinja_cache"
+        utils.set_jinja_bytecode_cache_path(cache_path)
+        template_path = Path("dbt", "macros", "create_entity_aggregate_dq_summary.sql")
+        template = utils.load_jinja_template(template_path)
+        assert len(list(cache_path.iterdir())) == 1
+        # A new environment, as in a later run, loads the cached bytecode
+        utils.set_jinja_bytecode_cache_path(cache_path)
+        cached_template = utils.load_jinja_template(template_path)
+        assert cached_template is not template
+        configs = {
+            "entity_target_rule_binding_configs": {"rule_binding_ids_list": ["RB_1"]},
+            "gcp_project_id": "project",
+            "gcp_bq_dataset_id": "dataset",
+        }
+        assert cached_template.render(configs) == template.render(configs)
+
 
 if __name__ == "__main__":
     raise SystemExit(pytest.main([__file__, '-vv', '-rP', '-n', 'auto']))